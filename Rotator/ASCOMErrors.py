@@ -7,6 +7,7 @@
 # Windows, the OS bits #0x80040000 are OR-ed with the error to form the Windows
 # OS-wide error codes per the Windows ASCOM spec.
 # 12-Oct-2020   rbd     Add Exception to end of name to avoid built-ins
+# 18-Oct-2026           ServerBusyException (0x500) for Admission
 DriverBase = 0x400      # Starting value for driver-specific exceptions
 DriverMax = 0xFFF       # Maximum value for driver-specific excptions
 
@@ -41,3 +42,7 @@ class UnspecifiedErrorException(object):
 class ValueNotSetException(object):
     Number = 0x402
     Message = 'The value has not yet been set.'
+
+class ServerBusyException(object):             # 0x500 up are driver-specific, see Admission
+    Number = 0x500
+    Message = 'Too many requests from this client, try again later.'
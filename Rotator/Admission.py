@@ -0,0 +1,159 @@
+# pylint: disable=C0301,C0103,C0111
+# =========
+# ADMISSION
+# =========
+# Per-client admission control for the Alpaca Rotator API, so that one
+# client polling position in a tight loop cannot starve the others. A
+# client is its ClientID, or its address if it sends none (or 0). Each has
+# a token bucket, admit_rate requests a second with bursts of admit_burst,
+# and may have at most admit_concurrent requests in progress. A request
+# over either budget is not run. It gets an Alpaca response with
+# ServerBusyException (0x500), or with --admit-reply 429 an HTTP 429 Too
+# Many Requests with Retry-After.
+#
+# It is off unless admit_rate or admit_concurrent is set (see config.py).
+# The state is one slotted record per client in a dict, under one lock
+# that is held only to update it. Clients idle for IdleTime are swept out
+# every SweepInterval, so the table only holds the clients seen lately.
+# Their counters are at /management/clients, the totals in
+# /management/metrics.
+#
+# 18-Oct-2026       1.1 Initial edit
+#
+import math
+from threading import Lock
+from time import monotonic
+from flask import Response, g, request
+import ASCOMErrors
+import shr
+import config
+
+SweepInterval = 60.0                                    # Seconds between clearing out idle clients
+IdleTime = 300.0                                        # Seconds without a request before a client is forgotten
+s_Resp429 = 'Too many requests from this client, try again later'
+
+class _Client(object):
+    __slots__ = ('tokens', 'stamp', 'active', 'admitted', 'limited', 'busy')
+
+    def __init__(self, tokens, stamp):
+        self.tokens = tokens                            # Requests it may make now
+        self.stamp = stamp                              # Last request
+        self.active = 0                                 # Requests in progress
+        self.admitted = 0
+        self.limited = 0                                # Turned away, out of tokens
+        self.busy = 0                                   # Turned away, too many in progress
+
+#
+# Token bucket and in-progress count per client. A rate or concurrent of
+# 0 means no limit of that kind.
+#
+class ClientLimiter(object):
+    def __init__(self, rate=0.0, burst=1, concurrent=0):
+        self.rate = rate
+        self.burst = float(burst)
+        self.concurrent = concurrent
+        self.enabled = bool(rate or concurrent)
+        self.limited = 0                                # Totals, not lost when clients are swept out
+        self.busy = 0
+        self._clients = {}                              # ClientID (int) or address (str) : _Client
+        self._lock = Lock()
+        self._sweep = monotonic() + SweepInterval
+
+    #
+    # One request from client 'key' at time 'now'. None if it is admitted,
+    # and then it must be release()d when done. Otherwise the seconds the
+    # client should wait before it tries again.
+    #
+    def admit(self, key, now):
+        with self._lock:
+            c = self._clients.get(key)
+            if c is None:
+                c = self._clients[key] = _Client(self.burst, now)
+            elif self.rate:
+                c.tokens = min(self.burst, c.tokens + (now - c.stamp) * self.rate)
+            c.stamp = now
+            if self.concurrent and c.active >= self.concurrent:
+                c.busy += 1
+                self.busy += 1
+                return 1.0
+            if self.rate:
+                if c.tokens < 1.0:
+                    c.limited += 1
+                    self.limited += 1
+                    return (1.0 - c.tokens) / self.rate
+                c.tokens -= 1.0
+            c.active += 1
+            c.admitted += 1
+            if now >= self._sweep:
+                self._sweep = now + SweepInterval
+                self._clients = {k: c for k, c in self._clients.items() if c.active or now - c.stamp < IdleTime}
+        return None
+
+    def release(self, key):
+        with self._lock:
+            self._clients[key].active -= 1             # Never swept out while active
+
+    #
+    # [(key, tokens, active, admitted, limited, busy)] for the clients
+    # in the table, most admitted first
+    #
+    def clients(self):
+        with self._lock:
+            rows = [(k, c.tokens, c.active, c.admitted, c.limited, c.busy) for k, c in self._clients.items()]
+        rows.sort(key=lambda r: r[3], reverse=True)
+        return rows
+
+    def __len__(self):
+        return len(self._clients)
+
+Clients = ClientLimiter(config.get('admit_rate'), config.get('admit_burst'), config.get('admit_concurrent'))
+Reply429 = config.get('admit_reply') == '429'
+
+#
+# The client a request is from: its ClientID if it has a usable one, else
+# its address
+#
+def client_key(clid, addr):
+    try:
+        clid = int(clid)
+    except (TypeError, ValueError):
+        return addr
+    return clid if clid > 0 else addr
+
+def retry_after(wait):
+    return str(max(1, math.ceil(wait)))
+
+#
+# The response to a request that was turned away after 'wait' seconds
+#
+def rejection(wait):
+    if Reply429:
+        response = Response(s_Resp429 + '\n', status=429, mimetype='text/plain')
+        response.headers['Retry-After'] = retry_after(wait)
+        return response
+    return shr.MethodResponse(shr.params(), ASCOMErrors.ServerBusyException).reply()
+
+# -----------
+# Flask hooks
+# -----------
+# On the Rotator API blueprint, before it is registered. Nothing is added
+# when admission is off.
+#
+def flask_hooks(blueprint):
+    if not Clients.enabled:
+        return
+
+    @blueprint.before_request
+    def admit():
+        key = client_key(shr.params().get(shr.s_FldClId), request.remote_addr)
+        wait = Clients.admit(key, monotonic())
+        if wait is not None:
+            return rejection(wait)
+        g.admission_key = key
+        return None
+
+    @blueprint.teardown_request
+    def release(exc):                                   # pylint: disable=W0613
+        key = g.pop('admission_key', None)
+        if key is not None:
+            Clients.release(key)
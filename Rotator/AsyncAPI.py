@@ -0,0 +1,401 @@
+# pylint: disable=C0301,C0103,C0111
+# ========================
+# ASYNCIO ALPACA FRONT END
+# ========================
+# An optional second HTTP front end that serves the Alpaca Rotator API
+# (/api/v1/rotator/<n>/...) and the Alpaca Management API (/management/...)
+# from one asyncio event loop, alongside the Flask server. Start it with
+# --async-port (see config.py). An idle keep-alive connection is just a
+# coroutine waiting on its socket, so thousands of clients polling
+# position cost no threads.
+#
+# It talks to the same devices as the Flask blueprints (RotatorAPI.RotDev)
+# and builds every response with the same shr records, Params and
+# pre-encoded StaticResponses, so the bytes on the wire are the same. The
+# device calls never block for long (reads are lock-free, writers hold a
+# device lock for microseconds), so they are made right on the loop. The
+# Swagger UI, the HTML setup pages and the non-Alpaca management endpoints
+# (trace) stay on the Flask server.
+#
+# Not available with --server gevent, which already serves connections on
+# greenlets.
+#
+# 18-Oct-2026       1.1 Initial edit
+# 18-Oct-2026       1.1 WaitForMove action waits on the loop, no thread per waiter
+# 18-Oct-2026       1.1 /management/telemetry event stream, a coroutine per subscriber
+# 18-Oct-2026       1.1 /management/batch property reads
+# 18-Oct-2026       1.1 IRotatorV4 members as RotatorAPI
+# 18-Oct-2026       1.1 Requests recorded in Metrics, as the Flask hooks do
+# 18-Oct-2026       1.1 Per-client admission control for the Rotator API (see Admission)
+# 18-Oct-2026       1.1 Query string parameters read only on GET, as in shr.params()
+#
+import asyncio
+import inspect
+import json
+from threading import Thread
+from time import monotonic, perf_counter
+from urllib.parse import parse_qs, urlsplit
+from werkzeug.exceptions import HTTPException
+import ASCOMErrors
+import Admission
+import Metrics
+import shr
+import TraceLog
+import Telemetry
+import RotatorAPI
+import ManagementAPI
+
+_trc = TraceLog.tracer('AsyncAPI')
+
+s_RotatorBase = '/api/v1/rotator/'
+s_RotatorRule = s_RotatorBase + '<int:DeviceNumber>/'         # As RotatorAPI's Flask rules, for Metrics
+MaxHeader = 16384                                       # Longest request head accepted
+
+# ---------------
+# Rotator methods
+# ---------------
+# Each takes the device number and the request Params and returns the
+# encoded response. The device number has already been checked. These
+# follow the Resource handlers in RotatorAPI one for one.
+#
+def _static(resp):
+    return lambda devno, prm: resp.encode(prm)
+
+def _not_implemented(devno, prm):
+    return shr.MethodResponse(prm, ASCOMErrors.NotImplementedException).encode()
+
+#
+# Returns a coroutine (awaited by the connection) if it has to wait
+#
+def _action(devno, prm):
+    dev, timeout, R = RotatorAPI.start_action(devno, prm)
+    if R is not None:
+        return R.encode()
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+    def stopped():                                      # On the MotionEngine thread
+        loop.call_soon_threadsafe(_resolve, fut)
+    if not dev.notify_when_idle(stopped):
+        return RotatorAPI.wait_response(dev, prm).encode()
+    return _wait_for_move(dev, fut, stopped, timeout, prm)
+
+def _resolve(fut):
+    if not fut.done():
+        fut.set_result(None)
+
+async def _wait_for_move(dev, fut, stopped, timeout, prm):
+    try:
+        await asyncio.wait_for(fut, timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        dev.cancel_notify(stopped)
+    return RotatorAPI.wait_response(dev, prm).encode()
+
+def _property(field):
+    def get(devno, prm):
+        st = RotatorAPI.RotDev[devno].snapshot()
+        if not st.connected:
+            return shr.PropertyResponse(None, prm, ASCOMErrors.NotConnectedException).encode()
+        return shr.PropertyResponse(getattr(st, field), prm).encode()
+    return get
+
+def _get_connected(devno, prm):
+    return shr.PropertyResponse(RotatorAPI.RotDev[devno].connected, prm).encode()
+
+def _put_connected(devno, prm):
+    RotatorAPI.RotDev[devno].connected = prm.bool('Connected')
+    return shr.MethodResponse(prm).encode()
+
+def _connect(connected):
+    def put(devno, prm):
+        RotatorAPI.RotDev[devno].connected = connected
+        return shr.MethodResponse(prm).encode()
+    return put
+
+def _device_state(devno, prm):
+    st = RotatorAPI.RotDev[devno].snapshot()
+    if not st.connected:
+        return shr.PropertyResponse(None, prm, ASCOMErrors.NotConnectedException).encode()
+    return shr.PropertyResponse(RotatorAPI.device_state(st), prm).encode()
+
+def _put_reverse(devno, prm):
+    st = RotatorAPI.RotDev[devno].snapshot()
+    if not st.connected:
+        return shr.MethodResponse(prm, ASCOMErrors.NotConnectedException).encode()
+    if st.is_moving:
+        return shr.MethodResponse(prm, ASCOMErrors.InvalidOperationException).encode()
+    RotatorAPI.RotDev[devno].reverse = prm.bool('Reverse')
+    return shr.MethodResponse(prm).encode()
+
+def _halt(devno, prm):
+    if not RotatorAPI.RotDev[devno].connected:
+        return shr.PropertyResponse(None, prm, ASCOMErrors.NotConnectedException).encode()
+    RotatorAPI.RotDev[devno].Halt()
+    return shr.MethodResponse(prm).encode()
+
+def _move(devno, prm):
+    st = RotatorAPI.RotDev[devno].snapshot()
+    if not st.connected:
+        return shr.MethodResponse(prm, ASCOMErrors.NotConnectedException).encode()
+    if st.is_moving:
+        return shr.MethodResponse(prm, ASCOMErrors.InvalidOperationException).encode()
+    relPos = prm.float('Position', 0.0)
+    if relPos >= 360 or relPos <= -360.0:
+        return shr.MethodResponse(prm, ASCOMErrors.InvalidValueException).encode()
+    RotatorAPI.RotDev[devno].Move(relPos)
+    return shr.MethodResponse(prm).encode()
+
+#
+# MoveAbsolute, MoveMechanical and Sync, which take an angle 0 <= Position < 360
+#
+def _to_angle(method):
+    def put(devno, prm):
+        st = RotatorAPI.RotDev[devno].snapshot()
+        if not st.connected:
+            return shr.MethodResponse(prm, ASCOMErrors.NotConnectedException).encode()
+        if st.is_moving:
+            return shr.MethodResponse(prm, ASCOMErrors.InvalidOperationException).encode()
+        newPos = prm.float('Position', 0.0)
+        if newPos >= 360 or newPos < 0:
+            return shr.MethodResponse(prm, ASCOMErrors.InvalidValueException).encode()
+        getattr(RotatorAPI.RotDev[devno], method)(newPos)
+        return shr.MethodResponse(prm).encode()
+    return put
+
+#
+# (method, last path segment) : handler
+#
+RotatorRoutes = {
+    ('PUT', 'action')           : _action,
+    ('PUT', 'commandblind')     : _not_implemented,
+    ('PUT', 'commandbool')      : _not_implemented,
+    ('PUT', 'commandstring')    : _not_implemented,
+    ('GET', 'connected')        : _get_connected,
+    ('PUT', 'connected')        : _put_connected,
+    ('PUT', 'connect')          : _connect(True),
+    ('GET', 'connecting')       : _static(RotatorAPI.r_Connecting),
+    ('GET', 'devicestate')      : _device_state,
+    ('PUT', 'disconnect')       : _connect(False),
+    ('GET', 'description')      : _static(RotatorAPI.r_Description),
+    ('GET', 'driverinfo')       : _static(RotatorAPI.r_DriverInfo),
+    ('GET', 'driverversion')    : _static(RotatorAPI.r_DriverVersion),
+    ('GET', 'interfaceversion') : _static(RotatorAPI.r_InterfaceVersion),
+    ('GET', 'name')             : _static(RotatorAPI.r_Name),
+    ('GET', 'supportedactions') : _static(RotatorAPI.r_SupportedActions),
+    ('GET', 'canreverse')       : _property('can_reverse'),
+    ('GET', 'ismoving')         : _property('is_moving'),
+    ('GET', 'mechanicalposition'): _property('mechanical_position'),
+    ('GET', 'position')         : _property('position'),
+    ('GET', 'reverse')          : _property('reverse'),
+    ('PUT', 'reverse')          : _put_reverse,
+    ('GET', 'stepsize')         : _property('step_size'),
+    ('GET', 'targetposition')   : _property('target_position'),
+    ('PUT', 'halt')             : _halt,
+    ('PUT', 'move')             : _move,
+    ('PUT', 'moveabsolute')     : _to_angle('MoveAbsolute'),
+    ('PUT', 'movemechanical')   : _to_angle('MoveMechanical'),
+    ('PUT', 'sync')             : _to_angle('Sync'),
+}
+
+#
+# An async generator of SSE chunks, see ManagementAPI telemetry
+#
+def _telemetry(prm):
+    devices, rate = ManagementAPI.telemetry_args(prm)
+    return _telemetry_events(devices, rate)
+
+async def _telemetry_events(devices, rate):
+    loop = asyncio.get_running_loop()
+    ev = asyncio.Event()
+    sub = ManagementAPI.Hub.subscribe(lambda: loop.call_soon_threadsafe(ev.set), devices, rate)
+    try:
+        yield b'retry: 2000\n\n'
+        while True:
+            try:
+                await asyncio.wait_for(ev.wait(), Telemetry.Heartbeat)
+            except asyncio.TimeoutError:
+                yield Telemetry.s_Heartbeat
+                continue
+            ev.clear()
+            for frame in sub.take():
+                yield Telemetry.format_frame(frame)
+            if sub.dropped:
+                yield Telemetry.s_Dropped
+                return
+    finally:
+        ManagementAPI.Hub.unsubscribe(sub)
+
+ManagementRoutes = {
+    ('GET', '/management/apiversions')          : lambda prm: ManagementAPI.r_APIVersions.encode(prm),
+    ('GET', '/management/v1/description')       : lambda prm: ManagementAPI.r_Description.encode(prm),
+    ('GET', '/management/v1/configureddevices') : lambda prm: ManagementAPI.conf_response().encode(prm),
+    ('GET', '/management/telemetry')            : _telemetry,
+    ('GET', '/management/batch')                : lambda prm: ManagementAPI.batch_response(prm).encode(),
+}
+
+def _error(status, message):
+    return status, (json.dumps({'message': message}) + '\n').encode()
+
+#
+# A request turned away by Admission. There is no Retry-After here.
+#
+def _rejection(prm):
+    if Admission.Reply429:
+        return _error('429 TOO MANY REQUESTS', Admission.s_Resp429)
+    return '200 OK', shr.MethodResponse(prm, ASCOMErrors.ServerBusyException).encode()
+
+async def _released(coro, key):
+    try:
+        return await coro
+    finally:
+        Admission.Clients.release(key)
+
+#
+# Route one request. Returns (status line text, body bytes or a coroutine
+# that returns them, or an async generator of event stream chunks).
+# 'peer' is the client's address.
+#
+def dispatch(method, target, body, peer=None):
+    t0 = perf_counter()
+    route, devno, status, result = _route(method, target, body, peer)
+    if asyncio.iscoroutine(result):
+        return status, _timed(result, route, devno, t0)
+    Metrics.request(route, devno, int(status[:3]), perf_counter() - t0)
+    return status, result
+
+async def _timed(coro, route, devno, t0):
+    body = await coro
+    Metrics.request(route, devno, 200, perf_counter() - t0)
+    return body
+
+#
+# (Flask rule for Metrics, device number or None, status, result)
+#
+def _route(method, target, body, peer):
+    url = urlsplit(target)
+    path = url.path
+    route, devno = Metrics.s_Unmatched, None
+    prm = shr.Params(parse_qs(body.decode('utf-8', 'replace'), keep_blank_values=True) if body else None,
+                     parse_qs(url.query, keep_blank_values=True) if url.query and method == 'GET' else None)
+    try:
+        if path.startswith(s_RotatorBase):
+            num, _, name = path[len(s_RotatorBase):].partition('/')
+            handler = RotatorRoutes.get((method, name))
+            if handler is None or not num.isdigit():
+                return (route, devno) + _error('404 NOT FOUND', 'The requested URL was not found on the server.')
+            route = s_RotatorRule + name
+            devno = int(num)
+            if not devno in RotatorAPI.rRot:
+                return (route, devno) + _error('400 BAD REQUEST', shr.s_Resp400NoDevNo)
+            if not Admission.Clients.enabled:
+                return route, devno, '200 OK', handler(devno, prm)
+            key = Admission.client_key(prm.get(shr.s_FldClId), peer)
+            if Admission.Clients.admit(key, monotonic()) is not None:
+                return (route, devno) + _rejection(prm)
+            release = True
+            try:
+                result = handler(devno, prm)
+                if asyncio.iscoroutine(result):         # Released when the long poll is done
+                    result, release = _released(result, key), False
+            finally:
+                if release:
+                    Admission.Clients.release(key)
+            return route, devno, '200 OK', result
+        handler = ManagementRoutes.get((method, path))
+        if handler is None:
+            return (route, devno) + _error('404 NOT FOUND', 'The requested URL was not found on the server.')
+        route = path
+        return route, devno, '200 OK', handler(prm)
+    except HTTPException as ex:                         # Params aborts with 400 on bad values
+        return (route, devno) + _error(f'{ex.code} {ex.name.upper()}', ex.description)
+    except Exception as ex:                             # pylint: disable=W0703
+        _trc.error(f'{method} {target} failed: {ex!r}')
+        return (route, devno) + _error('500 INTERNAL SERVER ERROR', shr.s_Resp500SrvErr)
+
+# -----------
+# HTTP server
+# -----------
+# Just enough HTTP/1.1 for Alpaca clients: Content-Length bodies (no
+# chunked requests), keep-alive unless the client asks to close.
+#
+class AsyncServer(object):
+    def __init__(self, host, port, keepalive=5.0, backlog=128):
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+        self.backlog = backlog
+        self.connections = 0                            # Currently open
+
+    async def _connection(self, reader, writer):
+        self.connections += 1
+        peer = writer.get_extra_info('peername')
+        peer = peer[0] if peer else None
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.keepalive or None)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ')
+                except ValueError:
+                    return                              # Not HTTP, just drop it
+                headers = {}
+                for line in lines[1:]:
+                    k, _, v = line.partition(':')
+                    headers[k.strip().lower()] = v.strip()
+                if 'transfer-encoding' in headers:
+                    status, body = _error('411 LENGTH REQUIRED', 'Chunked requests are not supported')
+                    keep = False
+                else:
+                    length = int(headers.get('content-length') or 0)
+                    body = await reader.readexactly(length) if length else b''
+                    status, body = dispatch(method, target, body, peer)
+                    if asyncio.iscoroutine(body):       # Long poll, e.g. WaitForMove
+                        body = await body
+                    elif inspect.isasyncgen(body):      # Event stream, runs until either end quits
+                        await self._stream(writer, version, body)
+                        return
+                    conn = headers.get('connection', '').lower()
+                    keep = self.keepalive and (conn == 'keep-alive' if version == 'HTTP/1.0' else conn != 'close')
+                writer.write(b''.join((f'{version} {status}\r\nContent-Type: application/json\r\n'
+                                       f'Content-Length: {len(body)}\r\n'
+                                       f'Connection: {"keep-alive" if keep else "close"}\r\n\r\n'.encode(), body)))
+                await writer.drain()
+                if not keep:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass                                        # Client went away or sent garbage
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    @staticmethod
+    async def _stream(writer, version, chunks):
+        try:
+            writer.write(f'{version} 200 OK\r\nContent-Type: text/event-stream\r\n'
+                         f'Cache-Control: no-cache\r\nConnection: close\r\n\r\n'.encode())
+            async for chunk in chunks:
+                writer.write(chunk)
+                await writer.drain()                    # A slow client only holds up itself
+        finally:
+            await chunks.aclose()
+
+    async def serve(self):
+        server = await asyncio.start_server(self._connection, self.host, self.port,
+                                            backlog=self.backlog, limit=MaxHeader)
+        async with server:
+            await server.serve_forever()
+
+    def run(self):
+        asyncio.run(self.serve())
+
+#
+# Run the front end on its own thread (and event loop) next to the Flask server
+#
+def start(host, port, keepalive=5.0, backlog=128):
+    srv = AsyncServer(host, port, keepalive, backlog)
+    Thread(target=srv.run, name='AsyncAPI', daemon=True).start()
+    return srv
@@ -6,51 +6,168 @@
 #                       thread.
 # 19-Jul-2022   rbd     Formalize discovery for proper use of multicast send/receive.
 # 21-Aug-2022   rbd     Fix capitalization of discovery response AlpacaPort per spec.
+# 18-Oct-2026           Received packets go to TraceLog instead of stdout.
+# 18-Oct-2026           Packets and replies counted in Metrics.
+# 18-Oct-2026           One thread waits on all the sockets with a selector and
+#                       drains each one without blocking. Several IPv4 addresses,
+#                       IPv6 (ff12::a1:9aca) on chosen interfaces. Matching is on
+#                       the raw bytes and the reply is encoded once. Replies to
+#                       each source are rate limited.
 #
 #
 import os
+import selectors
 import socket                                           # for discovery responder
+import struct
 from threading import Thread                            # Same here
+from time import monotonic
+import Metrics
+import TraceLog
+
+_trc = TraceLog.tracer('DiscoveryResponder')
+
+DiscoveryPort = 32227
+s_Discovery = b'alpacadiscovery1'
+s_MCastV6 = 'ff12::a1:9aca'
+Burst = 4                                               # Replies a source may have in a burst
+SweepInterval = 60.0                                    # Seconds between clearing out idle sources
+
+class _Bucket(object):
+    __slots__ = ('tokens', 'stamp')
+
+    def __init__(self, tokens, stamp):
+        self.tokens = tokens
+        self.stamp = stamp
+
+#
+# Token bucket per source address, 'rate' replies a second with bursts
+# of up to Burst. A rate of 0 means no limit.
+#
+class SourceLimiter(object):
+    def __init__(self, rate):
+        self.rate = rate
+        self._buckets = {}                              # address : _Bucket
+        self._sweep = monotonic() + SweepInterval
+
+    def allow(self, addr, now):
+        if not self.rate:
+            return True
+        b = self._buckets.get(addr)
+        if b is None:
+            self._buckets[addr] = _Bucket(Burst - 1.0, now)
+        else:
+            b.tokens = min(Burst, b.tokens + (now - b.stamp) * self.rate)
+            b.stamp = now
+            if b.tokens < 1.0:
+                return False
+            b.tokens -= 1.0
+        if now >= self._sweep:
+            self._sweep = now + SweepInterval
+            idle = Burst / self.rate                    # Full again after this long
+            self._buckets = {a: b for a, b in self._buckets.items() if now - b.stamp < idle}
+        return True
+
+    def __len__(self):
+        return len(self._buckets)
+
+#
+# Interface indexes for the IPv6 group. 'all' for every interface.
+#
+def _if_indexes(names):
+    if names == ['all']:
+        return [i for i, _ in socket.if_nameindex()]
+    return [socket.if_nametoindex(n) for n in names]
 
 class DiscoveryResponder(Thread):
-    def __init__(self, MCAST, ADDR, PORT):
-        Thread.__init__(self)
+    #
+    # MCAST is one address or a comma separated list of them (IPv4), each
+    # gets its own receive socket. 'ipv6' is a list of interface names to
+    # join the IPv6 discovery group on, or ['all'].
+    #
+    def __init__(self, MCAST, ADDR, PORT, ipv6=(), rate=0.0, dport=DiscoveryPort):
+        Thread.__init__(self, name='Discovery')
+        self.alpaca_response = ('{"AlpacaPort": ' + str(PORT) + '}').encode()
+        self.limiter = SourceLimiter(rate)
+        self.sel = selectors.DefaultSelector()
         # See https://stackoverflow.com/a/32372627/159508
         # It's a sledge hammer technique to bind to ' ' for sending multicast
         # The right way is to bind to the broadcast address for the current
-        # subnet. 
-        self.device_address = (MCAST, 32227)    # Listen at multicast address, not ' '
-        self.alpaca_response  = "{\"AlpacaPort\": " + str(PORT) + "}"
-        self.rsock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.rsock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  #share address
-        if os.name != 'nt':
-            # needed on Linux and OSX to share port with net core. Remove on windows
-            self.rsock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
-        try:
-            self.rsock.bind(self.device_address)
-        except:
-            print('Discovery responder: failure to bind receive socket')
-            self.rsock.close()
-            self.rsock = 0
-            raise
-
+        # subnet.
         self.tsock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         self.tsock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  #share address
         try:
-             self.tsock.bind((ADDR, 0))
+            self.tsock.bind((ADDR, 0))
         except:
             print('Discovery responder: failure to bind send socket')
             self.tsock.close()
-            self.tsock = 0
             raise
-           
+        for mcast in [a.strip() for a in MCAST.split(',') if a.strip()]:
+            rsock = self._socket(socket.AF_INET)
+            try:
+                rsock.bind((mcast, dport))              # Listen at multicast address, not ' '
+            except:
+                print(f'Discovery responder: failure to bind receive socket {mcast}')
+                rsock.close()
+                raise
+            self.sel.register(rsock, selectors.EVENT_READ, self.tsock)
+        if ipv6:
+            rsock = self._socket(socket.AF_INET6)
+            rsock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 1)
+            try:
+                rsock.bind(('', dport))
+                group = socket.inet_pton(socket.AF_INET6, s_MCastV6)
+                for index in _if_indexes(list(ipv6)):
+                    rsock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_JOIN_GROUP, group + struct.pack('@I', index))
+            except:
+                print(f'Discovery responder: failure to join {s_MCastV6} on {",".join(ipv6)}')
+                rsock.close()
+                raise
+            self.sel.register(rsock, selectors.EVENT_READ, rsock)   # Replies from the same socket
         # OK start the listener
         self.daemon = True
         self.start()
+
+    @staticmethod
+    def _socket(family):
+        sock = socket.socket(family, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)    #share address
+        if os.name != 'nt':
+            # needed on Linux and OSX to share port with net core. Remove on windows
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.setblocking(False)
+        return sock
+
     def run(self):
         while True:
-            data, addr = self.rsock.recvfrom(1024)
-            datascii = str(data, 'ascii')
-            print('Disc rcv ' + datascii + ' from ' + str(addr))
-            if 'alpacadiscovery1' in datascii:
-                self.tsock.sendto(self.alpaca_response.encode(), addr)
+            for key, _ in self.sel.select():
+                self._drain(key.fileobj, key.data)
+
+    #
+    # Everything that is waiting on one socket. 'tsock' is the socket to
+    # reply from.
+    #
+    def _drain(self, rsock, tsock):
+        reply = self.alpaca_response
+        while True:
+            try:
+                data, addr = rsock.recvfrom(1024)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as ex:                       # E.g. ICMP unreachable on Windows
+                if _trc.level >= TraceLog.INFO:
+                    _trc.info(f'receive failed: {ex!r}')
+                return
+            Metrics.Discovery.inc()
+            if _trc.level >= TraceLog.DEBUG:
+                _trc.debug(f'Disc rcv {data!r} from {addr}')
+            if s_Discovery not in data:
+                continue
+            if not self.limiter.allow(addr[0], monotonic()):
+                Metrics.DiscoveryLimited.inc()
+                continue
+            try:
+                tsock.sendto(reply, addr)
+                Metrics.DiscoveryReplies.inc()
+            except OSError as ex:
+                if _trc.level >= TraceLog.INFO:
+                    _trc.info(f'reply to {addr} failed: {ex!r}')
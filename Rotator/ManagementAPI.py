@@ -4,11 +4,32 @@
 # ==========================
 # 15-Jul-2020  rbd  FLask-RestPlus is dead -> Flask-RestX
 # 13-Oct-2021  rbd  0.9 Linting with some messages disabled, no docstrings
+# 18-Oct-2026       1.1 ConfData built on first request for large device counts
+# 18-Oct-2026       1.1 /trace and /tracelevel for TraceLog
+# 18-Oct-2026       1.1 apiversions, description, configureddevices are pre-encoded
+# 18-Oct-2026       1.1 All handlers return shr-encoded bytes, models are for Swagger only
+# 18-Oct-2026       1.1 Request parameters come from shr.params(), indexed once per request
+# 18-Oct-2026       1.1 /telemetry Server-Sent Events stream (see Telemetry)
+# 18-Oct-2026       1.1 /batch reads many device properties in one request
+# 18-Oct-2026       1.1 /metrics in Prometheus text format (see Metrics)
+# 18-Oct-2026       1.1 /clock and /clock/advance for the SimClock
+# 18-Oct-2026       1.1 /clock reports discrete-event mode
+# 18-Oct-2026       1.1 No Swagger UI unless the swagger setting is on (see config)
+# 18-Oct-2026       1.1 /clients admission counters (see Admission)
+# 18-Oct-2026       1.1 /trace Count read with Params.int(), 400 if it is not an integer
 
-from flask import Blueprint, request
+from flask import Blueprint, Response, abort
 from flask_restx import Api, Resource, fields
+import ASCOMErrors
 import shr
+import config
+import TraceLog
+import Telemetry
+import Metrics
+import MotionEngine
+import SimClock
 import RotatorAPI
+import Admission
 
 mgmt_blueprint = Blueprint('Management', __name__,
                       url_prefix='/management',
@@ -19,6 +40,7 @@ mgmt_blueprint = Blueprint('Management', __name__,
 # blueprint to establish the endpoint prefix.
 #
 api = Api(default='management',
+            doc='/' if config.get('swagger') == 'on' else False,
             default_label='<h2>ASCOM Alpaca Management API (JSON): Base URL = <tt>/management</tt>',
             contact='Bob Denny, DC-3 Dreams, SP',
             contact_email='rdenny@dc3.com',
@@ -109,18 +131,19 @@ m_ConfiguredDevicesResponse = api.model('ConfiguredDevicesResponse',
 # APIVersions
 # -----------
 #
+r_APIVersions = shr.StaticResponse(shr.m_DriverAPIVersions)
+
 @api.route('/apiversions', methods=['GET'])
 @api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
 @api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
 class apiversions(Resource):
 
     @api.doc(description='An integer array of supported Alpaca API version numbers.')
-    @api.marshal_with(m_IntArrayResponse, description='Integer array of supported Alpaca API versions', skip_none=True)
+    @api.response(200, 'Integer array of supported Alpaca API versions', m_IntArrayResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
     def get(self):
-        R = shr.PropertyResponse(shr.m_DriverAPIVersions, request.args)
-        return vars(R)
+        return r_APIVersions.reply(shr.params())
 
 # -----------
 # Description
@@ -133,6 +156,7 @@ DescData =  {
                 s_FldManufVers      : shr.m_DriverVersion,
                 s_FldLocation       : "The Great American West"
             }
+r_Description = shr.StaticResponse(DescData)
 
 @api.route('/v1/description', methods=['GET'])
 @api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
@@ -140,27 +164,43 @@ DescData =  {
 class description(Resource):
 
     @api.doc(description='Returns cross-cutting information that applies to all devices available at this URL:Port.')
-    @api.marshal_with(m_DescriptionResponse, description='Cross cutting information that applies to all devices servered through this URL:Port.', skip_none=True)
+    @api.response(200, 'Cross cutting information that applies to all devices servered through this URL:Port.', m_DescriptionResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
     def get(self):
-        R = shr.PropertyResponse(DescData, request.args)
-        return vars(R)
+        return r_Description.reply(shr.params())
 
 # -----------------
 # ConfiguredDevices
 # -----------------
-# This is the actual static description data we return
+# This is the actual static description data we return. It covers every
+# configured device whether or not it has been created yet, and is built
+# on the first request rather than at startup.
 #
-ConfData = []
-for i in RotatorAPI.rRot:
-    confi = {
-        s_FldDevName        : 'Alpaca Rotator Simulator',
-        s_FldDevType        : 'Rotator',
-        s_FldUniqId         : "5897B4BC-2A4D-4893-8CC0-6A440D6B2D51"
-        }
-    confi[s_FldDevNum] = i
-    ConfData.append(confi)
+ConfData = None
+
+def conf_data():
+    global ConfData                                     # pylint: disable=W0603
+    if ConfData is None:
+        data = []
+        for i in RotatorAPI.rRot:
+            confi = {
+                s_FldDevName        : 'Alpaca Rotator Simulator',
+                s_FldDevType        : 'Rotator',
+                s_FldUniqId         : "5897B4BC-2A4D-4893-8CC0-6A440D6B2D51"
+                }
+            confi[s_FldDevNum] = i
+            data.append(confi)
+        ConfData = data
+    return ConfData
+
+r_ConfiguredDevices = None
+
+def conf_response():
+    global r_ConfiguredDevices                          # pylint: disable=W0603
+    if r_ConfiguredDevices is None:
+        r_ConfiguredDevices = shr.StaticResponse(conf_data())
+    return r_ConfiguredDevices
 
 @api.route('/v1/configureddevices', methods=['GET'])
 @api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
@@ -168,9 +208,369 @@ for i in RotatorAPI.rRot:
 class configureddevices(Resource):
 
     @api.doc(description='Returns an array of device description objects, providing unique information for each served device, enabling them to be accessed through the Alpaca Device API.')
-    @api.marshal_with(m_ConfiguredDevicesResponse, description='Array of device description objects, providing unique information for each served device, enabling them to be accessed through the Alpaca Device API.', skip_none=True)
+    @api.response(200, 'Array of device description objects, providing unique information for each served device, enabling them to be accessed through the Alpaca Device API.', m_ConfiguredDevicesResponse)
+    @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
+    @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
+    def get(self):
+        return conf_response().reply(shr.params())
+
+# ===============================
+# TRACE (not part of Alpaca spec)
+# ===============================
+
+m_StringListResponse = api.model('StringListResponse',
+                    {   shr.s_FldValue      : fields.List(fields.String(), description='List of string values.', required=True),
+                        shr.s_FldCtId       : fields.Integer(min=0, max=4294967295, description=shr.s_DescCtId),
+                        shr.s_FldStId       : fields.Integer(min=0, max=4294967295, description=shr.s_DescStId),
+                        shr.s_FldErrNum     : fields.Integer(min=0, max=0xFFF, description=shr.s_DescErrNum),
+                        shr.s_FldErrMsg     : fields.String(description=shr.s_DescErrMsg)
+                    })
+
+m_MethodResponse = api.model('MethodResponse',
+                    {   shr.s_FldCtId       : fields.Integer(min=0, max=4294967295, description=shr.s_DescCtId),
+                        shr.s_FldStId       : fields.Integer(min=0, max=4294967295, description=shr.s_DescStId),
+                        shr.s_FldErrNum     : fields.Integer(min=0, max=0xFFF, description=shr.s_DescErrNum),
+                        shr.s_FldErrMsg     : fields.String(description=shr.s_DescErrMsg)
+                    })
+
+# -----
+# Trace
+# -----
+#
+@api.route('/trace', methods=['GET'])
+@api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
+@api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
+class trace(Resource):
+
+    @api.doc(description='Returns the newest entries in the in-memory trace ring, oldest first.')
+    @api.response(200, 'Trace entries', m_StringListResponse)
+    @api.param('Count', 'Number of entries to return, all of them if omitted.', 'query', type='integer')
+    @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
+    @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
+    def get(self):
+        R = shr.PropertyResponse(TraceLog.dump(shr.params().int('Count')), shr.params())
+        return R.reply()
+
+# ----------
+# TraceLevel
+# ----------
+#
+@api.route('/tracelevel', methods=['GET', 'PUT'])
+@api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
+@api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
+class tracelevel(Resource):
+
+    @api.doc(description='Returns the trace level of each module as Module=level.')
+    @api.response(200, 'Trace levels', m_StringListResponse)
+    @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
+    @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
+    def get(self):
+        names = {v: k for k, v in TraceLog.LevelNames.items()}
+        R = shr.PropertyResponse([f'{m}={names[l]}' for m, l in TraceLog.levels().items()], shr.params())
+        return R.reply()
+
+    @api.doc(description='Sets the trace level of a module, or of every module.')
+    @api.response(200, shr.s_DescMthRsp, m_MethodResponse)
+    @api.param('Module', 'Module name, e.g. RotatorDevice, or * for all modules.', 'formData', type='string', default='*')
+    @api.param('Level', 'off, error, info or debug', 'formData', type='string', default='debug', required=True)
+    @api.param(shr.s_FldClId, shr.s_DescClId, 'formData', type='integer', default=1234)
+    @api.param(shr.s_FldCtId, shr.s_DescCtId, 'formData', type='integer', default=1)
+    def put(self):
+        module = shr.params().get('Module', '*') or '*'
+        try:
+            level = TraceLog.parse_level(shr.params().get('Level', ''))
+        except ValueError:
+            R = shr.MethodResponse(shr.params(), ASCOMErrors.InvalidValueException)
+            return R.reply()
+        TraceLog.set_level(module, level)
+        R = shr.MethodResponse(shr.params())
+        return R.reply()
+
+# ====================================
+# TELEMETRY (not part of Alpaca spec)
+# ====================================
+#
+# One hub for the whole server, AsyncAPI streams from it too
+#
+Hub = Telemetry.Hub(RotatorAPI.RotDev.created, config.get('telemetry_hz'), config.get('telemetry_queue'))
+
+#
+# (devices, rate) from the query string, 400 if not valid
+#
+def telemetry_args(prm):
+    try:
+        devices = Telemetry.parse_devices(prm.get('Devices'), RotatorAPI.nRot)
+    except ValueError:
+        return abort(400, 'Devices must be a comma separated list of device numbers')
+    rate = prm.float('Rate')
+    if rate is not None and rate <= 0:
+        return abort(400, 'Rate must be positive')
+    return devices, rate
+
+@api.route('/telemetry', methods=['GET'])
+@api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
+class telemetry(Resource):
+
+    @api.doc(description='Server-Sent Events (text/event-stream). Each <b>telemetry</b> event carries the ' +
+                         'Position, TargetPosition and IsMoving of the devices that changed since the last one, ' +
+                         'keyed by device number, starting with all of them. A client that falls too far behind ' +
+                         'gets a <b>dropped</b> event and the stream ends. Only devices that have been used are reported.')
+    @api.response(200, 'Event stream')
+    @api.param('Devices', 'Comma separated device numbers, all devices if omitted.', 'query', type='string')
+    @api.param('Rate', 'Most events per second, up to the server\'s telemetry_hz.', 'query', type='number')
+    def get(self):
+        devices, rate = telemetry_args(shr.params())
+        return Response(Telemetry.stream(Hub, devices, rate), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# ===============================
+# BATCH (not part of Alpaca spec)
+# ===============================
+#
+# Reads many (device, property) pairs in one request, e.g. a dashboard
+# showing Position, TargetPosition, IsMoving and Connected for every
+# rotator. Each device is read once, with one snapshot(), however many of
+# its properties are asked for, and all of the values come back in one
+# envelope with one ServerTransactionID. A device that is not connected
+# gets NotConnected in its own items, the rest of the batch still succeeds.
+#
+s_FldProperty   = 'Property'
+BatchMax        = 1000                                  # Most items in one request
+
+BatchProps = {                                          # Alpaca property name : RotatorState field
+    'canreverse'        : 'can_reverse',
+    'connected'         : 'connected',
+    'ismoving'          : 'is_moving',
+    'mechanicalposition': 'mechanical_position',
+    'position'          : 'position',
+    'reverse'           : 'reverse',
+    'stepsize'          : 'step_size',
+    'targetposition'    : 'target_position',
+}
+
+m_BatchItem = api.model('BatchItem',
+                    {   s_FldDevNum         : fields.Integer(description='Device number.'),
+                        s_FldProperty       : fields.String(description='Property name, lower case.'),
+                        shr.s_FldValue      : fields.Raw(description='Property value, omitted if ErrorNumber is not 0.'),
+                        shr.s_FldErrNum     : fields.Integer(min=0, max=0xFFF, description=shr.s_DescErrNum),
+                        shr.s_FldErrMsg     : fields.String(description=shr.s_DescErrMsg)
+                    })
+
+m_BatchResponse = api.model('BatchResponse',
+                    {   shr.s_FldValue      : fields.List(fields.Nested(m_BatchItem, skip_none=True)),
+                        shr.s_FldCtId       : fields.Integer(min=0, max=4294967295, description=shr.s_DescCtId),
+                        shr.s_FldStId       : fields.Integer(min=0, max=4294967295, description=shr.s_DescStId),
+                        shr.s_FldErrNum     : fields.Integer(min=0, max=0xFFF, description=shr.s_DescErrNum),
+                        shr.s_FldErrMsg     : fields.String(description=shr.s_DescErrMsg)
+                    })
+
+#
+# Items query parameter, e.g. '0:position,0:ismoving,3:targetposition'.
+# [(devno, property), ...] in the order given, ValueError if not valid.
+#
+def parse_batch(text, count):
+    items = []
+    for pair in (text or '').split(','):
+        if not pair.strip():
+            continue
+        devno, _, name = pair.partition(':')
+        devno = int(devno)
+        name = name.strip().lower()
+        if not 0 <= devno < count or name not in BatchProps:
+            raise ValueError(f'no such device or property: {pair.strip()}')
+        items.append((devno, name))
+    if not items or len(items) > BatchMax:
+        raise ValueError('wrong number of items')
+    return items
+
+#
+# The response for a batch, AsyncAPI uses this too
+#
+def batch_response(prm):
+    try:
+        items = parse_batch(prm.get('Items'), RotatorAPI.nRot)
+    except ValueError:
+        return abort(400, f'Items must be 1 to {BatchMax} comma separated device:property pairs, ' +
+                          f'property one of {", ".join(BatchProps)}')
+    states = {}
+    value = []
+    for devno, name in items:
+        st = states.get(devno)
+        if st is None:
+            st = states[devno] = RotatorAPI.RotDev[devno].snapshot()
+        if st.connected or name == 'connected':
+            value.append({s_FldDevNum: devno, s_FldProperty: name, shr.s_FldValue: getattr(st, BatchProps[name]),
+                          shr.s_FldErrNum: 0, shr.s_FldErrMsg: ''})
+        else:
+            value.append({s_FldDevNum: devno, s_FldProperty: name,
+                          shr.s_FldErrNum: ASCOMErrors.NotConnectedException.Number,
+                          shr.s_FldErrMsg: ASCOMErrors.NotConnectedException.Message})
+    return shr.PropertyResponse(value, prm)
+
+@api.route('/batch', methods=['GET'])
+@api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
+@api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
+class batch(Resource):
+
+    @api.doc(description='Reads several properties of several rotators in one request. Each device is read once, so ' +
+                         'its values are consistent with each other. Items come back in the order asked for, each ' +
+                         'with its own ErrorNumber (e.g. NotConnected), under one ServerTransactionID. ' +
+                         f'Properties: {", ".join(BatchProps)}.')
+    @api.response(200, 'Batch of property values', m_BatchResponse)
+    @api.param('Items', 'Comma separated device:property pairs, e.g. 0:position,0:ismoving,3:targetposition', 'query',
+               type='string', default='0:connected,0:position', required=True)
+    @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
+    @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
+    def get(self):
+        return batch_response(shr.params()).reply()
+
+# ===============================
+# CLOCK (not part of Alpaca spec)
+# ===============================
+#
+# The SimClock that times all motion. A test pipeline can run it faster
+# than real time (Scale 100) or stop it (Scale 0) and step it with
+# /clock/advance, which returns once every event due by then has run, so
+# a following read of position or ismoving sees the moves finished. In
+# discrete-event mode (--sim-mode des) the clock only moves by advance.
+#
+s_FldScale      = 'Scale'
+s_FldElapsed    = 'Elapsed'
+s_FldDiscrete   = 'Discrete'
+
+m_Clock = api.model('Clock',
+                    {   s_FldScale          : fields.Float(description='Simulated seconds per real second, 0 if stepped on demand.'),
+                        s_FldElapsed        : fields.Float(description='Simulated seconds since the server started.'),
+                        s_FldDiscrete       : fields.Boolean(description='Deterministic discrete-event mode.')
+                    })
+
+m_ClockResponse = api.model('ClockResponse',
+                    {   shr.s_FldValue      : fields.Nested(m_Clock),
+                        shr.s_FldCtId       : fields.Integer(min=0, max=4294967295, description=shr.s_DescCtId),
+                        shr.s_FldStId       : fields.Integer(min=0, max=4294967295, description=shr.s_DescStId),
+                        shr.s_FldErrNum     : fields.Integer(min=0, max=0xFFF, description=shr.s_DescErrNum),
+                        shr.s_FldErrMsg     : fields.String(description=shr.s_DescErrMsg)
+                    })
+
+@api.route('/clock', methods=['GET', 'PUT'])
+@api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
+@api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
+class clock(Resource):
+
+    @api.doc(description='Returns the time scale of the simulation clock and the simulated time elapsed.')
+    @api.response(200, 'Clock', m_ClockResponse)
+    @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
+    @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
+    def get(self):
+        R = shr.PropertyResponse({s_FldScale: SimClock.scale(), s_FldElapsed: SimClock.elapsed(),
+                                    s_FldDiscrete: SimClock.Discrete}, shr.params())
+        return R.reply()
+
+    @api.doc(description='Sets the time scale. Moves in progress carry on at the new speed. InvalidOperation in discrete-event mode.')
+    @api.response(200, shr.s_DescMthRsp, m_MethodResponse)
+    @api.param(s_FldScale, 'Simulated seconds per real second, e.g. 100, or 0 to stop the clock and step it with clock/advance.',
+               'formData', type='number', default=1.0, required=True)
+    @api.param(shr.s_FldClId, shr.s_DescClId, 'formData', type='integer', default=1234)
+    @api.param(shr.s_FldCtId, shr.s_DescCtId, 'formData', type='integer', default=1)
+    def put(self):
+        prm = shr.params()
+        if SimClock.Discrete:
+            return shr.MethodResponse(prm, ASCOMErrors.InvalidOperationException).reply()
+        try:
+            SimClock.set_scale(prm.float(s_FldScale))
+        except (TypeError, ValueError):
+            return shr.MethodResponse(prm, ASCOMErrors.InvalidValueException).reply()
+        return shr.MethodResponse(prm).reply()
+
+@api.route('/clock/advance', methods=['PUT'])
+@api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
+@api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
+class clockadvance(Resource):
+
+    @api.doc(description='Moves the simulation clock on and returns when every motion event due by then has run.')
+    @api.response(200, shr.s_DescMthRsp, m_MethodResponse)
+    @api.param('Seconds', 'Simulated seconds to advance by.', 'formData', type='number', default=1.0, required=True)
+    @api.param(shr.s_FldClId, shr.s_DescClId, 'formData', type='integer', default=1234)
+    @api.param(shr.s_FldCtId, shr.s_DescCtId, 'formData', type='integer', default=1)
+    def put(self):
+        prm = shr.params()
+        try:
+            MotionEngine.advance(prm.float('Seconds'))
+        except (TypeError, ValueError):
+            return shr.MethodResponse(prm, ASCOMErrors.InvalidValueException).reply()
+        return shr.MethodResponse(prm).reply()
+
+# =================================
+# CLIENTS (not part of Alpaca spec)
+# =================================
+#
+# Admission counters for each client of the Rotator API seen lately (see
+# Admission), most admitted first. Empty when admission control is off.
+#
+s_FldClientAddr = 'Address'
+
+m_Client = api.model('Client',
+                    {   shr.s_FldClId       : fields.Integer(description='ClientID, 0 if the client is known by its address.'),
+                        s_FldClientAddr     : fields.String(description='Address of a client that sends no ClientID, else empty.'),
+                        'Tokens'            : fields.Float(description='Requests it may make now before the rate limit applies.'),
+                        'Active'            : fields.Integer(description='Requests in progress.'),
+                        'Admitted'          : fields.Integer(description='Requests served.'),
+                        'Limited'           : fields.Integer(description='Requests turned away for going over the rate.'),
+                        'Busy'              : fields.Integer(description='Requests turned away for too many in progress.')
+                    })
+
+m_ClientsResponse = api.model('ClientsResponse',
+                    {   shr.s_FldValue      : fields.List(fields.Nested(m_Client)),
+                        shr.s_FldCtId       : fields.Integer(min=0, max=4294967295, description=shr.s_DescCtId),
+                        shr.s_FldStId       : fields.Integer(min=0, max=4294967295, description=shr.s_DescStId),
+                        shr.s_FldErrNum     : fields.Integer(min=0, max=0xFFF, description=shr.s_DescErrNum),
+                        shr.s_FldErrMsg     : fields.String(description=shr.s_DescErrMsg)
+                    })
+
+@api.route('/clients', methods=['GET'])
+@api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
+@api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
+class clients(Resource):
+
+    @api.doc(description='Per-client admission counters for the Rotator API (see --admit-rate and --admit-concurrent).')
+    @api.response(200, 'Clients', m_ClientsResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
     def get(self):
-        R = shr.PropertyResponse(ConfData, request.args)
-        return vars(R)
+        value = [{shr.s_FldClId: key if isinstance(key, int) else 0,
+                  s_FldClientAddr: '' if isinstance(key, int) else str(key),
+                  'Tokens': round(tokens, 3), 'Active': active, 'Admitted': admitted,
+                  'Limited': limited, 'Busy': busy}
+                 for key, tokens, active, admitted, limited, busy in Admission.Clients.clients()]
+        return shr.PropertyResponse(value, shr.params()).reply()
+
+# ==================================
+# METRICS (not part of Alpaca spec)
+# ==================================
+#
+# Gauges read when scraped
+#
+def moving_count():
+    if RotatorAPI.Backend == 'fleet':
+        return int(RotatorAPI.Fleet.moving_at(SimClock.now()).sum())
+    return sum(1 for _, dev in RotatorAPI.RotDev.created() if dev.snapshot().is_moving)
+
+Metrics.gauge('rotator_devices_moving', 'Rotators moving now.', moving_count)
+Metrics.gauge('rotator_devices_created', 'Rotators used so far.', lambda: len(RotatorAPI.RotDev.created()))
+Metrics.gauge('rotator_engine_pending_events', 'Events waiting in the motion engine.', lambda: MotionEngine.engine().pending)
+Metrics.gauge('rotator_telemetry_subscribers', 'Open telemetry streams.', lambda: Hub.subscribers)
+Metrics.gauge('rotator_telemetry_dropped_total', 'Telemetry streams dropped for falling behind.', lambda: Hub.dropped, 'counter')
+Metrics.gauge('rotator_admission_clients', 'Rotator API clients seen lately.', lambda: len(Admission.Clients))
+Metrics.gauge('rotator_admission_limited_total', 'Requests turned away for going over the client rate.', lambda: Admission.Clients.limited, 'counter')
+Metrics.gauge('rotator_admission_busy_total', 'Requests turned away for too many in progress.', lambda: Admission.Clients.busy, 'counter')
+
+@api.route('/metrics', methods=['GET'])
+@api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
+class metrics(Resource):
+
+    @api.doc(description='Request latency histograms per route and per device, responses per HTTP status, ASCOM ' +
+                         'errors per error number, motion engine lateness, writer lock waits, discovery packets, ' +
+                         'admission rejections and rotator counts, in the Prometheus text format.')
+    @api.response(200, 'Prometheus text exposition format')
+    def get(self):
+        return Response(Metrics.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,225 @@
+# pylint: disable=C0301,C0103,C0111
+# =======
+# METRICS
+# =======
+# Counters and latency histograms for /management/metrics, in the
+# Prometheus text exposition format. Recording is meant to stay on all the
+# time, so it allocates nothing per event: each histogram is a fixed array
+# of bucket counts made once (per route at startup, per device on its first
+# request), and recording is a bisect into the bounds and an increment in
+# place. There is no lock. Two threads incrementing the same bucket at the
+# same instant can lose a count, which is accepted for monitoring.
+#
+# What is recorded, and where:
+#
+#   request()       Latency per route and per device, responses per HTTP
+#                   status (Flask hooks below, AsyncAPI.dispatch)
+#   Errors          ASCOM error responses by error number (shr)
+#   TickLag         How late MotionEngine events run
+#   LockWait        Wait for RotatorDevice / RotatorFleet writer locks
+#   Discovery       Discovery packets received, answered and rate limited
+#
+# Gauges such as the number of moving rotators are read only when scraped,
+# from functions registered with gauge().
+#
+# 18-Oct-2026       1.1 Initial edit
+# 18-Oct-2026       1.1 Per-device latency only for device numbers that exist (set_devices())
+#
+import array
+import bisect
+from threading import Lock
+from time import perf_counter
+
+LatencyBounds = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+TickBounds = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+LockBounds = (0.0, 0.00001, 0.0001, 0.001, 0.01, 0.1)      # 0.0 counts the uncontended ones
+s_Unmatched = '(unmatched)'                             # Route label for a URL with no route
+
+class Histogram(object):
+    """Fixed bucket histogram, counts preallocated"""
+    __slots__ = ('bounds', 'counts', 'total')
+
+    def __init__(self, bounds=LatencyBounds):
+        self.bounds = bounds
+        self.counts = array.array('q', bytes(8 * (len(bounds) + 1)))   # Last one is +Inf
+        self.total = array.array('d', [0.0])
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total[0] += value
+
+class Counter(object):
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = array.array('q', [0])
+
+    def inc(self, n=1):
+        self.value[0] += n
+
+# ----------------
+# The measurements
+# ----------------
+Routes = {}                                             # Flask rule : Histogram
+Devices = {}                                            # Device number : Histogram
+DeviceCount = 0                                         # Device numbers below this get a histogram
+Status = array.array('q', bytes(8 * 600))               # Responses by HTTP status
+Errors = array.array('q', bytes(8 * 0x1000))            # Responses by ASCOM error number
+TickLag = Histogram(TickBounds)
+LockWait = Histogram(LockBounds)
+Discovery = Counter()
+DiscoveryReplies = Counter()
+DiscoveryLimited = Counter()
+_gauges = []                                            # (name, help, type, function)
+_new_lock = Lock()                                      # Only for making a new histogram
+
+def _histogram(table, key):
+    with _new_lock:
+        return table.setdefault(key, Histogram())
+
+#
+# Make the per-route histograms up front, e.g. from the Flask URL map
+#
+def add_routes(rules):
+    for rule in rules:
+        _histogram(Routes, rule)
+
+#
+# The number of devices. Requests for device numbers outside that range
+# (answered 400) count only in their route's histogram, so no client can
+# make per-device histograms without end.
+#
+def set_devices(count):
+    global DeviceCount                                  # pylint: disable=W0603
+    DeviceCount = count
+
+#
+# One finished request. 'route' is the Flask rule, e.g.
+# /api/v1/rotator/<int:DeviceNumber>/position, devno None if not a device.
+#
+def request(route, devno, status, seconds):
+    (Routes.get(route) or _histogram(Routes, route)).observe(seconds)
+    if devno is not None and 0 <= devno < DeviceCount:
+        (Devices.get(devno) or _histogram(Devices, devno)).observe(seconds)
+    Status[status] += 1
+
+def error(number):
+    Errors[number] += 1
+
+def gauge(name, help_text, fn, kind='gauge'):
+    _gauges.append((name, help_text, kind, fn))
+
+# -----------
+# Writer lock
+# -----------
+# Drop-in for threading.Lock that records how long acquire() waited.
+#
+class TimedLock(object):
+    __slots__ = ('_lock',)
+
+    def __init__(self):
+        self._lock = Lock()
+
+    def acquire(self):
+        if self._lock.acquire(False):
+            LockWait.observe(0.0)
+            return True
+        t = perf_counter()
+        self._lock.acquire()
+        LockWait.observe(perf_counter() - t)
+        return True
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+# -----------
+# Flask hooks
+# -----------
+#
+def flask_hooks(app):
+    from flask import g, request as flask_request        # pylint: disable=C0415
+
+    @app.before_request
+    def start_timer():
+        g.metrics_t0 = perf_counter()
+
+    @app.after_request
+    def record(response):
+        t0 = g.get('metrics_t0')
+        if t0 is not None:
+            rule = flask_request.url_rule
+            args = flask_request.view_args
+            request(rule.rule if rule is not None else s_Unmatched,
+                    args.get('DeviceNumber') if args else None,
+                    response.status_code, perf_counter() - t0)
+        return response
+
+    add_routes(r.rule for r in app.url_map.iter_rules())
+
+# ----------------------
+# Prometheus text format
+# ----------------------
+#
+def _write_histogram(out, name, labels, h):
+    sep = labels + ',' if labels else ''
+    tail = f'{{{labels}}}' if labels else ''
+    cum = 0
+    for bound, n in zip(h.bounds, h.counts):
+        cum += n
+        out.append(f'{name}_bucket{{{sep}le="{bound}"}} {cum}')
+    cum += h.counts[-1]
+    out.append(f'{name}_bucket{{{sep}le="+Inf"}} {cum}')
+    out.append(f'{name}_sum{tail} {h.total[0]}')
+    out.append(f'{name}_count{tail} {cum}')
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+def render():
+    out = []
+    out.append('# HELP rotator_request_duration_seconds Request latency by route.')
+    out.append('# TYPE rotator_request_duration_seconds histogram')
+    for route, h in sorted(Routes.items()):
+        if any(h.counts):
+            _write_histogram(out, 'rotator_request_duration_seconds', f'route="{_label(route)}"', h)
+    out.append('# HELP rotator_device_request_duration_seconds Request latency by device number.')
+    out.append('# TYPE rotator_device_request_duration_seconds histogram')
+    for devno, h in sorted(Devices.items()):
+        _write_histogram(out, 'rotator_device_request_duration_seconds', f'device="{devno}"', h)
+    out.append('# HELP rotator_responses_total Responses by HTTP status.')
+    out.append('# TYPE rotator_responses_total counter')
+    for code, n in enumerate(Status):
+        if n:
+            out.append(f'rotator_responses_total{{code="{code}"}} {n}')
+    out.append('# HELP rotator_ascom_errors_total Alpaca responses with a non-zero ErrorNumber, by number.')
+    out.append('# TYPE rotator_ascom_errors_total counter')
+    for number, n in enumerate(Errors):
+        if n:
+            out.append(f'rotator_ascom_errors_total{{number="0x{number:03X}"}} {n}')
+    out.append('# HELP rotator_engine_tick_lag_seconds How late motion engine events ran.')
+    out.append('# TYPE rotator_engine_tick_lag_seconds histogram')
+    _write_histogram(out, 'rotator_engine_tick_lag_seconds', '', TickLag)
+    out.append('# HELP rotator_lock_wait_seconds Wait to acquire a rotator writer lock.')
+    out.append('# TYPE rotator_lock_wait_seconds histogram')
+    _write_histogram(out, 'rotator_lock_wait_seconds', '', LockWait)
+    out.append('# HELP rotator_discovery_packets_total Discovery packets received.')
+    out.append('# TYPE rotator_discovery_packets_total counter')
+    out.append(f'rotator_discovery_packets_total {Discovery.value[0]}')
+    out.append('# HELP rotator_discovery_replies_total Discovery responses sent.')
+    out.append('# TYPE rotator_discovery_replies_total counter')
+    out.append(f'rotator_discovery_replies_total {DiscoveryReplies.value[0]}')
+    out.append('# HELP rotator_discovery_limited_total Discovery packets not answered, source over its rate.')
+    out.append('# TYPE rotator_discovery_limited_total counter')
+    out.append(f'rotator_discovery_limited_total {DiscoveryLimited.value[0]}')
+    for name, help_text, kind, fn in _gauges:
+        out.append(f'# HELP {name} {help_text}')
+        out.append(f'# TYPE {name} {kind}')
+        out.append(f'{name} {fn()}')
+    out.append('')
+    return '\n'.join(out)
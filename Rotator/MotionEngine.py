@@ -0,0 +1,161 @@
+# pylint: disable=C0301,C0103,C0111
+# =============
+# MOTION ENGINE
+# =============
+# One thread drives the timed events for every RotatorDevice. Pending events
+# live in a heap ordered by due time, so the cost of a step is a heap push/pop
+# instead of creating and tearing down a threading.Timer (an OS thread) for
+# every step of every rotator.
+#
+# 18-Oct-2026       1.1 Initial edit, replaces the Timer-per-step engine.
+# 18-Oct-2026       1.1 Event failures go to TraceLog
+# 18-Oct-2026       1.1 Event lateness recorded in Metrics.TickLag
+# 18-Oct-2026       1.1 Due times are on the SimClock, settle()
+# 18-Oct-2026       1.1 Discrete-event mode, run_until() and advance()
+#
+import heapq
+import itertools
+from threading import Thread, Condition, Lock
+import Metrics
+import SimClock
+import TraceLog
+
+_trc = TraceLog.tracer('MotionEngine')
+
+class MotionEngine(Thread):
+    """Single scheduler thread for the timed events of all rotators"""
+
+    def __init__(self):
+        Thread.__init__(self, name='MotionEngine')
+        self._cv = Condition()
+        self._heap = []                                 # [due, seq, callback, args]
+        self._seq = itertools.count()                   # Tie-breaker keeps FIFO order for equal due times
+        self._busy = False                              # Running a callback
+        self._des_lock = Lock()                         # One run_until() at a time
+        self.daemon = True
+        SimClock.on_change(self._clock_changed)
+        self.start()
+
+    #
+    # Schedule callback(*args) at SimClock time 'due'. Returns a handle
+    # that can be passed to cancel().
+    #
+    def schedule_at(self, due, callback, *args):
+        entry = [due, next(self._seq), callback, args]
+        with self._cv:
+            heapq.heappush(self._heap, entry)
+            if self._heap[0] is entry:                  # New earliest event, wake the engine
+                self._cv.notify()
+        return entry
+
+    def schedule(self, delay, callback, *args):
+        return self.schedule_at(SimClock.now() + delay, callback, *args)
+
+    #
+    # Lazy deletion, the entry is skipped when it reaches the top of the heap
+    #
+    def cancel(self, entry):
+        if entry is not None:
+            entry[2] = None
+
+    @property
+    def pending(self):
+        with self._cv:
+            return len(self._heap)
+
+    def _clock_changed(self):
+        with self._cv:
+            self._cv.notify_all()
+
+    #
+    # Wait until every event due by now on the SimClock has run, e.g. after
+    # SimClock.advance(). Events that those schedule for later are left.
+    #
+    def settle(self, timeout=10.0):
+        if SimClock.Discrete:
+            return True                                 # Nothing runs behind the caller's back
+        now = SimClock.now()
+        with self._cv:
+            return self._cv.wait_for(lambda: not self._busy and not (self._heap and self._heap[0][0] <= now), timeout)
+
+    def run(self):
+        while True:
+            with self._cv:
+                self._busy = False
+                while True:
+                    if SimClock.Discrete:               # run_until() does the work
+                        self._cv.wait()
+                        continue
+                    if not self._heap:
+                        self._cv.notify_all()           # Anyone in settle()
+                        self._cv.wait()
+                        continue
+                    due = self._heap[0][0]
+                    now = SimClock.now()
+                    if due > now:
+                        self._cv.notify_all()
+                        self._cv.wait(SimClock.real_delay(due))     # None (clock stopped) until it changes
+                        continue
+                    entry = heapq.heappop(self._heap)
+                    if entry[2] is not None:
+                        scale = SimClock.scale()
+                        Metrics.TickLag.observe((now - due) / scale if scale else 0.0)
+                        self._busy = True
+                        break
+            _, _, callback, args = entry
+            try:
+                callback(*args)
+            except Exception as ex:                     # pylint: disable=W0703
+                _trc.error(f'event failed: {ex!r}')
+
+    #
+    # Discrete-event mode. Run every event due up to SimClock time 't' on
+    # the caller's thread, earliest first (FIFO for equal due times), with
+    # the clock set to each event's due time as it runs, including events
+    # that those schedule. Then leave the clock at 't'. The same calls in
+    # the same order always give the same results.
+    #
+    def run_until(self, t):
+        with self._des_lock:
+            while True:
+                with self._cv:
+                    if not self._heap or self._heap[0][0] > t:
+                        break
+                    due, _, callback, args = heapq.heappop(self._heap)
+                if callback is None:
+                    continue
+                SimClock.jump_to(due)
+                try:
+                    callback(*args)
+                except Exception as ex:                 # pylint: disable=W0703
+                    _trc.error(f'event failed: {ex!r}')
+            SimClock.jump_to(t)
+
+#
+# Move the SimClock on by 'seconds' and return when every event due by
+# then has run, in whichever mode the clock is.
+#
+def advance(seconds):
+    if SimClock.Discrete:
+        if not 0.0 <= seconds < float('inf'):
+            raise ValueError('cannot go back in time')
+        engine().run_until(SimClock.now() + seconds)
+    else:
+        SimClock.advance(seconds)
+        engine().settle()
+
+# ---------------------------------------
+# The one engine shared by all the devices
+# ---------------------------------------
+# Started on first use so that importing this module does not start a thread.
+#
+_engine = None
+_engine_lock = Lock()
+
+def engine():
+    global _engine                                      # pylint: disable=W0603
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = MotionEngine()
+    return _engine
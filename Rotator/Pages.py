@@ -0,0 +1,97 @@
+# pylint: disable=C0301,C0103,C0111
+# ==========
+# PAGE CACHE
+# ==========
+# The home page and the GET setup pages only change when the device count
+# (fixed at startup) or a device's settings change, so each is rendered
+# once per (page, settings version) and kept. Browsers get a strong ETag
+# and Cache-Control no-cache, so a refresh is a 304 with no body and no
+# Jinja render while nothing has changed.
+#
+# The setup forms carry a CSRF token, which belongs to the browser's
+# session. It is cut out of the cached page (s_CsrfMark) and put back on
+# each hit. So that the bytes and the ETag stay the same for a session,
+# one token is issued per session for half of WTF_CSRF_TIME_LIMIT and
+# kept in the session, then a new one. A page with flashed messages
+# waiting is rendered the old way.
+#
+# Flask-WTF is only imported for a page with a form, so the home page does
+# not need it (see the fast profile in config.py).
+#
+# 18-Oct-2026       1.1 Initial edit, moved out of SetupAPI
+#
+import collections
+import hashlib
+from threading import Lock
+from time import time
+from flask import make_response, request, session, current_app
+
+s_CsrfMark = '\x00csrf\x00'
+s_SessPageCsrf = 'page_csrf'                            # Session key, [period, token]
+PageCacheMax = 256                                      # Pages kept, least recently used go first
+
+class PageCache(object):
+    """Rendered pages by key and version, least recently used dropped"""
+
+    def __init__(self, size=PageCacheMax):
+        self.size = size
+        self._pages = collections.OrderedDict()         # key : (version, html, etag)
+        self._lock = Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            page = self._pages.get(key)
+            if page is None or page[0] != version:
+                return None
+            self._pages.move_to_end(key)
+            return page
+
+    def put(self, key, version, html):
+        page = (version, html, hashlib.sha1(html.encode()).hexdigest()[:20])
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.size:
+                self._pages.popitem(last=False)
+        return page
+
+Cache = PageCache()
+
+def _page_csrf():
+    from flask_wtf.csrf import generate_csrf            # pylint: disable=C0415
+    limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600) or 3600
+    period = int(time() // (limit / 2))
+    held = session.get(s_SessPageCsrf)
+    if not held or held[0] != period:
+        held = session[s_SessPageCsrf] = [period, generate_csrf()]
+    return held[1]
+
+#
+# The response for a GET page, from the cache if it is there for this
+# version. 'render' renders it (a str), 'form' is True if it has a CSRF
+# token in it.
+#
+def cached_page(key, version, render, form=False):
+    if session.get('_flashes'):
+        response = make_response(render())
+        response.headers['Content-Type'] = 'text/html'
+        return response
+    page = Cache.get(key, version)
+    if page is None:
+        html = render()
+        if form:
+            from flask_wtf.csrf import generate_csrf    # pylint: disable=C0415
+            html = html.replace(generate_csrf(), s_CsrfMark)    # The token this request rendered
+        page = Cache.put(key, version, html)
+    _, html, etag = page
+    if form:
+        token = _page_csrf()
+        etag += '-' + hashlib.sha1(token.encode()).hexdigest()[:12]
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        response = make_response(html.replace(s_CsrfMark, token) if form else html)
+        response.headers['Content-Type'] = 'text/html'
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
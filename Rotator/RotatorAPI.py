@@ -7,23 +7,83 @@
 # 13-Oct-2021   rbd 0.9 Linting with some messages disabled, no docstrings
 # 18-Oct-2021   rbd 0.9 'interfaceversion' returns an integer, add model
 #                   m_IntegerResponse
-
-from flask import Blueprint, request, abort
+# 18-Oct-2026       1.1 Optional NumPy fleet backend, ROTATOR_BACKEND=fleet
+# 18-Oct-2026       1.1 Device count from config, devices created on first use
+# 18-Oct-2026       1.1 Handlers read one lock-free RotatorDevice.snapshot() per request
+# 18-Oct-2026       1.1 Static properties return pre-encoded shr.StaticResponse bytes
+# 18-Oct-2026       1.1 All handlers return shr-encoded bytes, models are for Swagger only
+# 18-Oct-2026       1.1 Request parameters come from shr.params(), indexed once per request
+# 18-Oct-2026       1.1 WaitForMove long-poll action, supportedactions lists it
+# 18-Oct-2026       1.1 IRotatorV4: devicestate, connect, disconnect, connecting, and the V3
+#                       mechanicalposition, sync, movemechanical. interfaceversion is 4.
+# 18-Oct-2026       1.1 DeviceState TimeStamp follows the SimClock
+# 18-Oct-2026       1.1 No Swagger UI unless the swagger setting is on (see config)
+# 18-Oct-2026       1.1 Per-client admission control (see Admission)
+# 18-Oct-2026       1.1 Metrics told the device count, per-device latency only for those
+# 18-Oct-2026       1.1 At most WaitersMax WaitForMove calls wait at once on the Flask servers
+
+from datetime import datetime, timezone
+from threading import Lock, Event
+from flask import Blueprint, abort
 from flask_restx import Api, Resource, fields
 import ASCOMErrors                                      # All Alpaca Devices
 import shr
+import config
 import RotatorDevice                                    # Emulates a physical rotator
+import SimClock
+import Admission
+import Metrics
 
 #
-# Simulate nRot rotators
+# Simulate nRot rotators (see config for --devices and friends)
 # ------
-nRot = 4
+nRot = config.get('devices')
 hRot = nRot - 1                                         # High device number
 #-------
-RotDev = [None] * nRot
 rRot = range(0, nRot)
-for i in rRot:
-    RotDev[i] = RotatorDevice.RotatorDevice()             # Start it up now
+Metrics.set_devices(nRot)                               # Per-device latency for these only
+
+#
+# Backend: 'object' is one RotatorDevice per rotator, 'fleet' keeps all
+# of the rotators in NumPy arrays (see RotatorFleet) for very large counts.
+#
+Backend = config.get('backend')
+if Backend == 'fleet':
+    import RotatorFleet
+    Fleet = RotatorFleet.RotatorFleet(nRot)
+
+#
+# Devices are created the first time a request touches their number, so
+# startup time and idle memory stay flat for very large device counts.
+#
+class LazyDevices(object):
+    def __init__(self, count):
+        self._devs = {}
+        self._count = count
+        self._lock = Lock()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, devno):
+        dev = self._devs.get(devno)
+        if dev is None:
+            if not 0 <= devno < self._count:
+                raise IndexError(devno)
+            with self._lock:
+                dev = self._devs.get(devno)
+                if dev is None:
+                    if Backend == 'fleet':
+                        dev = Fleet.device(devno)
+                    else:
+                        dev = RotatorDevice.RotatorDevice()
+                    self._devs[devno] = dev
+        return dev
+
+    def created(self):
+        return list(self._devs.items())
+
+RotDev = LazyDevices(nRot)
 
 #
 # Blueprint to create a URL prefix for the rotator API
@@ -31,12 +91,14 @@ for i in rRot:
 rot_blueprint = Blueprint('Rotator', __name__,
                       url_prefix='/api/v1/rotator',
                       static_folder='static')
+Admission.flask_hooks(rot_blueprint)                    # Per-client rate and concurrency limits, if set
 
 #
 # Set up the  Flask-RESTX api for Rotator and use the above
 # blueprint to establish the endpoint prefix.
 #
 api = Api(default='rotator',
+            doc='/' if config.get('swagger') == 'on' else False,
             default_label='<h2>ASCOM Alpaca API for Rotator Devices: Base URL = <tt>/api/v1/rotator',
             contact='Bob Denny, DC-3 Dreams, SP',
             contact_email='rdenny@dc3.com',
@@ -111,6 +173,102 @@ m_MethodResponse = api.model('MethodResponse',
                         shr.s_FldErrMsg     : fields.String(description=shr.s_DescErrMsg)
                     })
 
+m_StateValue = api.model('StateValue',
+                    {   'Name'              : fields.String(description='Property name.'),
+                        shr.s_FldValue      : fields.Raw(description='Property value.')
+                    })
+
+m_DeviceStateResponse = api.model('DeviceStateResponse',
+                    {   shr.s_FldValue      : fields.List(fields.Nested(m_StateValue), description='Operational properties.', required=True),
+                        shr.s_FldCtId       : fields.Integer(min=0, max=4294967295, description=shr.s_DescCtId),
+                        shr.s_FldStId       : fields.Integer(min=0, max=4294967295, description=shr.s_DescStId),
+                        shr.s_FldErrNum     : fields.Integer(min=0, max=0xFFF, description=shr.s_DescErrNum),
+                        shr.s_FldErrMsg     : fields.String(description=shr.s_DescErrMsg)
+                    })
+
+# =======
+# Actions
+# =======
+# WaitForMove is a long poll for the end of a move, so clients need not
+# spin on IsMoving. Parameters is the timeout in seconds (default 30, at
+# most 300). The response Value is "true" once the rotator has stopped
+# (at once if it was not moving) or "false" if the timeout ran out first.
+# The waiter is woken by RotatorDevice.notify_when_idle(), nothing polls.
+#
+# On the Flask servers each waiter holds one of the --pool threads (or
+# greenlets), so at most WaitersMax, half the pool, wait at once. The rest
+# are answered InvalidOperation (0x40B) at once, and the other half of the
+# pool stays free for other requests, Halt among them. AsyncAPI waits on
+# its event loop, which costs no thread, and has no such limit.
+#
+s_ActWaitForMove = 'WaitForMove'
+Actions = [s_ActWaitForMove]
+WaitDefault = 30.0
+WaitMax = 300.0
+WaitersMax = max(1, config.get('pool') // 2)
+_waiters = 0                                            # Flask WaitForMove calls waiting now
+_waiters_lock = Lock()
+
+#
+# Timeout from the WaitForMove Parameters, None if it is not valid
+#
+def wait_timeout(prm):
+    val = prm.get('Parameters', '').strip()
+    if not val:
+        return WaitDefault
+    try:
+        val = float(val)
+    except ValueError:
+        return None
+    return val if 0 <= val <= WaitMax else None
+
+#
+# Everything up to the wait. Returns (device, timeout, None) if the caller
+# should wait, else (None, None, response).
+#
+def start_action(devno, prm):
+    if prm.get('Action', '').lower() != s_ActWaitForMove.lower():
+        return None, None, shr.MethodResponse(prm, ASCOMErrors.ActionNotImplementedException)
+    dev = RotDev[devno]
+    if not dev.connected:
+        return None, None, shr.MethodResponse(prm, ASCOMErrors.NotConnectedException)
+    timeout = wait_timeout(prm)
+    if timeout is None:
+        return None, None, shr.MethodResponse(prm, ASCOMErrors.InvalidValueException)
+    return dev, timeout, None
+
+def wait_response(dev, prm):
+    return shr.PropertyResponse('false' if dev.snapshot().is_moving else 'true', prm)
+
+# ===========
+# DeviceState
+# ===========
+# Every operational property from one snapshot(), so a client can poll
+# one endpoint instead of three or four. TimeStamp is when the snapshot
+# was taken, UTC ISO 8601.
+#
+def device_state(st):
+    stamp = datetime.fromtimestamp(SimClock.wall(st.time), timezone.utc)
+    return [{'Name': 'IsMoving', shr.s_FldValue: st.is_moving},
+            {'Name': 'MechanicalPosition', shr.s_FldValue: st.mechanical_position},
+            {'Name': 'Position', shr.s_FldValue: st.position},
+            {'Name': 'TargetPosition', shr.s_FldValue: st.target_position},
+            {'Name': 'TimeStamp', shr.s_FldValue: stamp.strftime('%Y-%m-%dT%H:%M:%S.%fZ')}]
+
+# ==========================
+# Pre-encoded static responses
+# ==========================
+# Only the transaction IDs change from one request to the next (see
+# shr.StaticResponse), so these are encoded once here.
+#
+r_Description       = shr.StaticResponse('Simulated Rotator implemented in Python.')
+r_DriverInfo        = shr.StaticResponse('ASCOM Alpaca driver for a simulated Rotator. Experimental V' + shr.m_DriverVersion + ' (Python)')
+r_DriverVersion     = shr.StaticResponse(shr.m_DriverVersion)
+r_InterfaceVersion  = shr.StaticResponse(4)
+r_Name              = shr.StaticResponse('Rotator Simulator')
+r_SupportedActions  = shr.StaticResponse(Actions)
+r_Connecting        = shr.StaticResponse(False)
+
 # ============================
 # ALPACA ROTATOR API ENDPOINTS
 # ============================
@@ -127,8 +285,10 @@ m_MethodResponse = api.model('MethodResponse',
 @api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
 class action(Resource):
 
-    @api.doc(description='Invokes the specified device-specific action.')
-    @api.marshal_with(m_MethodResponse, description=shr.s_DescMthRsp, skip_none=True)
+    @api.doc(description='Invokes the specified device-specific action. <b>WaitForMove</b> returns "true" when the ' +
+                         'rotator stops, or "false" if <b>Parameters</b> seconds (default 30, max 300) pass first. At most ' +
+                         'half of --pool calls wait at once, others get InvalidOperation (0x40B) at once.')
+    @api.response(200, shr.s_DescGetRsp, m_StringResponse)
     @api.param('Action', 'A well known name that represents the action to be carried out.', 'formData', type='string', required=True)
     @api.param('Parameters', 'List of parameters or empty string if none are required.', 'formData', type='string', default='', required=True)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'formData', type='integer', default=1234)
@@ -137,8 +297,24 @@ class action(Resource):
         #?# global connected
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        R = shr.MethodResponse(request.form, ASCOMErrors.NotImplementedException)
-        return vars(R)
+        global _waiters                                 # pylint: disable=W0603
+        dev, timeout, R = start_action(DeviceNumber, shr.params())
+        if R is not None:
+            return R.reply()
+        with _waiters_lock:
+            if _waiters >= WaitersMax:
+                return shr.MethodResponse(shr.params(), ASCOMErrors.InvalidOperationException).reply()
+            _waiters += 1
+        try:
+            ev = Event()
+            if dev.notify_when_idle(ev.set):
+                ev.wait(timeout)
+                dev.cancel_notify(ev.set)
+        finally:
+            with _waiters_lock:
+                _waiters -= 1
+        R = wait_response(dev, shr.params())
+        return R.reply()
 
 # ------------
 # CommandBlind
@@ -152,7 +328,7 @@ class commandblind(Resource):
 
     @api.doc(description='Transmits an arbitrary string to the device and does not wait for a response. ' +
                         'Optionally, protocol framing characters may be added to the string before transmission.')
-    @api.marshal_with(m_MethodResponse, description=shr.s_DescMthRsp, skip_none=True)
+    @api.response(200, shr.s_DescMthRsp, m_MethodResponse)
     @api.param('Command', 'The literal command string to be transmitted.', 'formData', type='string', required=True)
     @api.param('Raw', 'If set to true the string is transmitted \'as-is\', ' +
                       'if set to false then protocol framing characters may be added prior ' +
@@ -163,8 +339,8 @@ class commandblind(Resource):
         #?# global connected
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        R = shr.MethodResponse(request.form, ASCOMErrors.NotImplementedException)
-        return vars(R)
+        R = shr.MethodResponse(shr.params(), ASCOMErrors.NotImplementedException)
+        return R.reply()
 
 
 # -----------
@@ -179,7 +355,7 @@ class commandbool(Resource):
 
     @api.doc(description='Transmits an arbitrary string to the device and waits for a boolean response. ' +
                         'Optionally, protocol framing characters may be added to the string before transmission.')
-    @api.marshal_with(m_MethodResponse, description=shr.s_DescMthRsp, skip_none=True)
+    @api.response(200, shr.s_DescMthRsp, m_MethodResponse)
     @api.param('Command', 'The literal command string to be transmitted.', 'formData', type='string', required=True)
     @api.param('Raw', 'If set to true the string is transmitted \'as-is\', ' +
                       'if set to false then protocol framing characters may be added prior ' +
@@ -189,8 +365,8 @@ class commandbool(Resource):
     def put(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        R = shr.MethodResponse(request.form, ASCOMErrors.NotImplementedException)
-        return vars(R)
+        R = shr.MethodResponse(shr.params(), ASCOMErrors.NotImplementedException)
+        return R.reply()
 
 
 # -------------
@@ -205,7 +381,7 @@ class commandstring(Resource):
 
     @api.doc(description='Transmits an arbitrary string to the device and waits for a string response. ' +
                         'Optionally, protocol framing characters may be added to the string before transmission.')
-    @api.marshal_with(m_MethodResponse, description=shr.s_DescMthRsp, skip_none=True)
+    @api.response(200, shr.s_DescMthRsp, m_MethodResponse)
     @api.param('Command', 'The literal command string to be transmitted.', 'formData', type='string', required=True)
     @api.param('Raw', 'If set to true the string is transmitted \'as-is\', ' +
                       'if set to false then protocol framing characters may be added prior ' +
@@ -215,8 +391,8 @@ class commandstring(Resource):
     def put(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        R = shr.MethodResponse(request.form, ASCOMErrors.NotImplementedException)
-        return vars(R)
+        R = shr.MethodResponse(shr.params(), ASCOMErrors.NotImplementedException)
+        return R.reply()
 
 
 # ---------
@@ -230,19 +406,19 @@ class commandstring(Resource):
 class connected(Resource):
 
     @api.doc(description='Retrieves the connected state of the Rotator.')
-    @api.marshal_with(m_BoolResponse, description=shr.s_DescGetRsp, skip_none=True)
+    @api.response(200, shr.s_DescGetRsp, m_BoolResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default=1234)
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default=1)
     def get(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
         devno = DeviceNumber                                              # Used later for multi-device (typ.)
-        cid = shr.get_args_caseless(shr.s_FldClId, request.args, 1234)    # Used if need to ident the Client (typ.)
-        R = shr.PropertyResponse(RotDev[DeviceNumber].connected, request.args)
-        return vars(R)
+        cid = shr.params().get(shr.s_FldClId, 1234)    # Used if need to ident the Client (typ.)
+        R = shr.PropertyResponse(RotDev[DeviceNumber].connected, shr.params())
+        return R.reply()
 
     @api.doc(description='Sets the connected state of the Rotator.')
-    @api.marshal_with(m_MethodResponse, description=shr.s_DescMthRsp, skip_none=True)
+    @api.response(200, shr.s_DescMthRsp, m_MethodResponse)
     @api.param('Connected', 'Set True to connect to the device hardware. Set False to ' +
                             'disconnect from the device hardware.',
                             'formData', type='boolean', default=False, required=True)
@@ -252,10 +428,101 @@ class connected(Resource):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
         devno = DeviceNumber
-        cid = shr.get_form_caseless(shr.s_FldClId, request.form, 1234)
-        RotDev[DeviceNumber].connected = (shr.get_form_caseless('Connected', request.form, 'false').lower() == 'true')
-        R = shr.MethodResponse(request.form)
-        return vars(R)
+        cid = shr.params().get(shr.s_FldClId, 1234)
+        RotDev[DeviceNumber].connected = shr.params().bool('Connected')
+        R = shr.MethodResponse(shr.params())
+        return R.reply()
+
+
+# -------
+# Connect
+# -------
+# Connecting a simulated rotator is immediate, so Connecting is always
+# False by the time a client can ask.
+#
+@api.route('/<int:DeviceNumber>/connect', methods=['PUT'])
+@api.param(shr.s_FldDevNum, shr.s_DescDevNum, 'path', type='integer', default='0')
+@api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
+@api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
+class connect(Resource):
+
+    @api.doc(description='Connects to the device asynchronously. Completion is signalled by <b>Connecting</b> becoming False.')
+    @api.response(200, shr.s_DescMthRsp, m_MethodResponse)
+    @api.param(shr.s_FldClId, shr.s_DescClId, 'formData', type='integer', default=1234)
+    @api.param(shr.s_FldCtId, shr.s_DescCtId, 'formData', type='integer', default=1)
+    def put(self, DeviceNumber):
+        if not DeviceNumber in rRot:
+            abort(400, shr.s_Resp400NoDevNo)
+        RotDev[DeviceNumber].connected = True
+        R = shr.MethodResponse(shr.params())
+        return R.reply()
+
+
+# ----------
+# Connecting
+# ----------
+#
+@api.route('/<int:DeviceNumber>/connecting', methods=['GET'])
+@api.param(shr.s_FldDevNum, shr.s_DescDevNum, 'path', type='integer', default='0')
+@api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
+@api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
+class connecting(Resource):
+
+    @api.doc(description='True while an asynchronous <b>Connect()</b> or <b>Disconnect()</b> is in progress.')
+    @api.response(200, shr.s_DescGetRsp, m_BoolResponse)
+    @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
+    @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
+    def get(self, DeviceNumber):
+        if not DeviceNumber in rRot:
+            abort(400, shr.s_Resp400NoDevNo)
+        return r_Connecting.reply(shr.params())
+
+
+# -----------
+# DeviceState
+# -----------
+#
+@api.route('/<int:DeviceNumber>/devicestate', methods=['GET'])
+@api.param(shr.s_FldDevNum, shr.s_DescDevNum, 'path', type='integer', default='0')
+@api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
+@api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
+class devicestate(Resource):
+
+    @api.doc(description='IsMoving, MechanicalPosition, Position, TargetPosition and TimeStamp, all read at the same instant.')
+    @api.response(200, shr.s_DescGetRsp, m_DeviceStateResponse)
+    @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
+    @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
+    def get(self, DeviceNumber):
+        if not DeviceNumber in rRot:
+            abort(400, shr.s_Resp400NoDevNo)
+        st = RotDev[DeviceNumber].snapshot()
+        if not st.connected:
+            R = shr.PropertyResponse(None, shr.params(), ASCOMErrors.NotConnectedException)
+            return R.reply()
+        R = shr.PropertyResponse(device_state(st), shr.params())
+        return R.reply()
+
+
+# ----------
+# Disconnect
+# ----------
+#
+@api.route('/<int:DeviceNumber>/disconnect', methods=['PUT'])
+@api.param(shr.s_FldDevNum, shr.s_DescDevNum, 'path', type='integer', default='0')
+@api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
+@api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
+class disconnect(Resource):
+
+    @api.doc(description='Disconnects from the device asynchronously. Completion is signalled by <b>Connecting</b> becoming False.')
+    @api.response(200, shr.s_DescMthRsp, m_MethodResponse)
+    @api.param(shr.s_FldClId, shr.s_DescClId, 'formData', type='integer', default=1234)
+    @api.param(shr.s_FldCtId, shr.s_DescCtId, 'formData', type='integer', default=1)
+    def put(self, DeviceNumber):
+        if not DeviceNumber in rRot:
+            abort(400, shr.s_Resp400NoDevNo)
+        RotDev[DeviceNumber].connected = False
+        R = shr.MethodResponse(shr.params())
+        return R.reply()
 
 # -----------
 # Description
@@ -268,15 +535,13 @@ class connected(Resource):
 class description(Resource):
 
     @api.doc(description='Returns a description of the device, such as manufacturer and modelnumber. Any ASCII characters may be used.')
-    @api.marshal_with(m_StringResponse, description=shr.s_DescGetRsp, skip_none=True)
+    @api.response(200, shr.s_DescGetRsp, m_StringResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
     def get(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        desc = 'Simulated Rotator implemented in Python.'
-        R = shr.PropertyResponse(desc, request.args)
-        return vars(R)
+        return r_Description.reply(shr.params())
 
 
 # ----------
@@ -290,15 +555,13 @@ class description(Resource):
 class driverinfo(Resource):
 
     @api.doc(description='Descriptive and version information about this ASCOM driver.')
-    @api.marshal_with(m_StringResponse, description=shr.s_DescGetRsp, skip_none=True)
+    @api.response(200, shr.s_DescGetRsp, m_StringResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
     def get(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        desc = 'ASCOM Alpaca driver for a simulated Rotator. Experimental V' + shr.m_DriverVersion + ' (Python)'
-        R = shr.PropertyResponse(desc, request.args)
-        return vars(R)
+        return r_DriverInfo.reply(shr.params())
 
 
 # -------------
@@ -312,14 +575,13 @@ class driverinfo(Resource):
 class driverversion(Resource):
 
     @api.doc(description='A string containing only the major and minor version of the driver.')
-    @api.marshal_with(m_StringResponse, description=shr.s_DescGetRsp, skip_none=True)
+    @api.response(200, shr.s_DescGetRsp, m_StringResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
     def get(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        R = shr.PropertyResponse(shr.m_DriverVersion, request.args)
-        return vars(R)
+        return r_DriverVersion.reply(shr.params())
 
 
 # ----------------
@@ -332,15 +594,14 @@ class driverversion(Resource):
 @api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
 class interfaceversion(Resource):
 
-    @api.doc(description='The interface version number that this device supports. Should return 2 for this interface version.')
-    @api.marshal_with(m_IntegerResponse, description=shr.s_DescGetRsp, skip_none=True)
+    @api.doc(description='The interface version number that this device supports. Should return 4 for this interface version.')
+    @api.response(200, shr.s_DescGetRsp, m_IntegerResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
     def get(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        R = shr.PropertyResponse(2, request.args)
-        return vars(R)
+        return r_InterfaceVersion.reply(shr.params())
 
 
 # ----
@@ -354,14 +615,13 @@ class interfaceversion(Resource):
 class name(Resource):
 
     @api.doc(description='The short name of the driver, for display purposes.')
-    @api.marshal_with(m_StringResponse, description=shr.s_DescGetRsp, skip_none=True)
+    @api.response(200, shr.s_DescGetRsp, m_StringResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
     def get(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        R = shr.PropertyResponse('Rotator Simulator', request.args)
-        return vars(R)
+        return r_Name.reply(shr.params())
 
 
 # ----------------
@@ -375,14 +635,13 @@ class name(Resource):
 class supportedactions(Resource):
 
     @api.doc(description='Returns the list of action names supported by this driver.')
-    @api.marshal_with(m_StringListResponse, description='List of supported <b>Action()</b> commands.', skip_none=True)
+    @api.response(200, 'List of supported <b>Action()</b> commands.', m_StringListResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
     def get(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        R = shr.PropertyResponse([], request.args)
-        return vars(R)
+        return r_SupportedActions.reply(shr.params())
 
 
 # ----------
@@ -396,17 +655,18 @@ class supportedactions(Resource):
 class canreverse(Resource):
 
     @api.doc(description='True if the Rotator supports the <b>Reverse</b> method.')
-    @api.marshal_with(m_BoolResponse, description=shr.s_DescGetRsp, skip_none=True)
+    @api.response(200, shr.s_DescGetRsp, m_BoolResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
     def get(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        if not RotDev[DeviceNumber].connected:
-            R = shr.PropertyResponse(None, request.args, ASCOMErrors.NotConnectedException)
-            return vars(R)
-        R = shr.PropertyResponse(RotDev[DeviceNumber].can_reverse, request.args)
-        return vars(R)
+        st = RotDev[DeviceNumber].snapshot()                # One consistent, lock-free read (typ.)
+        if not st.connected:
+            R = shr.PropertyResponse(None, shr.params(), ASCOMErrors.NotConnectedException)
+            return R.reply()
+        R = shr.PropertyResponse(st.can_reverse, shr.params())
+        return R.reply()
 
 
 # --------
@@ -420,17 +680,43 @@ class canreverse(Resource):
 class ismoving(Resource):
 
     @api.doc(description='True if the Rotator is currently moving to a new position. False if the Rotator is stationary.')
-    @api.marshal_with(m_BoolResponse, description=shr.s_DescGetRsp, skip_none=True)
+    @api.response(200, shr.s_DescGetRsp, m_BoolResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
     def get(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        if not RotDev[DeviceNumber].connected:
-            R = shr.PropertyResponse(None, request.args, ASCOMErrors.NotConnectedException)
-            return vars(R)
-        R = shr.PropertyResponse(RotDev[DeviceNumber].is_moving, request.args)
-        return vars(R)
+        st = RotDev[DeviceNumber].snapshot()
+        if not st.connected:
+            R = shr.PropertyResponse(None, shr.params(), ASCOMErrors.NotConnectedException)
+            return R.reply()
+        R = shr.PropertyResponse(st.is_moving, shr.params())
+        return R.reply()
+
+
+# ------------------
+# MechanicalPosition
+# ------------------
+#
+@api.route('/<int:DeviceNumber>/mechanicalposition', methods=['GET'])
+@api.param(shr.s_FldDevNum, shr.s_DescDevNum, 'path', type='integer', default='0')
+@api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
+@api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
+class mechanicalposition(Resource):
+
+    @api.doc(description='The raw mechanical position of the Rotator in degrees, unaffected by <b>Sync()</b>.')
+    @api.response(200, shr.s_DescGetRsp, m_FloatResponse)
+    @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
+    @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
+    def get(self, DeviceNumber):
+        if not DeviceNumber in rRot:
+            abort(400, shr.s_Resp400NoDevNo)
+        st = RotDev[DeviceNumber].snapshot()
+        if not st.connected:
+            R = shr.PropertyResponse(None, shr.params(), ASCOMErrors.NotConnectedException)
+            return R.reply()
+        R = shr.PropertyResponse(st.mechanical_position, shr.params())
+        return R.reply()
 
 
 # --------
@@ -443,18 +729,19 @@ class ismoving(Resource):
 @api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
 class position(Resource):
 
-    @api.doc(description='Current instantaneous Rotator mechanical angle (degrees).')
-    @api.marshal_with(m_FloatResponse, description=shr.s_DescGetRsp, skip_none=True)
+    @api.doc(description='Current instantaneous Rotator position angle (degrees), the mechanical angle plus any <b>Sync()</b> offset.')
+    @api.response(200, shr.s_DescGetRsp, m_FloatResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
     def get(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        if not RotDev[DeviceNumber].connected:
-            R = shr.PropertyResponse(None, request.args, ASCOMErrors.NotConnectedException)
-            return vars(R)
-        R = shr.PropertyResponse(RotDev[DeviceNumber].position, request.args)
-        return vars(R)
+        st = RotDev[DeviceNumber].snapshot()
+        if not st.connected:
+            R = shr.PropertyResponse(None, shr.params(), ASCOMErrors.NotConnectedException)
+            return R.reply()
+        R = shr.PropertyResponse(st.position, shr.params())
+        return R.reply()
 
 
 # -------
@@ -468,20 +755,21 @@ class position(Resource):
 class reverse(Resource):
 
     @api.doc(description='Returns the Rotator\'s <b>Reverse</b> state.')
-    @api.marshal_with(m_BoolResponse, description=shr.s_DescGetRsp, skip_none=True)
+    @api.response(200, shr.s_DescGetRsp, m_BoolResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
     def get(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        if not RotDev[DeviceNumber].connected:
-            R = shr.PropertyResponse(None, request.args, ASCOMErrors.NotConnectedException)
-            return vars(R)
-        R = shr.PropertyResponse(RotDev[DeviceNumber].reverse, request.args)
-        return vars(R)
+        st = RotDev[DeviceNumber].snapshot()
+        if not st.connected:
+            R = shr.PropertyResponse(None, shr.params(), ASCOMErrors.NotConnectedException)
+            return R.reply()
+        R = shr.PropertyResponse(st.reverse, shr.params())
+        return R.reply()
 
     @api.doc(description='Sets the Rotator\'s <b>Reverse</b> state.')
-    @api.marshal_with(m_MethodResponse, description=shr.s_DescMthRsp, skip_none=True)
+    @api.response(200, shr.s_DescMthRsp, m_MethodResponse)
     @api.param('Reverse', 'True if the rotation and angular ' +
                           'direction must be reversed to match the optical ' +
                           'characteristics', 'formData', type='boolean', default=False, required=True)
@@ -490,15 +778,16 @@ class reverse(Resource):
     def put(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        if not RotDev[DeviceNumber].connected:
-            R = shr.MethodResponse(request.form, ASCOMErrors.NotConnectedException)
-            return vars(R)
-        if RotDev[DeviceNumber].is_moving:
-            R = shr.MethodResponse(request.form, ASCOMErrors.InvalidOperationException)
-            return vars(R)
-        RotDev[DeviceNumber].reverse = (shr.get_form_caseless('Reverse', request.form, 'false').lower() == 'true')     # **TODO** Is this right???
-        R = shr.MethodResponse(request.form)
-        return vars(R)
+        st = RotDev[DeviceNumber].snapshot()
+        if not st.connected:
+            R = shr.MethodResponse(shr.params(), ASCOMErrors.NotConnectedException)
+            return R.reply()
+        if st.is_moving:
+            R = shr.MethodResponse(shr.params(), ASCOMErrors.InvalidOperationException)
+            return R.reply()
+        RotDev[DeviceNumber].reverse = shr.params().bool('Reverse')     # **TODO** Is this right???
+        R = shr.MethodResponse(shr.params())
+        return R.reply()
 
 
 # --------
@@ -512,17 +801,18 @@ class reverse(Resource):
 class stepsize(Resource):
 
     @api.doc(description='The minimum angular step size (degrees).')
-    @api.marshal_with(m_FloatResponse, description=shr.s_DescGetRsp, skip_none=True)
+    @api.response(200, shr.s_DescGetRsp, m_FloatResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
     def get(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        if not RotDev[DeviceNumber].connected:
-            R = shr.PropertyResponse(None, request.args, ASCOMErrors.NotConnectedException)
-            return vars(R)
-        R = shr.PropertyResponse(RotDev[DeviceNumber].step_size, request.args)
-        return vars(R)
+        st = RotDev[DeviceNumber].snapshot()
+        if not st.connected:
+            R = shr.PropertyResponse(None, shr.params(), ASCOMErrors.NotConnectedException)
+            return R.reply()
+        R = shr.PropertyResponse(st.step_size, shr.params())
+        return R.reply()
 
 
 # --------------
@@ -535,18 +825,19 @@ class stepsize(Resource):
 @api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
 class targetposition(Resource):
 
-    @api.doc(description='The destination mechanical angle for <b>Move()</b> and <b>MoveAbsolute()</b>.')
-    @api.marshal_with(m_FloatResponse, description=shr.s_DescGetRsp, skip_none=True)
+    @api.doc(description='The destination position angle for <b>Move()</b> and <b>MoveAbsolute()</b>.')
+    @api.response(200, shr.s_DescGetRsp, m_FloatResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'query', type='integer', default='1234')
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'query', type='integer', default='1')
     def get(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        if not RotDev[DeviceNumber].connected:
-            R = shr.PropertyResponse(None, request.args, ASCOMErrors.NotConnectedException)
-            return vars(R)
-        R = shr.PropertyResponse(RotDev[DeviceNumber].target_position, request.args)
-        return vars(R)
+        st = RotDev[DeviceNumber].snapshot()
+        if not st.connected:
+            R = shr.PropertyResponse(None, shr.params(), ASCOMErrors.NotConnectedException)
+            return R.reply()
+        R = shr.PropertyResponse(st.target_position, shr.params())
+        return R.reply()
 
 
 # ----
@@ -561,18 +852,18 @@ class targetposition(Resource):
 class halt(Resource):
 
     @api.doc(description='Immediately stop any Rotator motion due to a previous <b>Move()</b> or <b>MoveAbsolute()</b>.')
-    @api.marshal_with(m_MethodResponse, description=shr.s_DescMthRsp, skip_none=True)
+    @api.response(200, shr.s_DescMthRsp, m_MethodResponse)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'formData', type='integer', default=1234)
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'formData', type='integer', default=1)
     def put(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
         if not RotDev[DeviceNumber].connected:
-            R = shr.PropertyResponse(None, request.args, ASCOMErrors.NotConnectedException)
-            return vars(R)
+            R = shr.PropertyResponse(None, shr.params(), ASCOMErrors.NotConnectedException)
+            return R.reply()
         RotDev[DeviceNumber].Halt()
-        R = shr.MethodResponse(request.form)
-        return vars(R)
+        R = shr.MethodResponse(shr.params())
+        return R.reply()
 
 
 # ----
@@ -586,7 +877,7 @@ class halt(Resource):
 @api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
 class move(Resource):
     @api.doc(description='Causes the rotator to move <b>Position</b> degrees relative to the current <b>Position</b>.')
-    @api.marshal_with(m_MethodResponse, description=shr.s_DescMthRsp, skip_none=True)
+    @api.response(200, shr.s_DescMthRsp, m_MethodResponse)
     @api.param('Position', 'Angle to move in degrees relative to the current <b>Position</b>.',
                            'formData', type='number', default = 0.0, required=True)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'formData', type='integer', default=1234)
@@ -594,19 +885,20 @@ class move(Resource):
     def put(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        if not RotDev[DeviceNumber].connected:
-            R = shr.MethodResponse(request.form, ASCOMErrors.NotConnectedException)
-            return vars(R)
-        if RotDev[DeviceNumber].is_moving:
-            R = shr.MethodResponse(request.form, ASCOMErrors.InvalidOperationException)
-            return vars(R)
-        relPos = float(shr.get_form_caseless('Position', request.form, 0.0))
+        st = RotDev[DeviceNumber].snapshot()
+        if not st.connected:
+            R = shr.MethodResponse(shr.params(), ASCOMErrors.NotConnectedException)
+            return R.reply()
+        if st.is_moving:
+            R = shr.MethodResponse(shr.params(), ASCOMErrors.InvalidOperationException)
+            return R.reply()
+        relPos = shr.params().float('Position', 0.0)
         if relPos >= 360 or relPos <= -360.0:
-            R = shr.MethodResponse(request.form, ASCOMErrors.InvalidValueException)
-            return vars(R)
+            R = shr.MethodResponse(shr.params(), ASCOMErrors.InvalidValueException)
+            return R.reply()
         RotDev[DeviceNumber].Move(relPos)
-        R = shr.MethodResponse(request.form)
-        return vars(R)
+        R = shr.MethodResponse(shr.params())
+        return R.reply()
 
 
 # ------------
@@ -620,24 +912,95 @@ class move(Resource):
 @api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
 class moveabsolute(Resource):
     @api.doc(description='Causes the rotator to move the absolute position of <b>Position</b> degrees.')
-    @api.marshal_with(m_MethodResponse, description=shr.s_DescMthRsp, skip_none=True)
-    @api.param('Position', 'Destination mechanical angle to which the rotator will move (degrees).',
+    @api.response(200, shr.s_DescMthRsp, m_MethodResponse)
+    @api.param('Position', 'Destination position angle to which the rotator will move (degrees).',
                             'formData', type='number',  default=0.0, required=True)
     @api.param(shr.s_FldClId, shr.s_DescClId, 'formData', type='integer', default=1234)
     @api.param(shr.s_FldCtId, shr.s_DescCtId, 'formData', type='integer', default=1)
     def put(self, DeviceNumber):
         if not DeviceNumber in rRot:
             abort(400, shr.s_Resp400NoDevNo)
-        if not RotDev[DeviceNumber].connected:
-            R = shr.MethodResponse(request.form, ASCOMErrors.NotConnectedException)
-            return vars(R)
-        if RotDev[DeviceNumber].is_moving:
-            R = shr.MethodResponse(request.form, ASCOMErrors.InvalidOperationException)
-            return vars(R)
-        newPos = float(shr.get_form_caseless('Position', request.form, 0.0))
+        st = RotDev[DeviceNumber].snapshot()
+        if not st.connected:
+            R = shr.MethodResponse(shr.params(), ASCOMErrors.NotConnectedException)
+            return R.reply()
+        if st.is_moving:
+            R = shr.MethodResponse(shr.params(), ASCOMErrors.InvalidOperationException)
+            return R.reply()
+        newPos = shr.params().float('Position', 0.0)
         if newPos >= 360 or newPos < 0:
-            R = shr.MethodResponse(request.form, ASCOMErrors.InvalidValueException)
-            return vars(R)
+            R = shr.MethodResponse(shr.params(), ASCOMErrors.InvalidValueException)
+            return R.reply()
         RotDev[DeviceNumber].MoveAbsolute(newPos)
-        R = shr.MethodResponse(request.form)
-        return vars(R)
+        R = shr.MethodResponse(shr.params())
+        return R.reply()
+
+
+# --------------
+# MoveMechanical
+# --------------
+#
+
+@api.route('/<int:DeviceNumber>/movemechanical', methods=['PUT'])
+@api.param(shr.s_FldDevNum, shr.s_DescDevNum, 'path', type='integer', default='0')
+@api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
+@api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
+class movemechanical(Resource):
+    @api.doc(description='Causes the rotator to move to the raw mechanical position of <b>Position</b> degrees, ignoring any <b>Sync()</b> offset.')
+    @api.response(200, shr.s_DescMthRsp, m_MethodResponse)
+    @api.param('Position', 'Destination raw mechanical angle to which the rotator will move (degrees).',
+                            'formData', type='number',  default=0.0, required=True)
+    @api.param(shr.s_FldClId, shr.s_DescClId, 'formData', type='integer', default=1234)
+    @api.param(shr.s_FldCtId, shr.s_DescCtId, 'formData', type='integer', default=1)
+    def put(self, DeviceNumber):
+        if not DeviceNumber in rRot:
+            abort(400, shr.s_Resp400NoDevNo)
+        st = RotDev[DeviceNumber].snapshot()
+        if not st.connected:
+            R = shr.MethodResponse(shr.params(), ASCOMErrors.NotConnectedException)
+            return R.reply()
+        if st.is_moving:
+            R = shr.MethodResponse(shr.params(), ASCOMErrors.InvalidOperationException)
+            return R.reply()
+        newPos = shr.params().float('Position', 0.0)
+        if newPos >= 360 or newPos < 0:
+            R = shr.MethodResponse(shr.params(), ASCOMErrors.InvalidValueException)
+            return R.reply()
+        RotDev[DeviceNumber].MoveMechanical(newPos)
+        R = shr.MethodResponse(shr.params())
+        return R.reply()
+
+
+# ----
+# Sync
+# ----
+#
+
+@api.route('/<int:DeviceNumber>/sync', methods=['PUT'])
+@api.param(shr.s_FldDevNum, shr.s_DescDevNum, 'path', type='integer', default='0')
+@api.response(400, shr.s_Resp400Missing, m_ErrorMessage)
+@api.response(500, shr.s_Resp500SrvErr, m_ErrorMessage)
+class sync(Resource):
+    @api.doc(description='Syncs the rotator to the specified position angle without moving it. <b>Position</b> reads as this angle afterwards.')
+    @api.response(200, shr.s_DescMthRsp, m_MethodResponse)
+    @api.param('Position', 'Angle to which the current position is synced (degrees).',
+                            'formData', type='number',  default=0.0, required=True)
+    @api.param(shr.s_FldClId, shr.s_DescClId, 'formData', type='integer', default=1234)
+    @api.param(shr.s_FldCtId, shr.s_DescCtId, 'formData', type='integer', default=1)
+    def put(self, DeviceNumber):
+        if not DeviceNumber in rRot:
+            abort(400, shr.s_Resp400NoDevNo)
+        st = RotDev[DeviceNumber].snapshot()
+        if not st.connected:
+            R = shr.MethodResponse(shr.params(), ASCOMErrors.NotConnectedException)
+            return R.reply()
+        if st.is_moving:
+            R = shr.MethodResponse(shr.params(), ASCOMErrors.InvalidOperationException)
+            return R.reply()
+        newPos = shr.params().float('Position', 0.0)
+        if newPos >= 360 or newPos < 0:
+            R = shr.MethodResponse(shr.params(), ASCOMErrors.InvalidValueException)
+            return R.reply()
+        RotDev[DeviceNumber].Sync(newPos)
+        R = shr.MethodResponse(shr.params())
+        return R.reply()
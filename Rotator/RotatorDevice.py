@@ -4,214 +4,305 @@
 #
 # 16-Mar-2019   rbd Add steps_per_sec property, add setters to step_size and steps_per_sec for setup form
 # 13-Oct-2021  rbd  0.9 Linting with some messages disabled, no docstrings
+# 18-Oct-2026       1.1 Steps are driven by the shared MotionEngine instead of a new
+#                       threading.Timer per step. steps_per_sec now takes effect.
+# 18-Oct-2026       1.1 Closed-form motion model, position and IsMoving are computed
+#                       from the clock on demand. One engine event per move.
+# 18-Oct-2026       1.1 Lock-free reads. All device state is an immutable _State that
+#                       writers publish with a single assignment, see snapshot().
+# 18-Oct-2026       1.1 print() replaced by TraceLog, off by default
+# 18-Oct-2026       1.1 notify_when_idle(), callbacks when motion stops (WaitForMove)
+# 18-Oct-2026       1.1 IRotatorV3 sync offset: mechanical_position, Sync(), MoveMechanical()
+# 18-Oct-2026       1.1 Writer lock wait recorded in Metrics.LockWait
+# 18-Oct-2026       1.1 Motion timed by SimClock (time scale, step-on-demand)
+# 18-Oct-2026       1.1 settings_version, for caching the setup page
+# 18-Oct-2026       1.1 Writers hold the lock with 'with', a failed move cannot leave it held.
+#                       Moves and Sync reject a target that is not a finite number.
 #
-from threading import Timer
-from threading import Lock
+import math
+from collections import namedtuple
+import Metrics
+import MotionEngine                                     # Delivers move completion events
+import SimClock
+import TraceLog
+
+_trc = TraceLog.tracer('RotatorDevice')
+
+# --------------
+# Device state
+# --------------
+# Everything about a rotator lives in one immutable tuple. Writers build a
+# new one under the device lock and publish it by assigning self._state,
+# which is atomic, so readers never take the lock and always see fields
+# that belong together.
+#
+# A move is recorded as its start time, start position, direction, step
+# count and rate. Position and IsMoving are computed from the clock when
+# they are read, so nothing runs between reads. The MotionEngine only
+# delivers one completion event per move.
+#
+# Positions in here are mechanical. Position and TargetPosition as the
+# client sees them are those plus sync_offset, which Sync() sets.
+#
+class _State(namedtuple('_State', [
+        'connected', 'can_reverse', 'reverse', 'step_size', 'steps_per_sec',
+        'settings_version',                             # Bumped when reverse, step_size or steps_per_sec is set
+        'sync_offset',                                  # Sky minus mechanical angle
+        'target_position',                              # Mechanical
+        'moving',                                       # A move is in progress (until completed or halted)
+        'position',                                     # Mechanical, at rest or at start of move
+        'mv_t0',                                        # SimClock time at start of move
+        'mv_dir',                                       # +1 or -1 times step size
+        'mv_nsteps',                                    # Whole steps in this move
+        'mv_rate',                                      # Steps per sec for this move
+        'mv_t_end'])):                                  # Time of the last step
+    __slots__ = ()
 
-class RotatorDevice(object):
-    """Implements a rotator device that runs in a separate thread"""
     #
-    # Only override __init_()  and run() (pydoc 17.1.2)
+    # Quantized position at time 'now'
     #
+    def position_at(self, now):
+        if not self.moving:
+            return self.position
+        if now >= self.mv_t_end:
+            k = self.mv_nsteps
+        else:
+            k = min(int((now - self.mv_t0) * self.mv_rate), self.mv_nsteps)
+        pos = self.position + k * self.mv_dir
+        if pos >= 360.0:
+            pos -= 360.0
+        elif pos < 0.0:
+            pos += 360.0
+        return pos
+
+    def moving_at(self, now):
+        return self.moving and now < self.mv_t_end
+
+def check_finite(pos):
+    if not math.isfinite(pos):
+        raise ValueError(f'position must be a finite number, not {pos}')
+
+def wrap_angle(angle):
+    if angle >= 360.0:
+        angle -= 360.0
+    elif angle < 0.0:
+        angle += 360.0
+    return angle
+
+#
+# A consistent view of every property of a device at one instant, for
+# handlers that need more than one of them.
+#
+RotatorState = namedtuple('RotatorState', ['connected', 'can_reverse', 'reverse', 'step_size',
+                                           'steps_per_sec', 'position', 'target_position', 'is_moving',
+                                           'time', 'mechanical_position'])
+
+class RotatorDevice(object):
+    """Implements a rotator device with a time-based motion model"""
     def __init__(self):
-        self._lock = Lock()
+        self._lock = Metrics.TimedLock()                # Serializes writers only
         self.name = 'device'
-        #
-        # Rotator device constants
-        #
-        self._can_reverse = True
-        self._step_size = 1.0
-        self._steps_per_sec = 6
-        #
-        # Rotator device state variables
-        #
-        self._reverse = False
-        self._position = 0.0
-        self._target_position = 0.0
-        self._is_moving = False
-        self._connected = False
-        #
-        # Rotator engine
-        #
-        self._timer = None
-        self._interval = 1.0 / self._steps_per_sec
-        self._stopped = True
-
-    def start(self, from_run=False):
-        #print('[start] try to lock')
-        self._lock.acquire()
-        #print('[start] got lock')
-        if from_run or self._stopped:
-            self._stopped = False
-            #print('[start] new timer')
-            self._timer = Timer(self._interval, self._run)
-            #print('[start] now start the timer')
-            self._timer.start()
-            #print('[start] timer started')
-            self._lock.release()
-            #print('[start] lock released')
-        else:
-            self._lock.release()
-            #print('[start] lock released')
-
-
-    def _run(self):
-        #print('[_run] (tmr expired) get lock')
-        self._lock.acquire()
-        #print('[_run] got lock : tgtpos=' + str(self._target_position) + ' pos=' + str(self._position))
-        delta = self._target_position - self._position
-        #if delta >= 360.0:
-        #    delta -= 360.0
-        #if delta < 0.0:
-        #    delta += 360.0
-        #    print('[_run] final delta = ' + str(delta))
-        if abs(delta) > (self._step_size / 2.0):
-            self._is_moving = True
-            if delta > 0:
-                #print('[_run] delta > 0 go positive')
-                self._position += self._step_size
-                if self._position >= 360.0:
-                    self._position -= 360.0
-            else:
-                #print('[_run] delta < 0 go negative')
-                self._position -= self._step_size
-                if self._position < 0.0:
-                    self._position += 360.0
-            print('[_run] new pos = ' + str(self._position))
-        else:
-            self._is_moving = False
-            self._stopped = True
-        self._lock.release()
-        #print('[_run] lock released')
-        if self._is_moving:
-            #print('[_run] more motion needed, start another timer interval')
-            self.start(from_run = True)
+        self._state = _State(connected=False, can_reverse=True, reverse=False,
+                             step_size=1.0, steps_per_sec=6, settings_version=0, sync_offset=0.0,
+                             target_position=0.0, moving=False, position=0.0,
+                             mv_t0=0.0, mv_dir=0.0, mv_nsteps=0, mv_rate=6.0, mv_t_end=0.0)
+        self._tick = None                               # Pending MotionEngine completion event
+        self._gen = 0                                   # Bumped on each move, stale events are ignored
+        self._idle_cbs = []                             # Called once when motion next stops
+
+    def snapshot(self):
+        st = self._state
+        now = SimClock.now()
+        mech = st.position_at(now)
+        return RotatorState(st.connected, st.can_reverse, st.reverse, st.step_size,
+                            st.steps_per_sec, wrap_angle(mech + st.sync_offset),
+                            wrap_angle(st.target_position + st.sync_offset), st.moving_at(now), now, mech)
+
+    #
+    # Start a move from the current position to 'target'. The rotator steps
+    # toward the target until it is within half a step of it, as the
+    # original step-at-a-time engine did. Caller holds the lock.
+    #
+    def _start_move(self, target):
+        st = self._state
+        now = SimClock.now()
+        pos = st.position_at(now)                       # Freeze any move in progress
+        MotionEngine.engine().cancel(self._tick)
+        delta = target - pos
+        nsteps = max(math.ceil(abs(delta) / st.step_size - 0.5), 0)
+        rate = float(st.steps_per_sec)
+        self._gen += 1
+        self._state = st._replace(target_position=target, moving=True, position=pos,
+                                  mv_t0=now, mv_dir=st.step_size if delta > 0 else -st.step_size,
+                                  mv_nsteps=nsteps, mv_rate=rate, mv_t_end=now + nsteps / rate)
+        self._tick = MotionEngine.engine().schedule_at(self._state.mv_t_end, self._complete, self._gen)
+
+    def _complete(self, gen):
+        cbs = None
+        with self._lock:
+            st = self._state
+            if gen == self._gen and st.moving:          # Not halted or restarted since scheduled
+                self._state = st._replace(position=st.position_at(st.mv_t_end), moving=False)
+                self._tick = None
+                cbs, self._idle_cbs = self._idle_cbs, []
+        if cbs:
+            self._fire(cbs)
 
     def stop(self):
-        self._lock.acquire()
-        print('[stop] Stopping...')
-        self._stopped = True
-        self._is_moving = False
-        if self._timer is not None:
-            self._timer.cancel()
-        self._timer = None
-        self._lock.release()
+        with self._lock:
+            if _trc.level >= TraceLog.DEBUG:
+                _trc.debug('[stop] Stopping...')
+            st = self._state
+            self._state = st._replace(position=st.position_at(SimClock.now()), moving=False)
+            self._gen += 1
+            MotionEngine.engine().cancel(self._tick)
+            self._tick = None
+            cbs, self._idle_cbs = self._idle_cbs, []
+        self._fire(cbs)
 
     #
-    # Guarded properties
-    # **TODO** Catch lock failures and raise error.
+    # Call 'callback()' once, the next time motion stops (move complete or
+    # halted). Returns False without registering it if the rotator is not
+    # moving. Callbacks run on the MotionEngine (or halting) thread, so they
+    # must be quick and must not block, e.g. Event.set or
+    # loop.call_soon_threadsafe.
+    #
+    def notify_when_idle(self, callback):
+        with self._lock:
+            if not self._state.moving:
+                return False
+            self._idle_cbs.append(callback)
+            return True
+
+    def cancel_notify(self, callback):
+        with self._lock:
+            if callback in self._idle_cbs:
+                self._idle_cbs.remove(callback)
+
+    @staticmethod
+    def _fire(cbs):
+        for cb in cbs:
+            try:
+                cb()
+            except Exception as ex:                     # pylint: disable=W0703
+                _trc.error(f'idle callback failed: {ex!r}')
+
+    def _set(self, **kw):
+        with self._lock:
+            self._state = self._state._replace(**kw)
+
+    def _set_setting(self, **kw):
+        with self._lock:
+            self._state = self._state._replace(settings_version=self._state.settings_version + 1, **kw)
+
+    #
+    # Properties. Reads are lock-free, they just look at the published state.
     #
     @property
     def can_reverse(self):
-        self._lock.acquire()
-        res =  self._can_reverse
-        self._lock.release()
-        return res
+        return self._state.can_reverse
 
     @property
     def reverse(self):
-        self._lock.acquire()
-        res =  self._reverse
-        self._lock.release()
-        return res
+        return self._state.reverse
     @reverse.setter
     def reverse (self, reverse):
-        self._lock.acquire()
-        self._reverse = reverse
-        self._lock.release()
+        self._set_setting(reverse=reverse)
 
     @property
     def step_size(self):
-        self._lock.acquire()
-        res =  self._step_size
-        self._lock.release()
-        return res
+        return self._state.step_size
     @step_size.setter
     def step_size (self, step_size):
-        self._lock.acquire()
-        self._step_size = step_size
-        self._lock.release()
+        self._set_setting(step_size=step_size)
 
     @property
     def steps_per_sec(self):
-        self._lock.acquire()
-        res =  self._steps_per_sec
-        self._lock.release()
-        return res
+        return self._state.steps_per_sec
     @steps_per_sec.setter
     def steps_per_sec (self, steps_per_sec):
-        self._lock.acquire()
-        self._steps_per_sec = steps_per_sec
-        self._lock.release()
+        self._set_setting(steps_per_sec=steps_per_sec)
+
+    @property
+    def settings_version(self):
+        return self._state.settings_version
 
     @property
     def position(self):
-        self._lock.acquire()
-        res = self._position
-        print('[position] ' + str(res))
-        self._lock.release()
+        st = self._state
+        res = wrap_angle(st.position_at(SimClock.now()) + st.sync_offset)
+        if _trc.level >= TraceLog.DEBUG:
+            _trc.debug('[position] ' + str(res))
         return res
 
+    @property
+    def mechanical_position(self):
+        return self._state.position_at(SimClock.now())
+
     @property
     def target_position(self):
-        self._lock.acquire()
-        res =  self._target_position
-        print('[target_position] ' + str(res))
-        self._lock.release()
+        st = self._state
+        res = wrap_angle(st.target_position + st.sync_offset)
+        if _trc.level >= TraceLog.DEBUG:
+            _trc.debug('[target_position] ' + str(res))
         return res
 
     @property
     def is_moving(self):
-        self._lock.acquire()
-        res =  self._is_moving
-        print('[is_moving] ' + str(res))
-        self._lock.release()
+        res =  self._state.moving_at(SimClock.now())
+        if _trc.level >= TraceLog.DEBUG:
+            _trc.debug('[is_moving] ' + str(res))
         return res
 
     @property
     def connected(self):
-        self._lock.acquire()
-        res =  self._connected
-        self._lock.release()
-        return res
+        return self._state.connected
     @connected.setter
     def connected (self, connected):
-        self._lock.acquire()
-        self._connected = connected
-        if connected:
-            print('[connected]')
-        else:
-            print('[disconnected]')
-        self._lock.release()
+        self._set(connected=connected)
+        if _trc.level >= TraceLog.INFO:
+            _trc.info('[connected]' if connected else '[disconnected]')
 
     #
-    # Methods
+    # Methods. A 'pos' that is not a finite number raises ValueError before
+    # anything changes (the API handlers check first).
     #
     def Move(self, pos):
-        self._lock.acquire()
-        print('[Move] pos=' + str(pos) + ' cur=' + str(self._position))
-        self._is_moving = True
-        self._target_position = self._position + pos
-        if self._target_position >= 360.0:              # Caller should protecxt against this (typ.)
-            self._target_position -= 360.0
-        if self._target_position < 0.0:
-            self._target_position += 360.0
-        print('       targetpos=' + str(self._target_position))
-        self._lock.release()
-        self.start()
+        check_finite(pos)
+        with self._lock:
+            cur = self._state.position_at(SimClock.now())
+            target = wrap_angle(cur + pos)                   # Caller should protecxt against this (typ.)
+            if _trc.level >= TraceLog.DEBUG:
+                _trc.debug('[Move] pos=' + str(pos) + ' cur=' + str(cur) + ' targetpos=' + str(target))
+            self._start_move(target)
 
     def MoveAbsolute(self, pos):
-        self._lock.acquire()
-        print('[MoveAbs] pos=' + str(pos) + ' cur=' + str(self._position))
-        self._is_moving = True
-        self._target_position = pos
-        if self._target_position >= 360.0:
-            self._target_position -= 360.0
-        if self._target_position < 0.0:
-            self._target_position += 360.0
-        self._lock.release()
-        self.start()
+        check_finite(pos)
+        with self._lock:
+            if _trc.level >= TraceLog.DEBUG:
+                _trc.debug('[MoveAbs] pos=' + str(pos) + ' cur=' + str(self._state.position_at(SimClock.now())))
+            self._start_move(wrap_angle(wrap_angle(pos) - self._state.sync_offset))
+
+    def MoveMechanical(self, pos):
+        check_finite(pos)
+        with self._lock:
+            if _trc.level >= TraceLog.DEBUG:
+                _trc.debug('[MoveMech] pos=' + str(pos) + ' cur=' + str(self._state.position_at(SimClock.now())))
+            self._start_move(wrap_angle(pos))
+
+    #
+    # Make the current mechanical position read as sky angle 'pos'. Caller
+    # makes sure the rotator is not moving.
+    #
+    def Sync(self, pos):
+        check_finite(pos)
+        with self._lock:
+            st = self._state
+            self._state = st._replace(sync_offset=wrap_angle(pos - st.position_at(SimClock.now())))
+            if _trc.level >= TraceLog.DEBUG:
+                _trc.debug('[Sync] pos=' + str(pos) + ' offset=' + str(self._state.sync_offset))
 
     def Halt(self):
-        print('[Halt]')
+        if _trc.level >= TraceLog.DEBUG:
+            _trc.debug('[Halt]')
         self.stop()
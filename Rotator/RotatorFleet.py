@@ -0,0 +1,378 @@
+# pylint: disable=C0301,C0103,C0111
+# ============================
+# ROTATOR FLEET (NUMPY BACKEND)
+# ============================
+# Optional backend for simulating very large numbers of rotators. The state
+# of every rotator is kept in NumPy arrays indexed by device number, and one
+# MotionEngine event per tick advances every moving rotator in a single
+# vectorized update. FleetRotatorDevice is a view onto one row of the arrays
+# with the same properties and methods as RotatorDevice, so the API modules
+# do not care which backend they are talking to.
+#
+# Motion follows the same closed-form model as RotatorDevice: each move is
+# recorded as start time, start position, direction, step count and rate.
+# Position and IsMoving are computed from those at the time they are read,
+# exactly as RotatorDevice does, so the two backends answer alike. The
+# tick only does the bookkeeping: it stores the positions of the moving
+# rotators, marks finished moves and runs their idle callbacks. Ticks are
+# due on a fixed grid of SimClock times, so they do not drift.
+#
+# Readers take no lock. Writers bump a sequence number before and after
+# changing the arrays (a seqlock), and snapshot() retries if the number was
+# odd or changed while it was copying a row.
+#
+# 18-Oct-2026       1.1 Initial edit
+# 18-Oct-2026       1.1 Seqlock for consistent lock-free snapshot() reads
+# 18-Oct-2026       1.1 notify_when_idle() as RotatorDevice
+# 18-Oct-2026       1.1 Sync offset, mechanical_position, Sync(), MoveMechanical() as RotatorDevice
+# 18-Oct-2026       1.1 Writer lock wait recorded in Metrics.LockWait
+# 18-Oct-2026       1.1 Motion timed by SimClock, tick period follows its scale
+# 18-Oct-2026       1.1 settings_version as RotatorDevice
+# 18-Oct-2026       1.1 Moves and Sync reject a target that is not a finite number, before
+#                       any array entry is written
+# 18-Oct-2026       1.1 Reads are closed-form at SimClock.now(), not the array values of the
+#                       last tick. Ticks at absolute due times.
+#
+from contextlib import contextmanager
+from time import sleep
+import Metrics
+import MotionEngine
+import SimClock
+import TraceLog
+from RotatorDevice import RotatorState, check_finite, wrap_angle
+
+_trc = TraceLog.tracer('RotatorFleet')
+
+try:
+    import numpy as np
+except ImportError:                                     # Optional, only needed for this backend
+    np = None
+
+class RotatorFleet(object):
+    """Array store and vectorized motion engine for a fleet of rotators"""
+
+    def __init__(self, count, tick_hz=60):
+        if np is None:
+            raise ImportError('The fleet backend needs NumPy (pip install numpy)')
+        self._lock = Metrics.TimedLock()                # Serializes writers only
+        self.seq = 0                                    # Odd while a write is in progress
+        self.count = count
+        self.tick_hz = tick_hz                          # Matches the highest allowed steps/sec
+        #
+        # Rotator device constants and state
+        #
+        self.can_reverse = np.ones(count, dtype=np.bool_)
+        self.step_size = np.full(count, 1.0)
+        self.steps_per_sec = np.full(count, 6, dtype=np.int32)
+        self.reverse = np.zeros(count, dtype=np.bool_)
+        self.settings_version = np.zeros(count, dtype=np.int64)    # As RotatorDevice
+        self.connected = np.zeros(count, dtype=np.bool_)
+        self.sync_offset = np.zeros(count)              # Sky minus mechanical angle
+        self.position = np.zeros(count)                 # Mechanical, as target_position
+        self.target_position = np.zeros(count)
+        self.is_moving = np.zeros(count, dtype=np.bool_)
+        #
+        # Motion model, one entry per device (see RotatorDevice)
+        #
+        self.mv_t0 = np.zeros(count)
+        self.mv_start = np.zeros(count)
+        self.mv_dir = np.zeros(count)
+        self.mv_nsteps = np.zeros(count, dtype=np.int64)
+        self.mv_rate = np.ones(count)
+        self.mv_t_end = np.zeros(count)
+        self._tick = None                               # Pending MotionEngine tick, None when idle
+        self._due = 0.0                                 # When it is due
+        self._idle_cbs = {}                             # devno : [callback, ...] called when it stops
+
+    def device(self, devno):
+        return FleetRotatorDevice(self, devno)
+
+    @contextmanager
+    def writing(self):
+        with self._lock:
+            self.seq += 1
+            try:
+                yield
+            finally:
+                self.seq += 1
+
+    #
+    # Vectorized update of every moving device to time 'now'. Caller holds
+    # the lock.
+    #
+    def update(self, now):
+        idx = np.flatnonzero(self.is_moving)
+        if idx.size == 0:
+            return 0
+        k = ((now - self.mv_t0[idx]) * self.mv_rate[idx]).astype(np.int64)
+        np.minimum(k, self.mv_nsteps[idx], out=k)
+        done = now >= self.mv_t_end[idx]
+        k[done] = self.mv_nsteps[idx][done]
+        pos = self.mv_start[idx] + k * self.mv_dir[idx]
+        pos[pos >= 360.0] -= 360.0
+        pos[pos < 0.0] += 360.0
+        self.position[idx] = pos
+        self.is_moving[idx[done]] = False
+        return idx.size
+
+    #
+    # Moving now, closed-form (the is_moving array is only cleared by the
+    # tick after a move ends). Lock-free.
+    #
+    def moving_at(self, now):
+        return self.is_moving & (now < self.mv_t_end)
+
+    #
+    # Scalar version of update() for device i alone. Caller holds the lock.
+    #
+    def update_one(self, i, now):
+        if not self.is_moving[i]:
+            return
+        if now >= self.mv_t_end[i]:
+            k = self.mv_nsteps[i]
+            self.is_moving[i] = False
+        else:
+            k = min(int((now - self.mv_t0[i]) * self.mv_rate[i]), self.mv_nsteps[i])
+        pos = self.mv_start[i] + k * self.mv_dir[i]
+        if pos >= 360.0:
+            pos -= 360.0
+        elif pos < 0.0:
+            pos += 360.0
+        self.position[i] = pos
+
+    #
+    # Virtual seconds between ticks. At most tick_hz ticks a real second
+    # however fast the SimClock runs, so a fast clock makes the ticks
+    # coarser instead of the CPU busier.
+    #
+    def _period(self):
+        return max(1.0, SimClock.scale()) / self.tick_hz
+
+    #
+    # The next tick, on the grid of 'period' from the last due time. Ticks
+    # that were missed are skipped, not run late one after another.
+    #
+    def _schedule(self, now):
+        period = self._period()
+        due = self._due + period
+        if due <= now:
+            due = now + period - (now - self._due) % period
+        self._due = due
+        self._tick = MotionEngine.engine().schedule_at(due, self._run)
+
+    def _run(self):
+        cbs = []
+        with self.writing():
+            now = SimClock.now()
+            self.update(now)
+            if self.is_moving.any():
+                self._schedule(now)
+            else:
+                self._tick = None
+            for i in [i for i in self._idle_cbs if not self.is_moving[i]]:
+                cbs += self._idle_cbs.pop(i)
+        _fire(cbs)
+
+    #
+    # Start a move of device i to its target_position. Caller holds the lock.
+    #
+    def start_move(self, i):
+        now = SimClock.now()
+        self.update_one(i, now)                         # Freeze any move in progress
+        step = self.step_size[i]
+        delta = self.target_position[i] - self.position[i]
+        nsteps = int(np.ceil(abs(delta) / step - 0.5))
+        self.mv_t0[i] = now
+        self.mv_start[i] = self.position[i]
+        self.mv_dir[i] = step if delta > 0 else -step
+        self.mv_nsteps[i] = max(nsteps, 0)
+        self.mv_rate[i] = float(self.steps_per_sec[i])
+        self.mv_t_end[i] = now + self.mv_nsteps[i] / self.mv_rate[i]
+        self.is_moving[i] = True
+        if self._tick is None:
+            self._due = now
+            self._schedule(now)
+
+    #
+    # Stop device i. Returns its idle callbacks, for the caller to run after
+    # it releases the lock. Caller holds the lock.
+    #
+    def stop(self, i):
+        self.update_one(i, SimClock.now())
+        self.is_moving[i] = False
+        return self._idle_cbs.pop(i, [])
+
+    def notify_when_idle(self, i, callback):
+        with self._lock:
+            if not self.is_moving[i] or SimClock.now() >= self.mv_t_end[i]:
+                return False
+            self._idle_cbs.setdefault(i, []).append(callback)
+            return True
+
+    def cancel_notify(self, i, callback):
+        with self._lock:
+            cbs = self._idle_cbs.get(i)
+            if cbs and callback in cbs:
+                cbs.remove(callback)
+                if not cbs:
+                    del self._idle_cbs[i]
+
+def _fire(cbs):
+    for cb in cbs:
+        try:
+            cb()
+        except Exception as ex:                         # pylint: disable=W0703
+            _trc.error(f'idle callback failed: {ex!r}')
+
+class FleetRotatorDevice(object):
+    """A RotatorDevice-compatible view onto one row of a RotatorFleet"""
+
+    __slots__ = ('_fleet', '_i', 'name')
+
+    def __init__(self, fleet, devno):
+        self._fleet = fleet
+        self._i = devno
+        self.name = 'device'
+
+    def snapshot(self):
+        f = self._fleet
+        i = self._i
+        while True:
+            seq = f.seq
+            if not seq & 1:
+                now = SimClock.now()
+                ofs = float(f.sync_offset[i])
+                mech, moving = self._motion(now)
+                st = RotatorState(bool(f.connected[i]), bool(f.can_reverse[i]), bool(f.reverse[i]),
+                                  float(f.step_size[i]), int(f.steps_per_sec[i]), wrap_angle(mech + ofs),
+                                  wrap_angle(float(f.target_position[i]) + ofs), moving, now, mech)
+                if f.seq == seq:
+                    return st
+            sleep(0)                                    # Writer is busy, let it finish
+
+    #
+    # (mechanical position, moving) at time 'now', as RotatorDevice's
+    # position_at() and moving_at(). Caller makes sure the row is consistent.
+    #
+    def _motion(self, now):
+        f = self._fleet
+        i = self._i
+        if not f.is_moving[i]:
+            return float(f.position[i]), False
+        t_end = float(f.mv_t_end[i])
+        nsteps = int(f.mv_nsteps[i])
+        if now >= t_end:
+            k = nsteps
+        else:
+            k = min(int((now - float(f.mv_t0[i])) * float(f.mv_rate[i])), nsteps)
+        return wrap_angle(float(f.mv_start[i]) + k * float(f.mv_dir[i])), now < t_end
+
+    #
+    # Reads of a single array element are atomic, no lock needed
+    #
+    @property
+    def can_reverse(self):
+        return bool(self._fleet.can_reverse[self._i])
+
+    @property
+    def reverse(self):
+        return bool(self._fleet.reverse[self._i])
+    @reverse.setter
+    def reverse(self, reverse):
+        with self._fleet.writing():
+            self._fleet.reverse[self._i] = reverse
+            self._fleet.settings_version[self._i] += 1
+
+    @property
+    def step_size(self):
+        return float(self._fleet.step_size[self._i])
+    @step_size.setter
+    def step_size(self, step_size):
+        with self._fleet.writing():
+            self._fleet.step_size[self._i] = step_size
+            self._fleet.settings_version[self._i] += 1
+
+    @property
+    def steps_per_sec(self):
+        return int(self._fleet.steps_per_sec[self._i])
+    @steps_per_sec.setter
+    def steps_per_sec(self, steps_per_sec):
+        with self._fleet.writing():
+            self._fleet.steps_per_sec[self._i] = steps_per_sec
+            self._fleet.settings_version[self._i] += 1
+
+    @property
+    def settings_version(self):
+        return int(self._fleet.settings_version[self._i])
+
+    @property
+    def position(self):
+        return self.snapshot().position
+
+    @property
+    def mechanical_position(self):
+        return self.snapshot().mechanical_position
+
+    @property
+    def target_position(self):
+        return self.snapshot().target_position
+
+    @property
+    def is_moving(self):
+        return self.snapshot().is_moving
+
+    @property
+    def connected(self):
+        return bool(self._fleet.connected[self._i])
+    @connected.setter
+    def connected(self, connected):
+        with self._fleet.writing():
+            self._fleet.connected[self._i] = connected
+
+    #
+    # Methods. As RotatorDevice, a 'pos' that is not a finite number raises
+    # ValueError before anything changes.
+    #
+    def _move_to(self, pos):
+        if pos >= 360.0:
+            pos -= 360.0
+        if pos < 0.0:
+            pos += 360.0
+        self._fleet.target_position[self._i] = pos
+        self._fleet.start_move(self._i)
+
+    def Move(self, pos):
+        check_finite(pos)
+        with self._fleet.writing():
+            self._fleet.update_one(self._i, SimClock.now())
+            self._move_to(float(self._fleet.position[self._i]) + pos)
+
+    def MoveAbsolute(self, pos):
+        check_finite(pos)
+        with self._fleet.writing():
+            self._move_to(wrap_angle(pos) - float(self._fleet.sync_offset[self._i]))
+
+    def MoveMechanical(self, pos):
+        check_finite(pos)
+        with self._fleet.writing():
+            self._move_to(pos)
+
+    def Sync(self, pos):
+        check_finite(pos)
+        with self._fleet.writing():
+            self._fleet.update_one(self._i, SimClock.now())
+            self._fleet.sync_offset[self._i] = wrap_angle(pos - float(self._fleet.position[self._i]))
+
+    def stop(self):
+        with self._fleet.writing():
+            cbs = self._fleet.stop(self._i)
+        _fire(cbs)
+
+    def notify_when_idle(self, callback):
+        return self._fleet.notify_when_idle(self._i, callback)
+
+    def cancel_notify(self, callback):
+        self._fleet.cancel_notify(self._i, callback)
+
+    def Halt(self):
+        self.stop()
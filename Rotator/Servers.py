@@ -0,0 +1,91 @@
+# pylint: disable=C0301,C0103,C0111
+# ============
+# WEB SERVERS
+# ============
+# The HTTP servers app.py can run the simulator under, selected with
+# --server (see config.py):
+#
+#   dev         Flask's built-in Werkzeug server. A new thread per connection
+#               and HTTP/1.0 (no keep-alive). Fine for a few clients.
+#   threaded    Werkzeug's HTTP handling on a fixed pool of --pool threads,
+#               with HTTP/1.1 keep-alive. No extra packages needed.
+#   gevent      gevent.pywsgi, a greenlet per connection (at most --pool of
+#               them), HTTP/1.1 keep-alive. Best for many concurrent clients.
+#               app.py monkey-patches the standard library before anything
+#               imports threading, so the MotionEngine, the locks and the
+#               discovery responder all run as greenlets.
+#
+# --keepalive is the idle timeout in seconds for a persistent connection,
+# 0 closes the connection after each response. --backlog is the listen()
+# queue length.
+#
+# 18-Oct-2026       1.1 Initial edit
+# 18-Oct-2026       1.1 TCP_NODELAY on threaded and gevent connections, no 40 ms delayed-ACK stalls
+#
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+Servers = ('dev', 'threaded', 'gevent')
+
+# --------------------
+# Threaded pool server
+# --------------------
+class PoolWSGIServer(BaseWSGIServer):
+    """Werkzeug WSGI server handing connections to a fixed thread pool"""
+    multithread = True
+
+    def __init__(self, host, port, app, pool, keepalive, backlog):
+        handler = type('PoolRequestHandler', (WSGIRequestHandler,),
+                       {'protocol_version': 'HTTP/1.1' if keepalive else 'HTTP/1.0',
+                        'timeout': keepalive or None,           # Idle keep-alive connections are dropped
+                        'disable_nagle_algorithm': True})       # Headers and body go out as separate writes
+        self.request_queue_size = backlog               # Used by listen() in the base __init__
+        BaseWSGIServer.__init__(self, host, port, app, handler)
+        self._pool = ThreadPoolExecutor(pool, thread_name_prefix='http')
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):        # As socketserver.ThreadingMixIn
+        try:
+            self.finish_request(request, client_address)
+        except Exception:                               # pylint: disable=W0703
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+# -------------
+# gevent server
+# -------------
+def _gevent_server(host, port, app, pool, keepalive, backlog):
+    from gevent.pool import Pool                        # pylint: disable=C0415
+    from gevent.pywsgi import WSGIServer, WSGIHandler   # pylint: disable=C0415
+
+    class Handler(WSGIHandler):
+        def handle(self):
+            if keepalive:
+                self.socket.settimeout(keepalive)       # Idle keep-alive connections are dropped
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            WSGIHandler.handle(self)
+
+        def start_response(self, status, headers, exc_info=None):
+            if not keepalive:                           # Tells the client too, and gevent closes after the response
+                headers = list(headers) + [('Connection', 'close')]
+            return WSGIHandler.start_response(self, status, headers, exc_info)
+
+    return WSGIServer((host, port), app, backlog=backlog, spawn=Pool(pool),
+                      handler_class=Handler, log=None)   # No per-request log, as with Werkzeug
+
+#
+# Run 'app' under the named server until interrupted
+#
+def serve(server, app, host, port, pool=32, keepalive=5.0, backlog=128):
+    if server == 'dev':
+        app.run(host, port)
+    elif server == 'threaded':
+        PoolWSGIServer(host, port, app, pool, keepalive, backlog).serve_forever()
+    elif server == 'gevent':
+        _gevent_server(host, port, app, pool, keepalive, backlog).serve_forever()
+    else:
+        raise ValueError(f'server must be one of {", ".join(Servers)}')
@@ -6,11 +6,17 @@
 # 23-Jan-2021   rbd     0.8 Version strings for form footers etc now in shr module
 # 17-Jan-2021   rbd     0.8 /setup endpoints are GET only (no POST)
 # 13-Oct-2021   rbd     0.9 Linting with some messages disabled, no docstrings
+# 18-Oct-2026           1.1 GET pages are rendered once per settings version and cached,
+#                       with strong ETags and 304 for If-None-Match (see PAGE CACHE)
+# 18-Oct-2026           1.1 Page cache moved out to Pages, no Swagger UI unless the swagger
+#                       setting is on (see config). app.py may load this on first use.
 
 from flask import  Blueprint, abort, render_template, make_response, flash
 from flask_restx import Api, Resource, fields
 import RotatorAPI
 import shr
+from Pages import cached_page
+import config
 from forms import SvrSetupForm, DevSetupForm    # Provides web-based setup UI for the server
 
 html_blueprint = Blueprint('Setup', __name__,
@@ -23,7 +29,7 @@ html_blueprint = Blueprint('Setup', __name__,
 #
 # This puts the Swagger UI for the HTML Browser UI on '/html/' leaving '/' and '/setup' open
 api = Api(default='',
-            doc='/html/',
+            doc='/html/' if config.get('swagger') == 'on' else False,
             default_label='<h2>ASCOM Alpaca HTML Browser UI: Base URL = <tt>/</tt>',
             contact='Bob Denny, DC-3 Dreams, SP',
             contact_email='rdenny@dc3.com',
@@ -50,21 +56,18 @@ class svrsetup(Resource):
     @api.doc(description='Primary browser web page for the overall collection of devices. ' +
                          'To access this use the <a href=\'/setup\'>HTML Interface</a>, not this Swagger UI')
     def get(self):
-        setup_form = SvrSetupForm()
-        response = make_response(render_template('/svrsetup.html',
-                    form=setup_form,
-                    template='form_page',
-                    title='Settings for the Server',
-                    nDev=RotatorAPI.nRot,                   # For Jinja to render the device stuff
-                    rDev=RotatorAPI.rRot,
-                    verFooter=shr.m_DriverVersion + ' ' + shr.m_DriverVerDate))
         #
         # Maybe there's a better way, but I wanted Flask-RESTX to make the
         # Swagger UI for the HTML Setup endpoints, so I needed to force the
-        # content-type over to text/html.  (typ.)
+        # content-type over to text/html.  (typ.) cached_page() does that.
         #
-        response.headers['Content-Type'] = 'text/html'
-        return response
+        return cached_page(('svrsetup',), 0, lambda: render_template('/svrsetup.html',
+                    form=SvrSetupForm(),
+                    template='form_page',
+                    title='Settings for the Server',
+                    nDev=RotatorAPI.nRot,                   # For Jinja to render the device stuff
+                    rDev=RotatorAPI.rRot,
+                    verFooter=shr.m_DriverVersion + ' ' + shr.m_DriverVerDate), form=True)
 
     @api.doc(description='Primary browser web page for the overall collection of devices. ' +
                          'To access this use the <a href=\'/\'>HTML Interface</a>, not this Swagger UI')
@@ -91,20 +94,20 @@ class devsetup(Resource):
         if not DeviceNumber in RotatorAPI.rRot:
             abort(400, shr.s_Resp400NoDevNo)
         rotDev = RotatorAPI.RotDev[DeviceNumber]
-        setup_form = DevSetupForm()
-        setup_form.reverse.data = rotDev.reverse
-        setup_form.step_size.data = rotDev.step_size
-        setup_form.steps_sec.data = rotDev.steps_per_sec
-        response = make_response(render_template('/devsetup.html',
+        def render():
+            setup_form = DevSetupForm()
+            setup_form.reverse.data = rotDev.reverse
+            setup_form.step_size.data = rotDev.step_size
+            setup_form.steps_sec.data = rotDev.steps_per_sec
+            return render_template('/devsetup.html',
                     form=setup_form,
                     template='form_page',
                     title='Settings for Rotator #' + str(DeviceNumber),
                     nDev=RotatorAPI.nRot,                       # For Jinja to render the device stuff (typ)
                     rDev=RotatorAPI.rRot,
                     sDev=DeviceNumber,
-                    verFooter=shr.m_DriverVersion + ' ' + shr.m_DriverVerDate))
-        response.headers['Content-Type'] = 'text/html'
-        return response
+                    verFooter=shr.m_DriverVersion + ' ' + shr.m_DriverVerDate)
+        return cached_page(('devsetup', DeviceNumber), rotDev.settings_version, render, form=True)
 
     @api.doc(description='Web page user interface that enables device specific configuration to be set ' +
                          'for each available device. This must be implemented, even if the response to ' +
@@ -0,0 +1,136 @@
+# pylint: disable=C0301,C0103,C0111
+# =========
+# SIM CLOCK
+# =========
+# The clock that all rotator motion is timed by. By default it is
+# time.monotonic() and costs nothing. For fast simulation it can run at a
+# multiple of real time:
+#
+#       python3 app.py --time-scale 100         (a 60 second move takes 0.6 s)
+#
+# or not run at all (scale 0, step-on-demand), when only advance() (PUT
+# /management/clock/advance) moves it on. Either way Position, IsMoving and
+# the move completion events all follow the same clock, so what a client
+# sees stays consistent however fast it runs.
+#
+# The clock is published as one immutable tuple (real base, virtual base,
+# scale), replaced on every change, and now() is rebound to the fastest
+# function for the current mode. Callers must call SimClock.now(), not
+# import it. Things that wait on the clock (the MotionEngine) register
+# with on_change() to be woken when it is rescaled or advanced.
+#
+# Discrete-event mode (set_discrete()) is step-on-demand made reproducible:
+# the clock starts at a given reading (the seed), timestamps are counted
+# from a fixed epoch rather than the wall clock, and the MotionEngine runs
+# the events itself in due order, with the clock set to each event's due
+# time in turn (see MotionEngine.run_until()).
+#
+# 18-Oct-2026       1.1 Initial edit
+# 18-Oct-2026       1.1 Discrete-event mode
+#
+import math
+from threading import Lock
+from time import monotonic, time
+
+_lock = Lock()                                          # Serializes changes only
+_clock = (0.0, 0.0, 1.0)                                # (real base, virtual base, scale)
+_listeners = []
+Discrete = False                                        # Deterministic discrete-event mode
+DiscreteEpoch = 946684800.0                             # 2000-01-01T00:00:00Z, wall time of 0 in that mode
+
+def _scaled():
+    r0, v0, s = _clock
+    return v0 + (monotonic() - r0) * s
+
+def _stopped():
+    return _clock[1]
+
+now = monotonic                                         # Rebound by _publish()
+
+_start = monotonic()
+
+def scale():
+    return _clock[2]
+
+def elapsed():
+    return now() - _start
+
+#
+# Real seconds until virtual time 'due', None if the clock is stopped
+#
+def real_delay(due):
+    _, _, s = _clock
+    if s == 0.0:
+        return None
+    return (due - now()) / s
+
+#
+# Wall-clock (epoch) time of virtual time 't' in the past, for timestamps
+# that clients see. Virtual time elapsed since then counts as real time.
+#
+def wall(t):
+    if Discrete:
+        return DiscreteEpoch + t
+    return time() - (now() - t)
+
+def _publish(clock, notify=True):
+    global _clock, now                                  # pylint: disable=W0603
+    _clock = clock
+    if clock[2] == 1.0 and clock[0] == clock[1]:
+        now = monotonic
+    elif clock[2] == 0.0:
+        now = _stopped
+    else:
+        now = _scaled
+    if notify:
+        for fn in list(_listeners):
+            fn()
+
+#
+# Run virtual time at 'factor' times real time from now on, 0 to stop it.
+# The clock carries on from where it is, it never jumps or goes back.
+#
+def set_scale(factor):
+    if not 0.0 <= factor < math.inf:
+        raise ValueError('scale must be a number, not negative')
+    if Discrete:
+        raise ValueError('the discrete-event clock only moves by advance')
+    with _lock:
+        r0, v0, s = _clock
+        r = monotonic()
+        _publish((r, v0 + (r - r0) * s, float(factor)))
+
+#
+# Move virtual time on by 'seconds'. Mostly for step-on-demand (scale 0),
+# but works at any scale.
+#
+def advance(seconds):
+    if not 0.0 <= seconds < math.inf:
+        raise ValueError('cannot go back in time')
+    with _lock:
+        r0, v0, s = _clock
+        r = monotonic()
+        _publish((r, v0 + (r - r0) * s + seconds, s))
+
+#
+# Stop the clock at reading 'seed' for good and switch to discrete-event
+# mode. Elapsed time is counted from the seed.
+#
+def set_discrete(seed=0.0):
+    global Discrete, _start                             # pylint: disable=W0603
+    with _lock:
+        Discrete = True
+        _start = float(seed)
+        _publish((monotonic(), float(seed), 0.0))
+
+#
+# Set the stopped clock to 't', which must not be in the past. For the
+# MotionEngine as it runs events, nothing is notified.
+#
+def jump_to(t):
+    with _lock:
+        if t > _clock[1]:
+            _publish((monotonic(), t, 0.0), False)
+
+def on_change(fn):
+    _listeners.append(fn)
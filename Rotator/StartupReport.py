@@ -0,0 +1,97 @@
+# pylint: disable=C0301,C0103,C0111
+# ==============
+# STARTUP REPORT
+# ==============
+# Where the time goes between starting Python and serving the first
+# request, in the spirit of python -X importtime but by stage rather than
+# by module:
+#
+#       python3 app.py --startup-report on
+#
+#        * Start-up          self ms   total ms  modules  most modules from
+#          interpreter          41.2       41.2        -
+#          flask               262.0      303.2      301  werkzeug 74, email 29, jinja2 25
+#          ...
+#
+# app.py imports this first and calls mark() after each stage. The time
+# before that (starting the interpreter and site) comes from /proc where
+# there is one. report() prints the table when main() is about to serve,
+# and first_request() adds the time to the first request when it is
+# answered. For the detail of any one stage, python -X importtime.
+#
+# This module must not import threading, it comes before the gevent
+# monkey-patching in app.py.
+#
+# 18-Oct-2026       1.1 Initial edit
+#
+import collections
+import os
+import sys
+from time import perf_counter
+
+TopPackages = 3                                         # Packages named for each stage
+
+#
+# Seconds this process has been running, from /proc (Linux), None where
+# that cannot be had.
+#
+def _process_age():
+    try:
+        with open('/proc/self/stat', encoding='ascii') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime', encoding='ascii') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+_t0 = perf_counter()
+_before = _process_age()                                # Time before this import, None if unknown
+_seen = set(sys.modules)
+_stages = []                                            # (stage, seconds, new modules, top packages)
+_last = _t0
+
+#
+# The end of a start-up stage: the time since the last mark and the
+# modules imported in between.
+#
+def mark(stage):
+    global _last                                        # pylint: disable=W0603
+    t = perf_counter()
+    new = set(sys.modules) - _seen
+    _seen.update(new)
+    top = collections.Counter(name.split('.', 1)[0] for name in new)
+    _stages.append((stage, t - _last, len(new), top.most_common(TopPackages)))
+    _last = t
+
+#
+# Seconds from the start of the process (or of this module if that is not
+# known) to now
+#
+def since_start():
+    return (_before or 0.0) + perf_counter() - _t0
+
+def report(out=None):
+    out = out or sys.stdout
+    print(' * Start-up          self ms   total ms  modules  most modules from', file=out)
+    total = 0.0
+    if _before is not None:
+        total = _before
+        print(f'   {"interpreter":<16}{_before * 1000:>9.1f}{total * 1000:>11.1f}{"-":>9}', file=out)
+    for stage, secs, count, top in _stages:
+        total += secs
+        names = ', '.join(f'{name} {n}' for name, n in top)
+        print(f'   {stage:<16}{secs * 1000:>9.1f}{total * 1000:>11.1f}{count:>9}  {names}', file=out)
+    print(f'   {len(sys.modules)} modules loaded', file=out)
+
+#
+# Print the time to the first request once it has been answered
+#
+def first_request(app):
+    done = []
+    @app.after_request
+    def _first(response):
+        if not done:
+            done.append(True)
+            print(f' * First request answered {since_start() * 1000:.1f} ms after start')
+        return response
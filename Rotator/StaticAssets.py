@@ -0,0 +1,123 @@
+# pylint: disable=C0301,C0103,C0111
+# =============
+# STATIC ASSETS
+# =============
+# Serves the static files (static/ and the Swagger UI's own files under
+# /swaggerui/) and the three Swagger specs (swagger.json) from memory, in
+# place of Flask's send_static_file and flask-restx's SwaggerView.
+#
+# Each file or spec is read (or serialized) once, on its first request, and
+# kept with a gzip copy if that is worthwhile and a content hash. Responses
+# are gzip when the client's Accept-Encoding allows it (Vary:
+# Accept-Encoding), and carry a strong ETag, different for each encoding,
+# so revalidation is a 304. A static URL with ?v=<content hash>, as the
+# templates make with asset(), is cached by browsers for a year.
+# Everything else is Cache-Control no-cache (always revalidate), since the
+# plain URLs do not change when the files do.
+#
+# 18-Oct-2026       1.1 Initial edit
+#
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from flask import Response, abort, request
+from werkzeug.security import safe_join
+
+MinGain = 0.9                                           # Keep the gzip copy only if at most this much of the size
+s_Immutable = 'public, max-age=31536000, immutable'
+s_Revalidate = 'no-cache'
+
+class Asset(object):
+    """One response body, its gzip copy and content hash"""
+    __slots__ = ('data', 'gzip', 'hash', 'mimetype')
+
+    def __init__(self, data, mimetype):
+        self.data = data
+        self.mimetype = mimetype
+        self.hash = hashlib.sha1(data).hexdigest()[:16]
+        packed = gzip.compress(data, 9, mtime=0)
+        self.gzip = packed if len(packed) <= len(data) * MinGain else None
+
+    def response(self, immutable=False):
+        packed = self.gzip is not None and request.accept_encodings['gzip'] > 0
+        etag = self.hash + '-gz' if packed else self.hash
+        if request.if_none_match.contains(etag):
+            resp = Response(status=304)
+        elif packed:
+            resp = Response(self.gzip, mimetype=self.mimetype)
+            resp.headers['Content-Encoding'] = 'gzip'
+        else:
+            resp = Response(self.data, mimetype=self.mimetype)
+        resp.set_etag(etag)
+        resp.headers['Cache-Control'] = s_Immutable if immutable else s_Revalidate
+        if self.gzip is not None:
+            resp.vary.add('Accept-Encoding')
+        return resp
+
+_files = {}                                             # Full path : Asset
+
+def _file(folder, filename):
+    path = safe_join(folder, filename)
+    if path is None:
+        return None
+    asset = _files.get(path)
+    if asset is None and os.path.isfile(path):          # Misses are not kept, there is no end to them
+        with open(path, 'rb') as f:
+            asset = Asset(f.read(), mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        asset = _files.setdefault(path, asset)
+    return asset
+
+#
+# The view for a static folder's '<path:filename>' rule
+#
+def static_view(folder):
+    def serve(filename):
+        asset = _file(folder, filename)
+        if asset is None:
+            return abort(404)
+        return asset.response(request.args.get('v') == asset.hash)
+    return serve
+
+#
+# The view for a flask-restx Api's swagger.json, serialized once as
+# SwaggerView would. A spec that failed to build is not kept.
+#
+def specs_view(api):
+    spec = []
+    def serve():
+        if not spec:
+            schema = api.__schema__
+            if 'error' in schema:
+                return Response(json.dumps(schema) + '\n', status=500, mimetype='application/json')
+            spec.append(Asset((json.dumps(schema) + '\n').encode(), 'application/json'))
+        return spec[0].response()
+    return serve
+
+#
+# URL of a file in the app's static folder with its content hash, for
+# templates: {{ asset('style.css') }}
+#
+def url_for_asset(app, filename):
+    asset = _file(app.static_folder, filename)
+    prefix = app.static_url_path or ''
+    if asset is None:
+        return f'{prefix}/{filename}'
+    return f'{prefix}/{filename}?v={asset.hash}'
+
+#
+# Take over the static and swagger.json routes of 'app' and the given
+# flask-restx Apis, and add asset() to the templates.
+#
+def install(app, apis):
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint == 'static':
+            app.view_functions['static'] = static_view(app.static_folder)
+        elif rule.endpoint.endswith('.static'):
+            bp = app.blueprints.get(rule.endpoint[:-len('.static')])
+            if bp is not None and bp.static_folder:
+                app.view_functions[rule.endpoint] = static_view(bp.static_folder)
+    for api in apis:
+        app.view_functions[api.endpoint('specs')] = specs_view(api)
+    app.jinja_env.globals['asset'] = lambda filename: url_for_asset(app, filename)
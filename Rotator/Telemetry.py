@@ -0,0 +1,194 @@
+# pylint: disable=C0301,C0103,C0111
+# =========
+# TELEMETRY
+# =========
+# Pushes rotator state to any number of watchers (the home page, external
+# dashboards) as Server-Sent Events, so they need not poll every property
+# of every device.
+#
+# One producer thread samples the devices that exist at most 'rate' times
+# a second (only while someone is subscribed) and hands the devices whose
+# Position, TargetPosition or IsMoving changed to each Subscriber. A
+# subscriber coalesces those into one pending frame, latest state per
+# device, and queues the frame no more often than its own interval. Its
+# queue is bounded: a consumer that falls 'maxq' frames behind is dropped
+# rather than slowing down the producer or the motion engine.
+#
+# How a consumer waits for frames is up to it, the Subscriber calls the
+# 'wake' function it was given (Event.set for a Flask response, a
+# call_soon_threadsafe for the asyncio front end).
+#
+# 18-Oct-2026       1.1 Initial edit
+#
+import collections
+import json
+from threading import Thread, Lock, Event
+from time import monotonic, sleep
+import TraceLog
+
+_trc = TraceLog.tracer('Telemetry')
+
+s_EvtTelemetry = 'telemetry'
+s_EvtDropped = 'dropped'
+Heartbeat = 15.0                                        # Seconds between SSE comments on a quiet stream
+
+class Subscriber(object):
+    """One watcher: device filter, rate limit and a bounded frame queue"""
+
+    def __init__(self, devices, interval, maxq, wake):
+        self.devices = devices                          # Set of device numbers, None for all
+        self.interval = interval
+        self.maxq = maxq
+        self.dropped = False
+        self._wake = wake
+        self._pending = {}                              # devno : (position, target, moving), coalesced
+        self._due = 0.0
+        self._frames = collections.deque()              # append/popleft are atomic, no lock
+
+    #
+    # Producer thread. Returns False if the subscriber has to be dropped.
+    #
+    def offer(self, changes, now):
+        if self.devices is None:
+            self._pending.update(changes)
+        else:
+            for devno, rec in changes.items():
+                if devno in self.devices:
+                    self._pending[devno] = rec
+        if not self._pending or now < self._due:
+            return True
+        if len(self._frames) >= self.maxq:
+            self.dropped = True
+            self._wake()
+            return False
+        self._frames.append(self._pending)
+        self._pending = {}
+        self._due = now + self.interval
+        self._wake()
+        return True
+
+    #
+    # Consumer. All queued frames, oldest first.
+    #
+    def take(self):
+        frames = []
+        while self._frames:
+            frames.append(self._frames.popleft())
+        return frames
+
+class Hub(object):
+    """The producer, fanning device changes out to the subscribers"""
+
+    def __init__(self, devices, rate=10.0, maxq=64):
+        self._devices = devices                         # Returns [(devno, device), ...] for existing devices
+        self.rate = rate                                # Most samples per second
+        self.maxq = maxq
+        self._lock = Lock()
+        self._subs = []
+        self._last = {}                                 # Replaced, never changed in place
+        self._active = Event()
+        self._thread = None
+        self.dropped = 0                                # Slow subscribers dropped so far
+
+    def subscribe(self, wake, devices=None, rate=None):
+        rate = self.rate if rate is None else min(rate, self.rate)
+        sub = Subscriber(devices, 1.0 / rate, self.maxq, wake)
+        with self._lock:
+            sub.offer(self._last, 0.0)                  # Current state of everything first
+            self._subs.append(sub)
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name='Telemetry', daemon=True)
+                self._thread.start()
+            self._active.set()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            if sub in self._subs:
+                self._subs.remove(sub)
+            if not self._subs:
+                self._active.clear()
+
+    @property
+    def subscribers(self):
+        return len(self._subs)
+
+    def sample(self):
+        changes = {}
+        last = self._last
+        for devno, dev in self._devices():
+            st = dev.snapshot()
+            rec = (st.position, st.target_position, st.is_moving)
+            if last.get(devno) != rec:
+                changes[devno] = rec
+        if changes:
+            last = dict(last)
+            last.update(changes)
+            self._last = last
+        return changes
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            t0 = monotonic()
+            try:
+                changes = self.sample()
+                with self._lock:
+                    for sub in list(self._subs):
+                        if not sub.offer(changes, t0):
+                            self._subs.remove(sub)
+                            self.dropped += 1
+                            if _trc.level >= TraceLog.INFO:
+                                _trc.info(f'slow subscriber dropped ({sub.maxq} frames behind)')
+                    if not self._subs:
+                        self._active.clear()
+            except Exception as ex:                     # pylint: disable=W0703
+                _trc.error(f'sample failed: {ex!r}')
+            delay = t0 + 1.0 / self.rate - monotonic()
+            if delay > 0:
+                sleep(delay)
+
+#
+# Devices query parameter, e.g. '0,3,7'. None (all) if empty, ValueError if
+# a number is not a device.
+#
+def parse_devices(text, count):
+    if not text or not text.strip():
+        return None
+    devs = {int(d) for d in text.split(',') if d.strip()}
+    if not devs or any(not 0 <= d < count for d in devs):
+        raise ValueError('no such device')
+    return devs
+
+# ------------------
+# Server-Sent Events
+# ------------------
+def format_frame(frame):
+    data = {str(devno): {'Position': pos, 'TargetPosition': tgt, 'IsMoving': mov}
+            for devno, (pos, tgt, mov) in sorted(frame.items())}
+    return f'event: {s_EvtTelemetry}\ndata: {json.dumps(data)}\n\n'.encode()
+
+s_Dropped = f'event: {s_EvtDropped}\ndata: {{}}\n\n'.encode()
+s_Heartbeat = b': keep-alive\n\n'
+
+#
+# SSE byte chunks for a subscriber, for a streaming WSGI response. Blocks
+# its (green)thread between frames. Unsubscribes when the client goes away.
+#
+def stream(hub, devices=None, rate=None):
+    ev = Event()
+    sub = hub.subscribe(ev.set, devices, rate)
+    try:
+        yield b'retry: 2000\n\n'
+        while True:
+            if not ev.wait(Heartbeat):
+                yield s_Heartbeat
+                continue
+            ev.clear()
+            for frame in sub.take():
+                yield format_frame(frame)
+            if sub.dropped:
+                yield s_Dropped
+                return
+    finally:
+        hub.unsubscribe(sub)
@@ -0,0 +1,150 @@
+# pylint: disable=C0301,C0103,C0111
+# =============
+# TRACE LOGGING
+# =============
+# Leveled trace messages that replace the print() calls in the hot paths.
+# Each module gets a Tracer with its own level, and call sites test the
+# level before formatting anything, so a disabled trace costs one
+# attribute compare:
+#
+#       _trc = TraceLog.tracer('RotatorDevice')
+#       ...
+#       if _trc.level >= TraceLog.DEBUG:
+#           _trc.debug(f'[Move] pos={pos}')
+#
+# Messages go into an in-memory ring (a bounded deque, whose append is
+# atomic so no lock is taken) and a background thread drains the ring to
+# the trace file, if one is configured. Nothing is printed and no file I/O
+# happens on the caller's thread. The management API can change levels at
+# runtime and dump the ring (see ManagementAPI /trace and /tracelevel).
+#
+# 18-Oct-2026       1.1 Initial edit
+#
+import collections
+import itertools
+import time
+from threading import Thread, Event
+
+OFF = 0
+ERROR = 1
+INFO = 2
+DEBUG = 3
+LevelNames = {'off': OFF, 'error': ERROR, 'info': INFO, 'debug': DEBUG}
+_LevelChars = '-EID'
+
+RingSize = 4096
+_ring = collections.deque(maxlen=RingSize)              # (seq, time, module, level, message)
+_seq = itertools.count(1)
+_tracers = {}
+DefaultLevel = ERROR
+
+class Tracer(object):
+    __slots__ = ('module', 'level')
+
+    def __init__(self, module, level):
+        self.module = module
+        self.level = level
+
+    def write(self, level, msg):
+        if level <= self.level:
+            _ring.append((next(_seq), time.time(), self.module, level, msg))
+
+    def error(self, msg):
+        self.write(ERROR, msg)
+
+    def info(self, msg):
+        self.write(INFO, msg)
+
+    def debug(self, msg):
+        self.write(DEBUG, msg)
+
+def tracer(module):
+    trc = _tracers.get(module)
+    if trc is None:
+        trc = _tracers.setdefault(module, Tracer(module, DefaultLevel))
+    return trc
+
+def parse_level(name):
+    try:
+        return LevelNames[str(name).lower()]
+    except KeyError:
+        raise ValueError(f'trace level must be one of {", ".join(LevelNames)}') from None
+
+def set_level(module, level):
+    global DefaultLevel                                 # pylint: disable=W0603
+    if module in ('*', 'all'):
+        DefaultLevel = level                            # Also for modules not yet loaded
+        for trc in _tracers.values():
+            trc.level = level
+    else:
+        tracer(module).level = level
+
+def levels():
+    return {name: trc.level for name, trc in sorted(_tracers.items())}
+
+#
+# Apply a spec like 'RotatorDevice=debug,DiscoveryResponder=info' or just
+# 'info' for every module.
+#
+def configure(spec):
+    for item in filter(None, (s.strip() for s in spec.split(','))):
+        if '=' in item:
+            module, name = item.split('=', 1)
+            set_level(module.strip(), parse_level(name.strip()))
+        else:
+            set_level('*', parse_level(item))
+
+def format_entry(entry):
+    seq, t, module, level, msg = entry
+    ts = time.strftime('%H:%M:%S', time.localtime(t)) + f'.{int(t * 1000) % 1000:03d}'
+    return f'{seq:>8} {ts} {_LevelChars[level]} {module}: {msg}'
+
+#
+# Newest 'count' entries (all of them if None), oldest first
+#
+def dump(count=None):
+    entries = list(_ring)
+    if count is not None:
+        entries = entries[-count:] if count > 0 else []
+    return [format_entry(e) for e in entries]
+
+# -------------
+# File drainer
+# -------------
+class _Drainer(Thread):
+    def __init__(self, path, interval):
+        Thread.__init__(self, name='TraceLog')
+        self.path = path
+        self.interval = interval
+        self.last = 0                                   # Highest seq written
+        self.wake = Event()
+        self.daemon = True
+        self.start()
+
+    def drain(self):
+        entries = [e for e in list(_ring) if e[0] > self.last]
+        if not entries:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            if entries[0][0] > self.last + 1 and self.last:
+                f.write(f'*** {entries[0][0] - self.last - 1} trace entries lost (ring overrun)\n')
+            for e in entries:
+                f.write(format_entry(e) + '\n')
+        self.last = entries[-1][0]
+
+    def run(self):
+        while True:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            try:
+                self.drain()
+            except OSError:
+                pass                                    # Keep the ring, try again next time
+
+_drainer = None
+
+def start_file(path, interval=0.5):
+    global _drainer                                     # pylint: disable=W0603
+    if _drainer is None:
+        _drainer = _Drainer(path, interval)
+    return _drainer
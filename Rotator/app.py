@@ -38,6 +38,20 @@
 # 20-Jul-2022   rbd Version 1.0 Upgraded discovery. Testing with the latest of the packages out there.
 #                   Repo moved from DC-3 Dreams private git server to GitHub  for eventual release
 #                   as ASCOM Initiative sample. f-strings (modern me!)
+# 18-Oct-2026       Version 1.1 Shared motion engine, closed-form motion model, optional NumPy
+#                   fleet backend. Device count from --devices, ROTATOR_DEVICES or rotator.ini,
+#                   devices are created on first use.
+#                   print() on the hot paths replaced by TraceLog, see --trace and --trace-file.
+#                   --server dev, threaded or gevent with --host, --port, --pool, --keepalive
+#                   and --backlog (Servers.py). Discovery starts in main(), not on import.
+#                   Optional asyncio front end for the Alpaca APIs, --async-port (AsyncAPI.py).
+#                   Prometheus metrics at /management/metrics (Metrics.py).
+#                   Home and setup pages cached per settings version, ETag and 304 (SetupAPI.py).
+#                   Static files and swagger.json served from memory, gzip, ETags (StaticAssets.py).
+#                   --profile fast: no Swagger UIs, setup pages loaded on first use, compiled
+#                   templates kept (Jinja bytecode cache). --startup-report (StartupReport.py).
+#                   Per-client rate and concurrency limits on the Rotator API, --admit-rate etc.
+#                   (Admission.py), counters at /management/clients.
 # =================================================================================================
 
 # ===============================
@@ -62,51 +76,94 @@
 #       http://www.gevent.org/api/gevent.pywsgi.html
 #
 
+# -------------------------------------------------------
+# Start-up timing, first so it sees all the imports after
+# -------------------------------------------------------
+import StartupReport
+
+# -----------------------------------------------------------
+# gevent must patch the standard library before anything else
+# imports threading (MotionEngine, locks, discovery, ...)
+# -----------------------------------------------------------
+import config
+if config.peek('server') == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+    StartupReport.mark('gevent')
+
+import argparse
 import os
 import logging
+from threading import Thread
+import jinja2
 from flask import Flask, render_template
+StartupReport.mark('flask')
 
 # -----------------------------
 # Shared vriables and functions
 # -----------------------------
 import shr
 
+# -------------------------------------------------------------
+# Configuration (device count etc.), must precede the API modules
+# -------------------------------------------------------------
+import TraceLog
+config.load()
+if config.get('trace_file'):
+    TraceLog.start_file(config.get('trace_file'))
+StartupReport.mark('config')
+
 # -----------
 # Rotator API (this hooks to simulator)
 #------------
 import RotatorAPI
+StartupReport.mark('RotatorAPI')
 
 # --------------
 # Management API
 #---------------
 import ManagementAPI
+StartupReport.mark('ManagementAPI')
 
-# --------------
-# HTML Setup API
-#---------------
-import SetupAPI
+# ----------------------------------------------------------
+# HTML Setup API, now, on first use (setup_ui lazy) or never
+#-----------------------------------------------------------
+if config.get('setup_ui') == 'on':
+    import SetupAPI
+    StartupReport.mark('SetupAPI')
+import Pages
 
 # -------------------
 # Discovery responder
 # -------------------
 import DiscoveryResponder
 
-# ----------------------
-# Production server only
-# ----------------------
-# Uncomment if using gevent/WSGIServer, see the SERVER APPLICAITION section below
-# from gevent.pywsgi import WSGIServer
+# -------
+# Metrics
+# -------
+import Metrics
+
+# ------------------------------
+# Static files and Swagger specs
+# ------------------------------
+import StaticAssets
+
+# -------------------------------
+# Web servers (dev/threaded/gevent)
+# -------------------------------
+import Servers
+StartupReport.mark('other modules')
 
 #import ASCOMErrors                                     # All Alpaca Devices
 
 # -----------------
 # Network Connection
 # ----------------
+# --host and --mcast (see config.py) override these defaults
+#
 if os.name == 'nt':                                     # This is really Windows (my dev system eh?)
     HOST = '127.0.0.1'
     MCAST = '127.0.0.255'
-    print(f' * Running on Windows for Development... {HOST}')
-    print(f' * Assuming broadcast address is {MCAST}')
 else:
 #
 # Unbelievable what you need to do to get your live IP address
@@ -116,14 +173,9 @@ else:
 #
     HOST = '192.168.0.42'                               # Your device's IP(V4) address
     MCAST = '192.168.0.255'                             # Discovery: Depends on your CIDR block
-    print(f' * Assuming run on Raspberry Pi Linux {HOST}')
-PORT = 5555                                             # Port on which the device responds
-
-sprt = str(PORT)
-print(f' * Simulator accessible via Alpaca at {HOST}:{sprt}')
-print(f'   For mangement home page http://{HOST}:{sprt}/')
-
-_DSC = DiscoveryResponder.DiscoveryResponder(MCAST, HOST, PORT)
+HOST = config.get('host') or HOST
+MCAST = config.get('mcast') or MCAST
+PORT = config.get('port')                               # Port on which the device responds
 
 
 # ===============================
@@ -145,17 +197,45 @@ app.config['RESTX_MASK_SWAGGER'] = False    # Not used in our device, so hide th
 #
 @app.route('/')             # Must precede others or won't be recognized
 def index():
-    return render_template('/index.html',
+    return Pages.cached_page(('index',), 0, lambda: render_template('/index.html',
                     title='Alpaca Rotator Simulator (Python 3 / Flask)',
                     nDev=RotatorAPI.nRot,   # For Jinja to render the device stuff
                     rDev=RotatorAPI.rRot,
-                    verFooter=shr.m_DriverVersion + ' ' + shr.m_DriverVerDate)
+                    verFooter=shr.m_DriverVersion + ' ' + shr.m_DriverVerDate))
 # -----------------
 # Register our APIs
 # -----------------
 app.register_blueprint(RotatorAPI.rot_blueprint)
 app.register_blueprint(ManagementAPI.mgmt_blueprint)
-app.register_blueprint(SetupAPI.html_blueprint)
+apis = [RotatorAPI.api, ManagementAPI.api]
+if config.get('setup_ui') == 'on':
+    app.register_blueprint(SetupAPI.html_blueprint)
+    apis.append(SetupAPI.api)
+elif config.get('setup_ui') == 'lazy':
+    #
+    # Only the GET pages, the same as SetupAPI's routes. WTForms, Flask-WTF
+    # and the third flask-restx Api are loaded by the first of them.
+    #
+    def lazy_setup(DeviceNumber=None):
+        import SetupAPI                                 # pylint: disable=C0415,W0621
+        if DeviceNumber is None:
+            return SetupAPI.svrsetup(SetupAPI.api).get()
+        return SetupAPI.devsetup(SetupAPI.api).get(DeviceNumber)
+    app.add_url_rule('/setup/', 'lazy_setup', lazy_setup)
+    app.add_url_rule('/setup/v1/rotator/<int:DeviceNumber>/setup', 'lazy_setup', lazy_setup)
+Metrics.flask_hooks(app)                # Request latency etc. for /management/metrics
+StaticAssets.install(app, apis)         # Static files and swagger.json from memory
+
+#
+# Compiled templates are kept in template_cache and loaded from there
+# next time instead of compiling them again.
+#
+if config.get('template_cache'):
+    os.makedirs(config.get('template_cache'), exist_ok=True)
+    app.jinja_env.bytecode_cache = jinja2.FileSystemBytecodeCache(config.get('template_cache'))
+if config.get('startup_report') == 'on':
+    StartupReport.first_request(app)
+StartupReport.mark('app')
 
 log = logging.getLogger('werkzeug')     # Webserver used by Flask (dev/small server)
 log.setLevel(logging.ERROR)             # Prevent successful HTTP traffic from being logged
@@ -164,23 +244,57 @@ log.setLevel(logging.ERROR)             # Prevent successful HTTP traffic from b
 # SERVER APPLICATION
 # ==================
 #
-# Start it this way to get the automatic tab on Chrome
-# with the right host/port.
+# Load (or compile) every template while the server starts, so that the
+# first page does not wait for it.
 #
-if __name__ == '__main__':
+def precompile():
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template('/' + name)          # As the views name them, it is part of the key
+
+def main():
     #
-    # -----------
-    # Development
-    # -----------
-    # (built-in Werkzeug)
+    # The configuration was loaded above, this adds --help and rejects
+    # options that are not ours.
     #
-    app.run(HOST, PORT)
+    parser = argparse.ArgumentParser(description='ASCOM Alpaca Rotator Simulator')
+    config.add_arguments(parser)
+    parser.parse_args()
+
+    if os.name == 'nt':
+        print(f' * Running on Windows for Development... {HOST}')
+        print(f' * Assuming broadcast address is {MCAST}')
+    else:
+        print(f' * Assuming run on Raspberry Pi Linux {HOST}')
+    sprt = str(PORT)
+    print(f' * Simulator accessible via Alpaca at {HOST}:{sprt}')
+    print(f'   For mangement home page http://{HOST}:{sprt}/')
+    print(f' * Server {config.get("server")}', end='')
+    if config.get('server') != 'dev':
+        print(f' pool={config.get("pool")} keepalive={config.get("keepalive")}s backlog={config.get("backlog")}', end='')
+    print()
+
+    DiscoveryResponder.DiscoveryResponder(MCAST, HOST, PORT, ipv6=config.get('discovery_ipv6'),
+                                          rate=config.get('discovery_rate'))
+    if config.get('async_port'):
+        import AsyncAPI                                 # pylint: disable=C0415
+        AsyncAPI.start(HOST, config.get('async_port'), config.get('keepalive'), config.get('backlog'))
+        print(f' * Alpaca APIs also served by asyncio at {HOST}:{config.get("async_port")}')
+    if config.get('template_cache'):
+        Thread(target=precompile, name='Precompile', daemon=True).start()
+    StartupReport.mark('main')
+    if config.get('startup_report') == 'on':
+        StartupReport.report()
     #
-    # ----------
-    # Production
-    # ----------
-    # You probably want to alter logging, it's going to the console by default
+    # dev is the built-in Werkzeug server. For threaded and gevent you
+    # probably want to alter logging, it's going to the console by default
     # http://www.gevent.org/api/gevent.pywsgi.html
     #
-    #http_server = WSGIServer((HOST, PORT), app)
-    #http_server.serve_forever()
+    Servers.serve(config.get('server'), app, HOST, PORT, pool=config.get('pool'),
+                  keepalive=config.get('keepalive'), backlog=config.get('backlog'))
+
+#
+# Start it this way to get the automatic tab on Chrome
+# with the right host/port.
+#
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1240 @@
+# pylint: disable=C0301,C0103,C0111
+# ==========================
+# ROTATOR SIMULATOR BENCHMARKS
+# ==========================
+# Run from the Rotator folder, e.g.
+#
+#       python3 bench.py engine --devices 4 100 1000 --rate 60 --seconds 5
+#
+# Each sub-command measures one part of the simulator and prints a small
+# table. None of them need the web server to be running.
+#
+# 18-Oct-2026       1.1 Initial edit, 'engine' benchmark (steps/s and tick jitter)
+# 18-Oct-2026       1.1 'engine' measures completion lateness and CPU, devices no longer tick per step
+# 18-Oct-2026       1.1 'fleet' benchmark, NumPy fleet backend vs object-per-device
+# 18-Oct-2026       1.1 'contention' benchmark, locked property reads vs snapshot()
+# 18-Oct-2026       1.1 'responses' benchmark, in-process requests/s and CPU per request
+# 18-Oct-2026       1.1 'connections' benchmark, concurrent polling clients per front end
+# 18-Oct-2026       1.1 'batch' benchmark, one /management/batch vs individual property GETs
+# 18-Oct-2026       1.1 'load' generator, scripted Alpaca clients with a saved-baseline check
+# 18-Oct-2026       1.1 'timing' accuracy harness, achieved rate, step jitter, completion error, --check
+# 18-Oct-2026       1.1 'discovery' benchmark, packets/s of the original and selector responders, rate limit storm
+# 18-Oct-2026       1.1 'des' check, identical state histories in discrete-event mode, simulated vs real time
+# 18-Oct-2026       1.1 'startup' benchmark, time to first request of the standard and fast profiles
+# 18-Oct-2026       1.1 'admission' benchmark, polite clients' latency next to a greedy one, with and without limits
+#
+import argparse
+import contextlib
+import io
+import os
+import socket
+import statistics
+import sys
+import time
+from threading import Timer, Lock, Thread
+
+import RotatorDevice
+
+# ======
+# ENGINE
+# ======
+#
+# Compares the current motion engine with the original one-threading.Timer-
+# per-step engine. Every device is sent on a move that should take about
+# 80% of the run at the nominal rate. We record when each device actually
+# finished, and the process CPU time used while they moved. Lateness is the
+# actual completion time less the nominal move time.
+#
+
+class LegacyTimerDevice(object):
+    """The original stepping code: a new threading.Timer for each step"""
+    def __init__(self):
+        self._lock = Lock()
+        self._timer = None
+        self._stopped = True
+        self._is_moving = False
+        self._position = 0.0
+        self._target_position = 0.0
+        self.step_size = 1.0
+        self.steps_per_sec = 6
+        self.connected = False
+
+    @property
+    def position(self):
+        with self._lock:
+            return self._position
+
+    def MoveAbsolute(self, pos):
+        with self._lock:
+            self._target_position = pos
+            self._is_moving = True
+            if self._stopped:
+                self._stopped = False
+                self._start_timer()
+
+    def _start_timer(self):
+        self._timer = Timer(1.0 / self.steps_per_sec, self._legacy_run)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _legacy_run(self):
+        self._lock.acquire()
+        delta = self._target_position - self._position
+        if abs(delta) > (self.step_size / 2.0):
+            self._position += self.step_size if delta > 0 else -self.step_size
+            self._start_timer()
+        else:
+            self._is_moving = False
+            self._stopped = True
+            self.done_hook()
+        self._lock.release()
+
+    def Halt(self):
+        self._lock.acquire()
+        self._stopped = True
+        self._is_moving = False
+        if self._timer is not None:
+            self._timer.cancel()
+        self._lock.release()
+
+    def done_hook(self):
+        pass
+
+class EngineDevice(RotatorDevice.RotatorDevice):
+    def _complete(self, gen):
+        super()._complete(gen)
+        self.done_hook()
+
+    def done_hook(self):
+        pass
+
+def _instrument(cls):
+    class Recorder(cls):
+        def __init__(self):
+            super().__init__()
+            self.done_at = None
+        def done_hook(self):
+            if self.done_at is None:
+                self.done_at = time.monotonic()
+    return Recorder
+
+def _percentile(data, pct):
+    if not data:
+        return 0.0
+    data = sorted(data)
+    k = min(len(data) - 1, int(round(pct / 100.0 * (len(data) - 1))))
+    return data[k]
+
+def run_engine(cls, ndev, rate, seconds):
+    nsteps = max(1, int(rate * seconds * 0.8))
+    devs = [_instrument(cls)() for _ in range(ndev)]
+    for d in devs:
+        d.steps_per_sec = rate
+        d.step_size = 0.01
+        d.connected = True
+    cpu0 = time.process_time()
+    t0 = time.monotonic()
+    for d in devs:
+        d.MoveAbsolute(nsteps * 0.01)
+    time.sleep(seconds)
+    cpu = time.process_time() - cpu0
+    for d in devs:
+        d.Halt()
+    elapsed = time.monotonic() - t0
+    nominal = nsteps / rate
+    late = []
+    steps = 0
+    for d in devs:
+        if d.done_at is None:                           # Still moving at the end of the run
+            late.append(elapsed - nominal)
+            steps += round(d.position / 0.01)
+        else:
+            late.append(d.done_at - t0 - nominal)
+            steps += nsteps
+    return {
+        'devices'   : ndev,
+        'nominal'   : ndev * rate,
+        'steps/s'   : steps / max(nominal, max(late) + nominal),
+        'late_mean' : statistics.fmean(late) * 1000.0,
+        'late_p99'  : _percentile(late, 99) * 1000.0,
+        'late_max'  : max(late) * 1000.0,
+        'cpu'       : cpu,
+    }
+
+def cmd_engine(args):
+    engines = {'timer': LegacyTimerDevice, 'engine': EngineDevice}
+    print(f'{"engine":>8} {"devices":>8} {"nominal":>9} {"steps/s":>9} {"late avg":>9} {"late p99":>9} {"late max":>9} {"cpu s":>7}')
+    for ndev in args.devices:
+        for name in args.engines:
+            with contextlib.redirect_stdout(io.StringIO()):     # Keep any device chatter out of the table
+                r = run_engine(engines[name], ndev, args.rate, args.seconds)
+            print(f'{name:>8} {r["devices"]:>8} {r["nominal"]:>9} {r["steps/s"]:>9.0f} ' +
+                  f'{r["late_mean"]:>7.1f}ms {r["late_p99"]:>7.1f}ms {r["late_max"]:>7.1f}ms {r["cpu"]:>7.2f}')
+            time.sleep(0.5)                             # Let stray timer threads wind down
+
+# ======
+# TIMING
+# ======
+#
+# Timing accuracy of a move across step rates (1-60, the setup form's
+# limits) and device counts. Every device makes a move of about --seconds
+# at the nominal rate while this thread samples the position of a few of
+# them at --sample-hz and notes when each step shows up. From that:
+#
+#       achieved    steps made / time taken, as % of the nominal rate
+#                   (worst device)
+#       jitter      standard deviation of the time between steps, ms
+#                   (includes the sampling resolution, 1/sample-hz)
+#       late        completion time less nominal move time, ms
+#
+# With --check the run fails (exit status 1) if any result is outside
+# --min-rate, --max-jitter or --max-late, so an engine change can be
+# tested against these limits. The original Timer-per-step engine
+# ('timer') is there for comparison and does not pass.
+#
+
+def _sample_steps(devs, sampled, hz, t_end, out):
+    last = [round(d.position / 0.01) for d in sampled]
+    period = 1.0 / hz
+    due = time.monotonic()
+    while True:
+        now = time.monotonic()
+        if now >= t_end or all(d.done_at is not None for d in devs):
+            return
+        for j, d in enumerate(sampled):
+            k = round(d.position / 0.01)
+            if k != last[j]:
+                out[j].append(now)
+                last[j] = k
+        due += period
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+def run_timing(cls, ndev, rate, seconds, nsampled, hz):
+    nsteps = max(2, round(rate * seconds))
+    nominal = nsteps / rate
+    devs = [_instrument(cls)() for _ in range(ndev)]
+    for d in devs:
+        d.steps_per_sec = rate
+        d.step_size = 0.01
+        d.connected = True
+    sampled = devs[:nsampled]
+    steps = [[] for _ in sampled]
+    starts = []
+    for d in devs:
+        starts.append(time.monotonic())                 # Each device is timed from its own start
+        d.MoveAbsolute(nsteps * 0.01)
+    _sample_steps(devs, sampled, hz, starts[-1] + nominal * 2.0 + 1.0, steps)
+    t_end = time.monotonic()
+    for d in devs:
+        d.Halt()
+    achieved = []
+    late = []
+    for d, t0 in zip(devs, starts):
+        if d.done_at is None:                           # Gave up on it
+            achieved.append(round(d.position / 0.01) / (t_end - t0) / rate)
+            late.append(t_end - t0 - nominal)
+        else:
+            achieved.append(nsteps / (d.done_at - t0) / rate)
+            late.append(d.done_at - t0 - nominal)
+    gaps = [b - a for ts in steps for a, b in zip(ts, ts[1:])]
+    return {
+        'rate'      : rate,
+        'devices'   : ndev,
+        'achieved'  : min(achieved) * 100.0,
+        'jitter'    : statistics.pstdev(gaps) * 1000.0 if len(gaps) > 1 else 0.0,
+        'late_p50'  : _percentile(late, 50) * 1000.0,
+        'late_p99'  : _percentile(late, 99) * 1000.0,
+        'late_max'  : max(late) * 1000.0,
+    }
+
+def cmd_timing(args):
+    engines = {'timer': LegacyTimerDevice, 'engine': EngineDevice}
+    failed = 0
+    print(f'{"engine":>8} {"rate":>5} {"devices":>8} {"achieved":>9} {"jitter":>8} {"late p50":>9} {"late p99":>9} {"late max":>9}')
+    for name in args.engines:
+        for ndev in args.devices:
+            for rate in args.rates:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    r = run_timing(engines[name], ndev, rate, args.seconds, args.sampled, args.sample_hz)
+                bad = []
+                if r['achieved'] < args.min_rate:
+                    bad.append('rate')
+                if r['jitter'] > args.max_jitter:
+                    bad.append('jitter')
+                if r['late_p99'] > args.max_late:
+                    bad.append('late')
+                print(f'{name:>8} {rate:>5} {ndev:>8} {r["achieved"]:>8.1f}% {r["jitter"]:>6.2f}ms ' +
+                      f'{r["late_p50"]:>7.1f}ms {r["late_p99"]:>7.1f}ms {r["late_max"]:>7.1f}ms' +
+                      (f'  FAIL {",".join(bad)}' if args.check and bad else ''))
+                failed += bool(bad)
+                time.sleep(0.5)                         # Let stray timer threads wind down
+    if args.check:
+        print(f'{failed} of {len(args.engines) * len(args.devices) * len(args.rates)} outside the limits')
+        return 1 if failed else 0
+    return 0
+
+# =====
+# FLEET
+# =====
+#
+# Cost of bringing every moving rotator up to date once (one engine tick),
+# object-per-device versus the vectorized RotatorFleet. For the object
+# engine that is one closed-form evaluation per device.
+#
+
+def _update_objects(devs, now):
+    for d in devs:
+        d._state.position_at(now)
+
+def cmd_fleet(args):
+    import RotatorFleet                                 # pylint: disable=C0415
+    print(f'{"devices":>8} {"backend":>8} {"create ms":>10} {"tick us":>10} {"us/device":>10}')
+    for ndev in args.devices:
+        with contextlib.redirect_stdout(io.StringIO()):
+            t = time.perf_counter()
+            devs = [RotatorDevice.RotatorDevice() for _ in range(ndev)]
+            create_obj = time.perf_counter() - t
+            t = time.perf_counter()
+            fleet = RotatorFleet.RotatorFleet(ndev)
+            views = [fleet.device(i) for i in range(ndev)]
+            create_fleet = time.perf_counter() - t
+            for d in devs + views:
+                d.MoveAbsolute(359.0)
+        now = time.monotonic()
+        t = time.perf_counter()
+        for _ in range(args.ticks):
+            _update_objects(devs, now)
+        tick_obj = (time.perf_counter() - t) / args.ticks
+        t = time.perf_counter()
+        for _ in range(args.ticks):
+            with fleet.writing():
+                fleet.update(now)
+        tick_fleet = (time.perf_counter() - t) / args.ticks
+        for name, create, tick in (('object', create_obj, tick_obj), ('fleet', create_fleet, tick_fleet)):
+            print(f'{ndev:>8} {name:>8} {create * 1000.0:>10.1f} {tick * 1e6:>10.0f} {tick * 1e6 / ndev:>10.3f}')
+        with contextlib.redirect_stdout(io.StringIO()):
+            for d in devs + views:
+                d.Halt()
+
+# ==========
+# CONTENTION
+# ==========
+#
+# Many threads poll Connected, Position and IsMoving (as RotatorAPI does
+# for one request) on devices that keep moving, while a writer thread keeps
+# restarting their moves. 'locked' takes the device lock for every read, as
+# the properties did before the published snapshot; 'snapshot' reads all
+# three from one lock-free snapshot().
+#
+
+def _poll_locked(d):
+    with d._lock:
+        c = d._state.connected
+    with d._lock:
+        p = d._state.position_at(time.monotonic())
+    with d._lock:
+        m = d._state.moving_at(time.monotonic())
+    return c, p, m
+
+def _poll_snapshot(d):
+    st = d.snapshot()
+    return st.connected, st.position, st.is_moving
+
+def run_contention(poll, ndev, nthreads, seconds):
+    with contextlib.redirect_stdout(io.StringIO()):
+        devs = [RotatorDevice.RotatorDevice() for _ in range(ndev)]
+        for d in devs:
+            d.steps_per_sec = 60
+            d.connected = True
+            d.MoveAbsolute(359.0)
+    stop = [False]
+    counts = [0] * nthreads
+    waits = []
+    def reader(n):
+        i = n
+        k = 0
+        while not stop[0]:
+            for _ in range(100):
+                poll(devs[i % ndev])
+                i += 1
+            k += 100
+        counts[n] = k
+    def writer():
+        i = 0
+        while not stop[0]:
+            d = devs[i % ndev]
+            t = time.perf_counter()
+            d._lock.acquire()
+            waits.append(time.perf_counter() - t)
+            d._start_move(359.0 if i & 1 else 0.0)
+            d._lock.release()
+            i += 1
+            time.sleep(0.0005)
+    threads = [Thread(target=reader, args=(n,)) for n in range(nthreads)] + [Thread(target=writer)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop[0] = True
+    for t in threads:
+        t.join()
+    for d in devs:
+        d.stop()
+    return sum(counts) / seconds, _percentile(waits, 99) * 1e6, max(waits) * 1e6
+
+def cmd_contention(args):
+    polls = {'locked': _poll_locked, 'snapshot': _poll_snapshot}
+    print(f'{"reads":>9} {"threads":>8} {"devices":>8} {"polls/s":>10} {"wr wait p99":>12} {"wr wait max":>12}')
+    for nthreads in args.threads:
+        for name in polls:
+            with contextlib.redirect_stdout(io.StringIO()):
+                rate, p99, wmax = run_contention(polls[name], args.devices, nthreads, args.seconds)
+            print(f'{name:>9} {nthreads:>8} {args.devices:>8} {rate:>10.0f} {p99:>10.0f}us {wmax:>10.0f}us')
+
+# =========
+# RESPONSES
+# =========
+#
+# Requests per second and CPU time per request for Alpaca endpoints,
+# called in-process through the Flask test client (no sockets), so the
+# numbers are the cost of routing, the handler and the response encoding.
+#
+
+Endpoints = {
+    'static'    : ['GET /api/v1/rotator/0/description', 'GET /api/v1/rotator/0/driverinfo',
+                   'GET /api/v1/rotator/0/driverversion', 'GET /api/v1/rotator/0/interfaceversion',
+                   'GET /api/v1/rotator/0/name', 'GET /api/v1/rotator/0/supportedactions',
+                   'GET /management/apiversions', 'GET /management/v1/description',
+                   'GET /management/v1/configureddevices'],
+    'device'    : ['GET /api/v1/rotator/0/connected', 'GET /api/v1/rotator/0/canreverse',
+                   'GET /api/v1/rotator/0/ismoving', 'GET /api/v1/rotator/0/position',
+                   'GET /api/v1/rotator/0/reverse', 'GET /api/v1/rotator/0/stepsize',
+                   'GET /api/v1/rotator/0/targetposition',
+                   'GET /api/v1/rotator/0/devicestate',
+                   'PUT /api/v1/rotator/0/connected Connected=True',
+                   'PUT /api/v1/rotator/0/reverse Reverse=False',
+                   'PUT /api/v1/rotator/0/halt',
+                   'PUT /api/v1/rotator/0/action Action=x&Parameters=',
+                   'PUT /api/v1/rotator/0/commandblind Command=x&Raw=False'],
+}
+
+def _test_client(argv=(), metrics=False):
+    return _test_app(argv, metrics).test_client()
+
+def cmd_responses(args):
+    client = _test_client(metrics=args.metrics)
+    client.put('/api/v1/rotator/0/connected', data={'Connected': 'True'})
+    print(f'{"endpoint":<52} {"req/s":>9} {"cpu us/req":>11}')
+    total_n = 0
+    total_cpu = 0.0
+    for group in args.groups:
+        for ep in Endpoints[group]:
+            parts = ep.split(' ')
+            method, url = parts[0], parts[1]
+            data = dict(kv.split('=', 1) for kv in parts[2].split('&')) if len(parts) > 2 else {}
+            call = client.get if method == 'GET' else client.put
+            qs = '?ClientID=1&ClientTransactionID=42'
+            for _ in range(20):
+                call(url + qs, data=data)
+            t = time.perf_counter()
+            cpu = time.process_time()
+            for _ in range(args.requests):
+                call(url + qs, data=data)
+            cpu = time.process_time() - cpu
+            t = time.perf_counter() - t
+            total_n += args.requests
+            total_cpu += cpu
+            print(f'{ep:<52} {args.requests / t:>9.0f} {cpu / args.requests * 1e6:>11.1f}')
+    print(f'{"all":<52} {total_n / total_cpu:>9.0f} {total_cpu / total_n * 1e6:>11.1f}')
+
+# ===========
+# CONNECTIONS
+# ===========
+#
+# Concurrent-connection ceiling of the front ends. The simulator runs in a
+# child process (app.py on 127.0.0.1), and this process opens N client
+# connections that each poll position once per --interval, keeping the
+# connection alive where the server allows it. We report the requests
+# completed, latency, failures, and the server's thread count and memory.
+# A server that needs a thread per connection runs out of threads or
+# queues clients behind its pool long before the event loop runs out of
+# sockets. Client and server share the machine, so compare the servers
+# with each other rather than with other hardware.
+#
+
+ServerTargets = {                                       # name : (app.py options, port used)
+    'dev'       : (['--server', 'dev'], 'port'),
+    'threaded'  : (['--server', 'threaded'], 'port'),
+    'gevent'    : (['--server', 'gevent'], 'port'),
+    'asyncio'   : (['--server', 'dev', '--async-port', '{aport}'], 'aport'),
+}
+
+def _start_server(target, port, aport, pool, extra=()):
+    import os                                           # pylint: disable=C0415
+    import socket                                       # pylint: disable=C0415
+    import subprocess                                   # pylint: disable=C0415
+    opts, which = ServerTargets[target]
+    cmd = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py'),
+           '--host', '127.0.0.1', '--mcast', '127.0.0.255', '--port', str(port), '--pool', str(pool)]
+    cmd += [o.format(aport=aport) for o in opts]
+    cmd += extra
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    use = port if which == 'port' else aport
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', use), timeout=1).close()
+            return proc, use
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f'{target} server did not start')
+
+def _proc_status(pid):
+    res = {}
+    with open(f'/proc/{pid}/status', encoding='ascii') as f:
+        for line in f:
+            k, _, v = line.partition(':')
+            if k in ('Threads', 'VmRSS'):
+                res[k] = v.split()[0]
+    return res
+
+async def _poller(port, interval, t_end, lat, errs):
+    import asyncio                                      # pylint: disable=C0415
+    import random                                       # pylint: disable=C0415
+    loop = asyncio.get_running_loop()
+    req = b'GET /api/v1/rotator/0/position?ClientID=1&ClientTransactionID=1 HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n'
+    conn = None
+    due = loop.time() + random.random() * interval     # Spread the clients over the interval
+    while due < t_end:
+        await asyncio.sleep(max(0.0, due - loop.time()))
+        due += interval
+        t0 = loop.time()
+        try:
+            if conn is None:
+                conn = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), 5.0)
+            reader, writer = conn
+            writer.write(req)
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 5.0)
+            hl = head.lower()
+            i = hl.index(b'content-length:')
+            await asyncio.wait_for(reader.readexactly(int(hl[i + 15:hl.index(b'\r\n', i)])), 5.0)
+            lat.append(loop.time() - t0)
+            if b'connection: close' in hl or head.startswith(b'HTTP/1.0') and b'keep-alive' not in hl:
+                writer.close()
+                conn = None
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            errs.append(loop.time() - t0)
+            if conn is not None:
+                conn[1].close()
+                conn = None
+    if conn is not None:
+        conn[1].close()
+
+def run_connections(port, nconn, interval, seconds, pid):
+    import asyncio                                      # pylint: disable=C0415
+    lat = []
+    errs = []
+    peak = {}
+    async def go():
+        loop = asyncio.get_running_loop()
+        t_end = loop.time() + seconds
+        tasks = [asyncio.ensure_future(_poller(port, interval, t_end, lat, errs)) for _ in range(nconn)]
+        await asyncio.sleep(seconds * 0.75)
+        peak.update(_proc_status(pid))                  # While every client is connected
+        await asyncio.gather(*tasks)
+    t = time.perf_counter()
+    asyncio.run(go())
+    t = time.perf_counter() - t
+    return lat, errs, peak, t
+
+def cmd_connections(args):
+    import http.client                                  # pylint: disable=C0415
+    import resource                                     # pylint: disable=C0415
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    want = max(args.connections) + 256
+    if soft < want:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(want, hard), hard))
+    print(f'{"server":<10} {"conns":>6} {"req/s":>8} {"p50 ms":>8} {"p99 ms":>8} {"failed":>7} {"threads":>8} {"rss MB":>7}')
+    for target in args.servers:
+        for nconn in args.connections:
+            proc, port = _start_server(target, args.port, args.port + 1, args.pool)
+            try:
+                c = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+                c.request('PUT', '/api/v1/rotator/0/connected', body='Connected=True',
+                          headers={'Content-Type': 'application/x-www-form-urlencoded'})
+                c.getresponse().read()
+                c.close()
+                lat, errs, peak, t = run_connections(port, nconn, args.interval, args.seconds, proc.pid)
+            finally:
+                proc.terminate()
+                proc.wait()
+            p50 = _percentile(lat, 50) * 1e3 if lat else float('nan')
+            p99 = _percentile(lat, 99) * 1e3 if lat else float('nan')
+            print(f'{target:<10} {nconn:>6} {len(lat) / t:>8.0f} {p50:>8.1f} {p99:>8.1f} {len(errs):>7} '
+                  f'{peak.get("Threads", "?"):>8} {int(peak.get("VmRSS", 0)) / 1024:>7.0f}')
+
+# =====
+# BATCH
+# =====
+#
+# One dashboard refresh: --properties properties of each of --devices
+# rotators, read with one GET per property as a plain Alpaca client does,
+# and with one /management/batch request. In-process through the Flask
+# test client, so there is no network round trip in these numbers, over a
+# real network each individual GET adds one.
+#
+
+BatchProps = ['position', 'targetposition', 'ismoving', 'connected']
+
+def cmd_batch(args):
+    client = _test_client(['--devices', str(args.devices)])
+    qs = 'ClientID=1&ClientTransactionID=42'
+    for d in range(args.devices):
+        client.put(f'/api/v1/rotator/{d}/connected', data={'Connected': 'True'})
+    props = BatchProps[:args.properties]
+    singles = [f'/api/v1/rotator/{d}/{p}?{qs}' for d in range(args.devices) for p in props]
+    items = ','.join(f'{d}:{p}' for d in range(args.devices) for p in props)
+    batch = [f'/management/batch?Items={items}&{qs}']
+    print(f'{"method":<12} {"requests":>9} {"refresh/s":>10} {"cpu ms/refresh":>15} {"bytes":>8}')
+    for name, urls in (('individual', singles), ('batch', batch)):
+        nbytes = sum(len(client.get(u).data) for u in urls)
+        t = time.perf_counter()
+        cpu = time.process_time()
+        for _ in range(args.refreshes):
+            for u in urls:
+                client.get(u)
+        cpu = time.process_time() - cpu
+        t = time.perf_counter() - t
+        print(f'{name:<12} {len(urls):>9} {args.refreshes / t:>10.1f} {cpu / args.refreshes * 1e3:>15.2f} {nbytes:>8}')
+
+# ====
+# LOAD
+# ====
+#
+# Load generator with a realistic Alpaca client script. Each of --clients
+# simulated clients owns one rotator and repeats, over one keep-alive
+# connection:
+#
+#       connect, poll position --polls times, Move, poll ismoving until
+#       the move is done, Halt, think for --think seconds
+#
+# We report requests/s and p50/p95/p99 latency per endpoint. A request
+# whose HTTP status is not 200 or whose ErrorNumber is not 0 is an error.
+# --save writes the results as JSON, --baseline compares them with saved
+# results and exits with status 1 if any endpoint regressed by more than
+# --tolerance (throughput down or p95 up), so it can gate a change.
+#
+# The simulator is started as app.py in a child process (--server), in
+# this process on a thread pool server (--server inproc), or not at all
+# (--url of a simulator that is already running). Everything runs over
+# loopback, no external services.
+#
+
+def _test_app(argv=(), metrics=False):
+    import flask                                        # pylint: disable=C0415
+    import config                                       # pylint: disable=C0415
+    config.load(list(argv))                             # Defaults, not our own command line
+    import RotatorAPI, ManagementAPI                    # pylint: disable=C0415,C0401
+    app = flask.Flask('bench')
+    app.register_blueprint(RotatorAPI.rot_blueprint)
+    app.register_blueprint(ManagementAPI.mgmt_blueprint)
+    if metrics:
+        import Metrics                                  # pylint: disable=C0415
+        Metrics.flask_hooks(app)
+    return app
+
+def _start_inproc(port, devices, pool):
+    import logging                                      # pylint: disable=C0415
+    import Servers                                      # pylint: disable=C0415
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)   # As app.py, no per-request log
+    app = _test_app(['--devices', str(devices)], metrics=True)
+    srv = Servers.PoolWSGIServer('127.0.0.1', port, app, pool, 5.0, 128)
+    Thread(target=srv.serve_forever, name='inproc', daemon=True).start()
+    return srv
+
+class _Client(object):
+    """One keep-alive HTTP/1.1 connection, timing each request by endpoint"""
+
+    def __init__(self, host, port, devno, stats, clid=1):
+        self.host = host
+        self.port = port
+        self.clid = clid
+        self.base = f'/api/v1/rotator/{devno}/'
+        self.stats = stats                              # endpoint : ([latency, ...], errors)
+        self._conn = None
+        self._ctid = 0
+
+    async def call(self, method, name, form=''):
+        import asyncio                                  # pylint: disable=C0415
+        self._ctid += 1
+        qs = f'ClientID={self.clid}&ClientTransactionID={self._ctid}'
+        if method == 'GET':
+            head = f'GET {self.base}{name}?{qs} HTTP/1.1\r\nHost: {self.host}\r\n\r\n'
+            body = b''
+        else:
+            body = (form + '&' + qs if form else qs).encode()
+            head = (f'PUT {self.base}{name} HTTP/1.1\r\nHost: {self.host}\r\n'
+                    f'Content-Type: application/x-www-form-urlencoded\r\nContent-Length: {len(body)}\r\n\r\n')
+        lat, errs = self.stats.setdefault(f'{method} {name}', ([], [0]))
+        t0 = time.perf_counter()
+        try:
+            if self._conn is None:
+                self._conn = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), 5.0)
+            reader, writer = self._conn
+            writer.write(head.encode() + body)
+            resp = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 10.0)
+            hl = resp.lower()
+            i = hl.index(b'content-length:')
+            data = await asyncio.wait_for(reader.readexactly(int(hl[i + 15:hl.index(b'\r\n', i)])), 10.0)
+            lat.append(time.perf_counter() - t0)
+            if b'connection: close' in hl or resp.startswith(b'HTTP/1.0') and b'keep-alive' not in hl:
+                self.close()
+            if not resp.startswith(b' 200 ', 8) or b'"ErrorNumber": 0,' not in data:
+                errs[0] += 1
+            return data
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+            errs[0] += 1
+            self.close()
+            return b''
+
+    def close(self):
+        if self._conn is not None:
+            self._conn[1].close()
+            self._conn = None
+
+async def _script(client, args, t_end):
+    import asyncio                                      # pylint: disable=C0415
+    import random                                       # pylint: disable=C0415
+    await asyncio.sleep(random.random() * args.think)   # Spread the clients out
+    sign = 1
+    while time.monotonic() < t_end:
+        await client.call('PUT', 'connected', 'Connected=True')
+        for _ in range(args.polls):
+            await client.call('GET', 'position')
+            await asyncio.sleep(args.poll_interval)
+        await client.call('PUT', 'move', f'Position={sign * args.degrees}')
+        sign = -sign
+        while time.monotonic() < t_end:
+            await asyncio.sleep(args.poll_interval)
+            if b'"Value": false' in await client.call('GET', 'ismoving'):
+                break
+        await client.call('PUT', 'halt')
+        await asyncio.sleep(args.think)
+    client.close()
+
+def run_load(host, port, args):
+    import asyncio                                      # pylint: disable=C0415
+    stats = {}
+    async def go():
+        t_end = time.monotonic() + args.seconds
+        await asyncio.gather(*[_script(_Client(host, port, i % args.devices, stats), args, t_end)
+                               for i in range(args.clients)])
+    t = time.perf_counter()
+    asyncio.run(go())
+    t = time.perf_counter() - t
+    res = {}
+    for ep, (lat, errs) in sorted(stats.items()):
+        res[ep] = {'requests': len(lat), 'errors': errs[0], 'rps': len(lat) / t,
+                   'p50_ms': _percentile(lat, 50) * 1e3 if lat else None,
+                   'p95_ms': _percentile(lat, 95) * 1e3 if lat else None,
+                   'p99_ms': _percentile(lat, 99) * 1e3 if lat else None}
+    lat = [x for l, _ in stats.values() for x in l]
+    res['all'] = {'requests': len(lat), 'errors': sum(e[0] for _, e in stats.values()), 'rps': len(lat) / t,
+                  'p50_ms': _percentile(lat, 50) * 1e3 if lat else None,
+                  'p95_ms': _percentile(lat, 95) * 1e3 if lat else None,
+                  'p99_ms': _percentile(lat, 99) * 1e3 if lat else None}
+    return res
+
+#
+# Endpoints whose throughput fell or whose p95 rose by more than 'tol'
+# (a fraction) from the baseline, as printable lines
+#
+def compare_load(res, base, tol):
+    worse = []
+    for ep, b in base['endpoints'].items():
+        r = res['endpoints'].get(ep)
+        if r is None:
+            worse.append(f'{ep}: missing')
+            continue
+        if r['rps'] < b['rps'] * (1 - tol):
+            worse.append(f'{ep}: {r["rps"]:.1f} req/s, baseline {b["rps"]:.1f}')
+        if r['p95_ms'] is not None and b['p95_ms'] is not None and r['p95_ms'] > b['p95_ms'] * (1 + tol):
+            worse.append(f'{ep}: p95 {r["p95_ms"]:.1f} ms, baseline {b["p95_ms"]:.1f}')
+    return worse
+
+def cmd_load(args):
+    import json                                         # pylint: disable=C0415
+    import platform                                     # pylint: disable=C0415
+    from urllib.parse import urlsplit                   # pylint: disable=C0415
+    proc = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, port, target = url.hostname, url.port or 80, args.url
+    elif args.server == 'inproc':
+        srv = _start_inproc(args.port, args.devices, args.pool)
+        host, port, target = '127.0.0.1', args.port, 'inproc'
+    else:
+        proc, port = _start_server(args.server, args.port, args.port + 1, args.pool, ['--devices', str(args.devices)])
+        host, target = '127.0.0.1', args.server
+    try:
+        endpoints = run_load(host, port, args)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+        elif not args.url:
+            srv.shutdown()
+    res = {'target': target, 'clients': args.clients, 'seconds': args.seconds, 'python': platform.python_version(),
+           'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()), 'endpoints': endpoints}
+    print(f'{"endpoint":<22} {"requests":>9} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7}')
+    for ep, r in endpoints.items():
+        if r['requests']:
+            print(f'{ep:<22} {r["requests"]:>9} {r["rps"]:>8.1f} {r["p50_ms"]:>8.2f} {r["p95_ms"]:>8.2f} '
+                  f'{r["p99_ms"]:>8.2f} {r["errors"]:>7}')
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(res, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            worse = compare_load(res, json.load(f), args.tolerance)
+        for line in worse:
+            print(f'REGRESSION {line}')
+        if worse:
+            return 1
+        print(f'No regression against {args.baseline} (tolerance {args.tolerance:.0%})')
+    return 0
+
+# =========
+# DISCOVERY
+# =========
+#
+# Discovery packets per second over loopback, the original blocking
+# responder (decode each packet, print it, encode the reply) against the
+# selector responder. One client thread keeps --window packets in flight
+# on each of --sources sockets and we count the replies. The responders
+# run unlimited for this. Then a storm: every source, each from its own
+# loopback address (127.0.0.x), sends as fast as it can for a second
+# to a responder limited to --rate replies a second per source, and we
+# count what was answered. CPU is the responder thread's own (Linux).
+#
+
+class LegacyResponder(Thread):
+    """The original receive loop, printing to 'out' instead of the console"""
+    def __init__(self, port, dport, out):
+        Thread.__init__(self, daemon=True)
+        self.alpaca_response = "{\"AlpacaPort\": " + str(port) + "}"
+        self.out = out
+        self.rsock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.rsock.bind(('127.0.0.1', dport))
+        self.tsock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.tsock.bind(('127.0.0.1', 0))
+        self.start()
+
+    def run(self):
+        while True:
+            data, addr = self.rsock.recvfrom(1024)
+            datascii = str(data, 'ascii')
+            print('Disc rcv ' + datascii + ' from ' + str(addr), file=self.out)
+            if 'alpacadiscovery1' in datascii:
+                self.tsock.sendto(self.alpaca_response.encode(), addr)
+
+def _udp_sources(n, distinct):
+    socks = []
+    for i in range(n):
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.bind((f'127.0.0.{2 + i % 250}' if distinct else '127.0.0.1', 0))
+        s.setblocking(False)
+        socks.append(s)
+    return socks
+
+def _thread_cpu(thread):
+    return time.clock_gettime(time.pthread_getcpuclockid(thread.ident))
+
+def run_discovery(responder, dport, nsrc, window, seconds):
+    import selectors                                    # pylint: disable=C0415
+    socks = _udp_sources(nsrc, False)
+    sel = selectors.DefaultSelector()
+    for s in socks:
+        sel.register(s, selectors.EVENT_READ)
+        for _ in range(window):
+            s.sendto(b'alpacadiscovery1', ('127.0.0.1', dport))
+    replies = 0
+    c0 = _thread_cpu(responder)
+    t0 = time.perf_counter()
+    t_end = t0 + seconds
+    last = t0
+    while True:
+        now = time.perf_counter()
+        if now >= t_end:
+            break
+        events = sel.select(0.2)
+        if not events and now - last > 0.2:             # Lost packets, top the windows up
+            for s in socks:
+                s.sendto(b'alpacadiscovery1', ('127.0.0.1', dport))
+        for key, _ in events:
+            s = key.fileobj
+            while True:
+                try:
+                    s.recvfrom(64)
+                except BlockingIOError:
+                    break
+                replies += 1
+                last = now
+                s.sendto(b'alpacadiscovery1', ('127.0.0.1', dport))
+    elapsed = time.perf_counter() - t0
+    cpu = _thread_cpu(responder) - c0
+    for s in socks:
+        s.close()
+    return replies / elapsed, cpu / max(1, replies)
+
+def run_storm(dport, nsrc, seconds):
+    socks = _udp_sources(nsrc, True)
+    sent = 0
+    t_end = time.perf_counter() + seconds
+    while time.perf_counter() < t_end:
+        for s in socks:
+            try:
+                s.sendto(b'alpacadiscovery1', ('127.0.0.1', dport))
+                sent += 1
+            except BlockingIOError:
+                pass
+    time.sleep(0.2)
+    got = []
+    for s in socks:
+        n = 0
+        while True:
+            try:
+                s.recvfrom(64)
+            except BlockingIOError:
+                break
+            n += 1
+        got.append(n)
+        s.close()
+    return sent, got
+
+def cmd_discovery(args):
+    import DiscoveryResponder                           # pylint: disable=C0415
+    import Metrics                                      # pylint: disable=C0415
+    dport = args.port
+    print(f'{"responder":<10} {"sources":>8} {"window":>7} {"replies/s":>10} {"CPU us/reply":>13}')
+    for name in args.responders:
+        if name == 'legacy':
+            resp = LegacyResponder(5555, dport, open(os.devnull, 'w', encoding='ascii'))   # pylint: disable=R1732
+        else:
+            resp = DiscoveryResponder.DiscoveryResponder('127.0.0.1', '127.0.0.1', 5555, dport=dport)
+        time.sleep(0.1)
+        for nsrc in args.sources:
+            rps, cpu = run_discovery(resp, dport, nsrc, args.window, args.seconds)
+            print(f'{name:<10} {nsrc:>8} {args.window:>7} {rps:>10.0f} {cpu * 1e6:>13.1f}')
+        dport += 1
+    nsrc = max(args.sources)
+    DiscoveryResponder.DiscoveryResponder('127.0.0.1', '127.0.0.1', 5555, rate=args.rate, dport=dport)
+    time.sleep(0.1)
+    limited = Metrics.DiscoveryLimited.value[0]
+    sent, got = run_storm(dport, nsrc, 1.0)
+    print(f'Storm: {nsrc} sources sent {sent} packets in 1 s, limit {args.rate:g}/s per source (bursts of '
+          f'{DiscoveryResponder.Burst}), answered {sum(got)} (most to one source {max(got)}), '
+          f'limited {Metrics.DiscoveryLimited.value[0] - limited}')
+    return 0
+
+# ===
+# DES
+# ===
+#
+# Reproducibility and speed of the discrete-event mode (--sim-mode des).
+# A script drawn from random.Random(--seed) gives --steps rounds of moves,
+# halts and syncs to --devices rotators, advancing the clock 0.1 to
+# --max-advance seconds after each round. We digest every rotator's state
+# (snapshot(), TimeStamp included) after every advance. The script is run
+# --runs times on fresh rotators from the same clock reading, and the
+# digests must be identical. Also reported: simulated seconds per real
+# second.
+#
+
+def _des_script(devs, seed, steps, max_advance, digest):
+    import random                                       # pylint: disable=C0415
+    import MotionEngine                                 # pylint: disable=C0415
+    rnd = random.Random(seed)
+    for _ in range(steps):
+        for d in rnd.sample(devs, max(1, len(devs) // 4)):
+            op = rnd.random()
+            if op < 0.6:
+                d.MoveAbsolute(float(rnd.randrange(360)))
+            elif op < 0.8:
+                d.Move(float(rnd.randrange(-90, 91)))
+            elif op < 0.9:
+                d.Halt()
+            else:
+                d.Sync(float(rnd.randrange(360)))
+        MotionEngine.advance(round(rnd.uniform(0.1, max_advance), 3))
+        for d in devs:
+            digest.update(repr(tuple(d.snapshot())).encode())
+
+def run_des(backend, ndev, seed, steps, max_advance):
+    import hashlib                                      # pylint: disable=C0415
+    import MotionEngine                                 # pylint: disable=C0415
+    import SimClock                                     # pylint: disable=C0415
+    SimClock.set_discrete(seed)
+    if backend == 'fleet':
+        import RotatorFleet                             # pylint: disable=C0415
+        fleet = RotatorFleet.RotatorFleet(ndev)
+        devs = [fleet.device(i) for i in range(ndev)]
+    else:
+        devs = [RotatorDevice.RotatorDevice() for _ in range(ndev)]
+    digest = hashlib.sha256()
+    t = time.perf_counter()
+    _des_script(devs, seed, steps, max_advance, digest)
+    real = time.perf_counter() - t
+    simulated = SimClock.elapsed()
+    for d in devs:                                      # Leave nothing in the engine for the next run
+        d.Halt()
+    MotionEngine.advance(1.0)
+    return simulated, real, digest.hexdigest()
+
+def cmd_des(args):
+    print(f'{"backend":>8} {"devices":>8} {"run":>4} {"sim s":>9} {"real s":>8} {"speed-up":>9}  digest')
+    failed = 0
+    for backend in args.backends:
+        for ndev in args.devices:
+            digests = set()
+            for run in range(args.runs):
+                simulated, real, digest = run_des(backend, ndev, args.seed, args.steps, args.max_advance)
+                digests.add(digest)
+                print(f'{backend:>8} {ndev:>8} {run + 1:>4} {simulated:>9.1f} {real:>8.2f} {simulated / real:>8.0f}x  {digest[:16]}')
+            if len(digests) != 1:
+                print(f'{backend} {ndev}: runs differ')
+                failed += 1
+    return 1 if failed else 0
+
+#
+# STARTUP
+# =======
+#
+# Start app.py --runs times with each --profile and time from starting the
+# process to the first good answer of the home page and of a rotator
+# property (polled every 5 ms), then the first /setup/ page, which is when
+# the fast profile loads the setup UI. Each profile gets its own template
+# cache folder, so its first run compiles the templates and the others do
+# not. RSS is read once the pages have been fetched.
+#
+
+def _first_ok(port, path, deadline):
+    import http.client                                  # pylint: disable=C0415
+    while time.perf_counter() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', path)
+            status = conn.getresponse().status
+            conn.close()
+            if status == 200:
+                return time.perf_counter()
+        except OSError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError(f'no answer from {path}')
+
+def run_startup(profile, port, cache):
+    import subprocess                                   # pylint: disable=C0415
+    cmd = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py'),
+           '--host', '127.0.0.1', '--mcast', '127.0.0.255', '--port', str(port), '--server', 'threaded',
+           '--profile', profile, '--template-cache', cache]
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        home = _first_ok(port, '/', t0 + 30)
+        alpaca = _first_ok(port, '/api/v1/rotator/0/position', t0 + 30)
+        t = time.perf_counter()
+        _first_ok(port, '/setup/', t + 30)
+        setup = time.perf_counter() - t
+        rss = int(_proc_status(proc.pid)['VmRSS'])
+    finally:
+        proc.kill()
+        proc.wait()
+    return home - t0, alpaca - t0, setup, rss
+
+def cmd_startup(args):
+    import shutil                                       # pylint: disable=C0415
+    import tempfile                                     # pylint: disable=C0415
+    print(f'{"profile":>9} {"run":>4} {"home ms":>9} {"alpaca ms":>10} {"setup ms":>9} {"RSS MB":>7}')
+    for profile in args.profiles:
+        cache = tempfile.mkdtemp(prefix='jinja-')
+        res = []
+        try:
+            for run in range(args.runs):
+                home, alpaca, setup, rss = run_startup(profile, args.port, cache)
+                res.append(home)
+                print(f'{profile:>9} {run + 1:>4} {home * 1000:>9.0f} {alpaca * 1000:>10.0f} {setup * 1000:>9.1f} {rss / 1024:>7.1f}')
+        finally:
+            shutil.rmtree(cache, ignore_errors=True)
+        print(f'{profile:>9} {"med":>4} {statistics.median(res) * 1000:>9.0f}')
+    return 0
+
+#
+# ADMISSION
+# =========
+#
+# One greedy client (--greedy connections with the same ClientID, each
+# sending position GETs back to back) and --polite clients (a ClientID
+# each, a position GET every --interval) against app.py --server
+# threaded, first with no admission control and then with the --rate,
+# --burst and --concurrent limits. Reported: the polite clients' latency
+# and errors, and how many of the greedy client's requests a second were
+# answered and turned away.
+#
+
+async def _greedy(client, t_end):
+    await client.call('PUT', 'connected', 'Connected=True')
+    while time.monotonic() < t_end:
+        await client.call('GET', 'position')
+    client.close()
+
+async def _polite(client, interval, t_end):
+    import asyncio                                      # pylint: disable=C0415
+    await client.call('PUT', 'connected', 'Connected=True')
+    while time.monotonic() < t_end:
+        await asyncio.sleep(interval)
+        await client.call('GET', 'position')
+    client.close()
+
+def run_admission(port, args):
+    import asyncio                                      # pylint: disable=C0415
+    greedy, polite = {}, {}
+    async def go():
+        t_end = time.monotonic() + args.seconds
+        await asyncio.gather(*[_greedy(_Client('127.0.0.1', port, 0, greedy, 1), t_end) for _ in range(args.greedy)],
+                             *[_polite(_Client('127.0.0.1', port, i % 4, polite, i + 2), args.interval, t_end)
+                               for i in range(args.polite)])
+    asyncio.run(go())
+    return greedy['GET position'], polite['GET position']
+
+def cmd_admission(args):
+    print(f'{"limits":<28} {"polite p50":>10} {"p99 ms":>8} {"errors":>7} {"greedy ok/s":>12} {"turned away/s":>14}')
+    for limits in ([], ['--admit-rate', str(args.rate), '--admit-burst', str(args.burst),
+                        '--admit-concurrent', str(args.concurrent)]):
+        proc, port = _start_server('threaded', args.port, 0, args.pool, limits)
+        try:
+            (glat, gerr), (plat, perr) = run_admission(port, args)
+        finally:
+            proc.terminate()
+            proc.wait()
+        name = f'rate {args.rate} burst {args.burst} conc {args.concurrent}' if limits else 'none'
+        print(f'{name:<28} {_percentile(plat, 50) * 1e3:>10.2f} {_percentile(plat, 99) * 1e3:>8.2f} {perr[0]:>7} '
+              f'{(len(glat) - gerr[0]) / args.seconds:>12.1f} {gerr[0] / args.seconds:>14.1f}')
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Alpaca Rotator Simulator benchmarks')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('engine', help='Step rate, completion lateness and CPU use of the motion engine')
+    p.add_argument('--devices', type=int, nargs='+', default=[4, 100, 1000])
+    p.add_argument('--rate', type=int, default=60, help='Steps per second per device (1-60)')
+    p.add_argument('--seconds', type=float, default=5.0)
+    p.add_argument('--engines', nargs='+', choices=['timer', 'engine'], default=['timer', 'engine'])
+    p.set_defaults(func=cmd_engine)
+
+    p = sub.add_parser('timing', help='Achieved vs nominal step rate, step jitter and completion error by rate and device count')
+    p.add_argument('--rates', type=int, nargs='+', choices=range(1, 61), metavar='1-60', default=[1, 6, 30, 60])
+    p.add_argument('--devices', type=int, nargs='+', default=[1, 100])
+    p.add_argument('--seconds', type=float, default=3.0, help='Nominal length of each move')
+    p.add_argument('--engines', nargs='+', choices=['timer', 'engine'], default=['timer', 'engine'])
+    p.add_argument('--sampled', type=int, default=4, help='Devices whose steps are timed')
+    p.add_argument('--sample-hz', type=float, default=1000.0)
+    p.add_argument('--check', action='store_true', help='Exit 1 if any result is outside the limits below')
+    p.add_argument('--min-rate', type=float, default=98.0, help='Lowest achieved rate, %% of nominal')
+    p.add_argument('--max-jitter', type=float, default=5.0, help='Largest step jitter, ms')
+    p.add_argument('--max-late', type=float, default=25.0, help='Largest p99 completion error, ms')
+    p.set_defaults(func=cmd_timing)
+
+    p = sub.add_parser('fleet', help='Per-tick update cost, object-per-device vs NumPy fleet')
+    p.add_argument('--devices', type=int, nargs='+', default=[100, 1000, 10000])
+    p.add_argument('--ticks', type=int, default=50)
+    p.set_defaults(func=cmd_fleet)
+
+    p = sub.add_parser('contention', help='Polling threads vs moving devices, locked reads vs snapshots')
+    p.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    p.add_argument('--devices', type=int, default=16)
+    p.add_argument('--seconds', type=float, default=3.0)
+    p.set_defaults(func=cmd_contention)
+
+    p = sub.add_parser('responses', help='Requests/s and CPU per request of the Alpaca endpoints (in-process)')
+    p.add_argument('--groups', nargs='+', choices=list(Endpoints), default=list(Endpoints))
+    p.add_argument('--requests', type=int, default=2000)
+    p.add_argument('--metrics', action='store_true', help='With the Metrics request hooks, as app.py runs')
+    p.set_defaults(func=cmd_responses)
+
+    p = sub.add_parser('connections', help='Concurrent polling clients per server, Flask servers vs asyncio front end')
+    p.add_argument('--servers', nargs='+', choices=list(ServerTargets), default=['dev', 'threaded', 'asyncio'])
+    p.add_argument('--connections', type=int, nargs='+', default=[100, 500, 1000])
+    p.add_argument('--interval', type=float, default=1.0, help='Seconds between polls on each connection')
+    p.add_argument('--seconds', type=float, default=10.0)
+    p.add_argument('--pool', type=int, default=32, help='Pool size for the threaded and gevent servers')
+    p.add_argument('--port', type=int, default=5655)
+    p.set_defaults(func=cmd_connections)
+
+    p = sub.add_parser('batch', help='One batch read vs individual property GETs for a dashboard refresh (in-process)')
+    p.add_argument('--devices', type=int, default=50)
+    p.add_argument('--properties', type=int, choices=range(1, len(BatchProps) + 1), default=len(BatchProps))
+    p.add_argument('--refreshes', type=int, default=50)
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser('load', help='Simulated Alpaca clients over loopback, latency per endpoint, baseline check')
+    p.add_argument('--server', choices=['inproc'] + list(ServerTargets), default='threaded')
+    p.add_argument('--url', help='Simulator already running, e.g. http://127.0.0.1:5555 (--server is ignored)')
+    p.add_argument('--clients', type=int, default=20)
+    p.add_argument('--devices', type=int, default=20, help='Rotators to simulate, clients share them if fewer')
+    p.add_argument('--seconds', type=float, default=20.0)
+    p.add_argument('--polls', type=int, default=3, help='Position polls before each move')
+    p.add_argument('--poll-interval', type=float, default=0.1)
+    p.add_argument('--degrees', type=float, default=3.0, help='Size of each move')
+    p.add_argument('--think', type=float, default=0.5, help='Seconds between cycles')
+    p.add_argument('--pool', type=int, default=32)
+    p.add_argument('--port', type=int, default=5655)
+    p.add_argument('--save', help='Write the results to this JSON file')
+    p.add_argument('--baseline', help='Compare with results saved by --save')
+    p.add_argument('--tolerance', type=float, default=0.2, help='Allowed regression as a fraction')
+    p.set_defaults(func=cmd_load)
+
+    p = sub.add_parser('discovery', help='Discovery packets/s over loopback, original vs selector responder, rate limit storm')
+    p.add_argument('--responders', nargs='+', choices=['legacy', 'selector'], default=['legacy', 'selector'])
+    p.add_argument('--sources', type=int, nargs='+', default=[1, 16])
+    p.add_argument('--window', type=int, default=8, help='Packets in flight per source')
+    p.add_argument('--seconds', type=float, default=3.0)
+    p.add_argument('--rate', type=float, default=2.0, help='Replies per second per source in the storm')
+    p.add_argument('--port', type=int, default=32327, help='First discovery port to use, one per responder')
+    p.set_defaults(func=cmd_discovery)
+
+    p = sub.add_parser('des', help='Discrete-event mode: identical state histories across runs, simulated vs real time')
+    p.add_argument('--backends', nargs='+', choices=['object', 'fleet'], default=['object', 'fleet'])
+    p.add_argument('--devices', type=int, nargs='+', default=[10, 1000])
+    p.add_argument('--steps', type=int, default=200, help='Rounds of commands, each followed by an advance')
+    p.add_argument('--max-advance', type=float, default=30.0, help='Longest advance, simulated seconds')
+    p.add_argument('--seed', type=int, default=1, help='Seeds the script and is the clock reading at the start')
+    p.add_argument('--runs', type=int, default=2)
+    p.set_defaults(func=cmd_des)
+
+    p = sub.add_parser('startup', help='Time from starting app.py to the first request, standard vs fast profile')
+    p.add_argument('--profiles', nargs='+', choices=['standard', 'fast'], default=['standard', 'fast'])
+    p.add_argument('--runs', type=int, default=5)
+    p.add_argument('--port', type=int, default=5655)
+    p.set_defaults(func=cmd_startup)
+
+    p = sub.add_parser('admission', help='Polite clients next to a greedy one, without and with per-client admission control')
+    p.add_argument('--greedy', type=int, default=8, help='Connections of the greedy client')
+    p.add_argument('--polite', type=int, default=8)
+    p.add_argument('--interval', type=float, default=0.1, help='Seconds between a polite client\'s polls')
+    p.add_argument('--seconds', type=float, default=10.0)
+    p.add_argument('--rate', type=float, default=20.0, help='admit_rate for the second run')
+    p.add_argument('--burst', type=int, default=20)
+    p.add_argument('--concurrent', type=int, default=2)
+    p.add_argument('--pool', type=int, default=32)
+    p.add_argument('--port', type=int, default=5655)
+    p.set_defaults(func=cmd_admission)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+# pylint: disable=C0301,C0103,C0111
+#
+# Simulator configuration
+#
+# Each setting comes from, in increasing order of precedence, the defaults
+# below, the [simulator] section of an INI file, an environment variable,
+# or the command line. For example any of these give 1000 rotators:
+#
+#       python3 app.py --devices 1000
+#       ROTATOR_DEVICES=1000 python3 app.py
+#       python3 app.py --config rotator.ini         (devices = 1000)
+#
+# The configuration is loaded once, the first time get() is called, which
+# must happen before RotatorAPI is imported (app.py does this).
+#
+# This module must not import threading (even indirectly) at load time,
+# app.py uses peek() to decide whether gevent needs to patch it first.
+#
+# 18-Oct-2026       1.1 Initial edit
+# 18-Oct-2026       1.1 trace and trace_file settings (see TraceLog)
+# 18-Oct-2026       1.1 Web server settings (see Servers), peek()
+# 18-Oct-2026       1.1 async_port (see AsyncAPI)
+# 18-Oct-2026       1.1 telemetry_hz and telemetry_queue (see Telemetry)
+# 18-Oct-2026       1.1 discovery_ipv6 and discovery_rate (see DiscoveryResponder)
+# 18-Oct-2026       1.1 time_scale (see SimClock)
+# 18-Oct-2026       1.1 sim_mode and sim_seed, discrete-event mode (see SimClock)
+# 18-Oct-2026       1.1 profile, swagger, setup_ui, template_cache and startup_report
+# 18-Oct-2026       1.1 admit_rate, admit_burst, admit_concurrent and admit_reply (see Admission)
+#
+import argparse
+import configparser
+import os
+import sys
+
+#
+# name : (default, environment variable, type, help)
+#
+Settings = {
+    'devices'   : (4,           'ROTATOR_DEVICES',  int,    'Number of rotators to simulate'),
+    'backend'   : ('object',    'ROTATOR_BACKEND',  str,    'Rotator backend, object or fleet (NumPy)'),
+    'trace'     : ('',          'ROTATOR_TRACE',    str,    'Trace levels, e.g. info or RotatorDevice=debug,DiscoveryResponder=info'),
+    'trace_file': ('',          'ROTATOR_TRACE_FILE', str,  'File the trace ring is drained to (none if empty)'),
+    'server'    : ('dev',       'ROTATOR_SERVER',   str,    'Web server, dev, threaded or gevent (see Servers.py)'),
+    'host'      : ('',          'ROTATOR_HOST',     str,    'Address to serve on (empty for the built-in default)'),
+    'port'      : (5555,        'ROTATOR_PORT',     int,    'Alpaca port'),
+    'mcast'     : ('',          'ROTATOR_MCAST',    str,    'Discovery address, or comma separated addresses (empty for the built-in default)'),
+    'discovery_ipv6': ('',      'ROTATOR_DISCOVERY_IPV6', str, 'Interfaces to answer IPv6 discovery (ff12::a1:9aca) on, comma separated names or all, empty for none'),
+    'discovery_rate': (2.0,     'ROTATOR_DISCOVERY_RATE', float, 'Most discovery replies per second to one source (bursts of 4), 0 for no limit'),
+    'pool'      : (32,          'ROTATOR_POOL',     int,    'Worker threads (threaded) or greenlets (gevent)'),
+    'keepalive' : (5.0,         'ROTATOR_KEEPALIVE', float, 'Idle keep-alive timeout in seconds, 0 to close after each response'),
+    'backlog'   : (128,         'ROTATOR_BACKLOG',  int,    'Listen queue length'),
+    'telemetry_hz': (10.0,      'ROTATOR_TELEMETRY_HZ', float, 'Most telemetry (SSE) samples per second'),
+    'telemetry_queue': (64,     'ROTATOR_TELEMETRY_QUEUE', int, 'Telemetry frames a subscriber may fall behind before it is dropped'),
+    'time_scale': (1.0,         'ROTATOR_TIME_SCALE', float, 'Simulated seconds per real second, 0 to step the clock on demand (see SimClock)'),
+    'sim_mode'  : ('realtime',  'ROTATOR_SIM_MODE', str,    'realtime, or des for a deterministic discrete-event simulation stepped by /management/clock/advance'),
+    'sim_seed'  : (0.0,         'ROTATOR_SIM_SEED', float,  'Simulated clock reading in seconds at start in des mode'),
+    'async_port': (0,           'ROTATOR_ASYNC_PORT', int,  'Also serve the Alpaca APIs from asyncio on this port (see AsyncAPI.py), 0 for off'),
+    'admit_rate': (0.0,         'ROTATOR_ADMIT_RATE', float, 'Rotator API requests per second per client (ClientID, else address), 0 for no limit (see Admission.py)'),
+    'admit_burst': (20,         'ROTATOR_ADMIT_BURST', int, 'Requests a client may make at once before admit_rate applies'),
+    'admit_concurrent': (0,     'ROTATOR_ADMIT_CONCURRENT', int, 'Rotator API requests one client may have in progress, 0 for no limit'),
+    'admit_reply': ('alpaca',   'ROTATOR_ADMIT_REPLY', str, 'Reply to a client over its budget, alpaca (error 0x500) or 429 (HTTP Too Many Requests)'),
+    'profile'   : ('standard',  'ROTATOR_PROFILE',  str,    'standard, or fast for the quickest start (the defaults of the next three settings)'),
+    'swagger'   : ('',          'ROTATOR_SWAGGER',  str,    'Swagger UIs on or off (empty for on, off with the fast profile)'),
+    'setup_ui'  : ('',          'ROTATOR_SETUP_UI', str,    'HTML setup pages on, lazy (loaded on first use) or off (empty for on, lazy with the fast profile)'),
+    'template_cache': ('',      'ROTATOR_TEMPLATE_CACHE', str, 'Folder for compiled templates (empty for none, __jinja_cache__ with the fast profile)'),
+    'startup_report': ('off',   'ROTATOR_STARTUP_REPORT', str, 'on to print start-up times by stage and the time to the first request (see StartupReport)'),
+}
+s_CfgSection = 'simulator'
+s_CfgEnv = 'ROTATOR_CONFIG'
+s_CfgDefault = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rotator.ini')
+
+_settings = None
+
+def add_arguments(parser):
+    parser.add_argument('--config', metavar='FILE',
+                        help=f'INI file with a [{s_CfgSection}] section (env {s_CfgEnv}, default rotator.ini if present)')
+    for name, (default, env, typ, hlp) in Settings.items():
+        parser.add_argument('--' + name.replace('_', '-'), dest=name, type=typ, default=None, help=f'{hlp} (env {env}, default {default})')
+
+def _convert(name, typ, value, error):
+    try:
+        return typ(value)
+    except ValueError:
+        return error(f'invalid {name} value {value!r}')
+
+def _check(cfg, error):
+    if cfg['devices'] < 1:
+        error('devices must be at least 1')
+    cfg['backend'] = cfg['backend'].lower()
+    if cfg['backend'] not in ('object', 'fleet'):
+        error('backend must be object or fleet')
+    cfg['server'] = cfg['server'].lower()
+    if cfg['server'] not in ('dev', 'threaded', 'gevent'):
+        error('server must be dev, threaded or gevent')
+    if not 0 < cfg['port'] < 65536:
+        error('port must be 1 to 65535')
+    if cfg['pool'] < 1 or cfg['backlog'] < 1:
+        error('pool and backlog must be at least 1')
+    if cfg['keepalive'] < 0:
+        error('keepalive must not be negative')
+    if cfg['telemetry_hz'] <= 0 or cfg['telemetry_queue'] < 1:
+        error('telemetry_hz must be positive and telemetry_queue at least 1')
+    if cfg['discovery_rate'] < 0:
+        error('discovery_rate must not be negative')
+    cfg['discovery_ipv6'] = [n.strip() for n in cfg['discovery_ipv6'].split(',') if n.strip()]
+    if not 0 <= cfg['async_port'] < 65536:
+        error('async_port must be 0 to 65535')
+    if cfg['async_port'] and cfg['server'] == 'gevent':
+        error('the asyncio front end cannot run with the gevent server')
+    if not 0 <= cfg['time_scale'] < float('inf'):
+        error('time_scale must not be negative')
+    cfg['sim_mode'] = cfg['sim_mode'].lower()
+    if cfg['sim_mode'] not in ('realtime', 'des'):
+        error('sim_mode must be realtime or des')
+    if cfg['admit_rate'] < 0 or cfg['admit_concurrent'] < 0:
+        error('admit_rate and admit_concurrent must not be negative')
+    if cfg['admit_burst'] < 1:
+        error('admit_burst must be at least 1')
+    cfg['admit_reply'] = cfg['admit_reply'].lower()
+    if cfg['admit_reply'] not in ('alpaca', '429'):
+        error('admit_reply must be alpaca or 429')
+    cfg['profile'] = cfg['profile'].lower()
+    if cfg['profile'] not in ('standard', 'fast'):
+        error('profile must be standard or fast')
+    fast = cfg['profile'] == 'fast'
+    cfg['swagger'] = cfg['swagger'].lower() or ('off' if fast else 'on')
+    if cfg['swagger'] not in ('on', 'off'):
+        error('swagger must be on or off')
+    cfg['setup_ui'] = cfg['setup_ui'].lower() or ('lazy' if fast else 'on')
+    if cfg['setup_ui'] not in ('on', 'lazy', 'off'):
+        error('setup_ui must be on, lazy or off')
+    if not cfg['template_cache'] and fast:
+        cfg['template_cache'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), '__jinja_cache__')
+    cfg['startup_report'] = cfg['startup_report'].lower()
+    if cfg['startup_report'] not in ('on', 'off'):
+        error('startup_report must be on or off')
+    import TraceLog                                     # pylint: disable=C0415
+    try:
+        TraceLog.configure(cfg['trace'])
+    except ValueError as ex:
+        error(str(ex))
+    import SimClock                                     # pylint: disable=C0415
+    if cfg['sim_mode'] == 'des':
+        SimClock.set_discrete(cfg['sim_seed'])
+    else:
+        SimClock.set_scale(cfg['time_scale'])
+
+#
+# Resolve the settings from all the sources without checking them
+#
+def _resolve(argv):
+    parser = argparse.ArgumentParser(add_help=False)
+    add_arguments(parser)
+    args, _ = parser.parse_known_args(sys.argv[1:] if argv is None else argv)
+    cfg = {name: spec[0] for name, spec in Settings.items()}
+    path = args.config or os.environ.get(s_CfgEnv)
+    if path is not None or os.path.exists(s_CfgDefault):
+        ini = configparser.ConfigParser()
+        if not ini.read(path or s_CfgDefault):
+            parser.error(f'cannot read config file {path}')
+        if ini.has_section(s_CfgSection):
+            for name, (_, _, typ, _) in Settings.items():
+                if ini.has_option(s_CfgSection, name):
+                    cfg[name] = _convert(name, typ, ini.get(s_CfgSection, name), parser.error)
+    for name, (_, env, typ, _) in Settings.items():
+        if env in os.environ:
+            cfg[name] = _convert(name, typ, os.environ[env], parser.error)
+        if getattr(args, name) is not None:
+            cfg[name] = getattr(args, name)
+    return cfg, parser
+
+#
+# Load the configuration. 'argv' defaults to the program's command line,
+# options that are not ours are left for the caller.
+#
+def load(argv=None):
+    global _settings                                    # pylint: disable=W0603
+    cfg, parser = _resolve(argv)
+    _check(cfg, parser.error)
+    _settings = cfg
+    return cfg
+
+#
+# One setting as a lowercase string, unchecked and without loading the configuration or applying
+# any of it. For decisions that must be made before anything else is
+# imported (gevent monkey-patching).
+#
+def peek(name, argv=None):
+    return str(_resolve(argv)[0][name]).lower()
+
+def get(name):
+    if _settings is None:
+        load()
+    return _settings[name]
@@ -8,9 +8,22 @@
 # 17-Oct-2021  rbd  0.9 Use Python with: statement for cross-thread protection 
 #                       of getNextTransId(). Update DriverVerDate
 # 20-Jul-2022   rbd 1.0 Updated version and date.
+# 18-Oct-2026       1.1 StaticResponse, pre-encoded JSON for responses whose Value
+#                       never changes.
+# 18-Oct-2026       1.1 PropertyResponse and MethodResponse are __slots__ records
+#                       encoded straight to bytes, no more marshal_with.
+# 18-Oct-2026       1.1 Params, request parameters indexed once per request
+# 18-Oct-2026       1.1 Error responses are counted in Metrics
+# 18-Oct-2026       1.1 Params.float() rejects nan and inf. get_args_caseless() and
+#                       get_form_caseless() removed, Params replaces them.
+# 18-Oct-2026       1.1 Params reads MultiDicts through lists(), query string only on GET
 #
+import json
+import math
 from threading import Lock
+from flask import Response, abort, g, request
 import ASCOMErrors
+import Metrics
 
 # -----------
 # Driver Info
@@ -53,26 +66,121 @@ s_DescMthRsp =  'Transaction complete or exception'
 s_Resp400Missing =  'Method or parameter value error, check error message'
 s_Resp400NoDevNo =  'No such DeviceNumber'
 s_Resp500SrvErr =   'Server internal error, check error message'
+s_Resp400BadCtId =  'ClientTransactionID must be an integer'
 
+# ------
+# Params
+# ------
+# The query string and form data of a request, indexed once by lowercase
+# name, so that names are case-insensitive and each lookup is a dict get.
+# As Alpaca has it, GET takes its parameters from the query string and
+# PUT from the form data only. For a repeated name the first one wins. Handlers get the one for the current request
+# from params(). The typed getters abort with 400 on a bad value, and
+# float() takes only finite numbers (not nan or inf).
 #
-# Get query string data with case-insensitive name
-#
-def get_args_caseless(name, args, default):
-    lcName = name.lower()
-    for an in args:
-        if an.lower() == lcName:
-            return args.get(an, default)
-    return None                                         # not in args, let caller punt
+class Params(object):
+    __slots__ = ('_d',)
 
+    def __init__(self, *sources):                     # Werkzeug MultiDicts or parse_qs() dicts
+        d = {}
+        for src in sources:
+            if src:
+                lists = src.lists() if hasattr(src, 'lists') else src.items()
+                for k, v in lists:                      # v is the list of values for k
+                    k = k.lower()
+                    if k not in d:
+                        d[k] = v[0]
+        self._d = d
+
+    def __contains__(self, name):
+        return name.lower() in self._d
+
+    def get(self, name, default=None):
+        return self._d.get(name.lower(), default)
+
+    def int(self, name, default=None):
+        val = self._d.get(name.lower())
+        if val is None:
+            return default
+        try:
+            return int(val)
+        except ValueError:
+            return abort(400, f'{name} must be an integer')
+
+    def float(self, name, default=None):
+        val = self._d.get(name.lower())
+        if val is None:
+            return default
+        try:
+            val = float(val)
+        except ValueError:
+            return abort(400, f'{name} must be a number')
+        if not math.isfinite(val):
+            return abort(400, f'{name} must be a finite number')
+        return val
+
+    def bool(self, name, default=False):
+        val = self._d.get(name.lower())
+        if val is None:
+            return default
+        return val.lower() == 'true'
+
+    def ctid(self):
+        val = self._d.get('clienttransactionid')
+        if val is None:
+            return 0                                    # Per Alpaca, Return a 0 if ClientTransactionId is not in the request
+        try:
+            return int(val)
+        except ValueError:
+            return abort(400, s_Resp400BadCtId)
+
+def params():
+    prm = g.get('alpaca_params')
+    if prm is None:
+        prm = g.alpaca_params = Params(request.form, request.args) if request.method == 'GET' else Params(request.form)
+    return prm
+
+# ----------------
+# Response encoding
+# ----------------
+# Alpaca responses are written straight to bytes in the field order of the
+# api.model definitions, with the same separators flask-restx uses, so the
+# output is byte-for-byte what marshal_with(..., skip_none=True) produced.
+# The handlers return a flask Response, which flask-restx passes through
+# untouched, so the models only document the endpoints in Swagger. Use
+# @api.response(200, description, model) on handlers instead of
+# @api.marshal_with.
 #
-# Get form data with case-insensitive name
-#
-def get_form_caseless(name, form, default):
-    lcName = name.lower()
-    for fn in form:
-        if fn.lower() == lcName:
-            return form.get(fn, default)
-    return None                                         # not in form, let caller punt
+_ValueHead = f'{{"{s_FldValue}": '.encode()
+_CtIdHead = f'{{"{s_FldCtId}": '.encode()
+_CtIdMid = f', "{s_FldCtId}": '.encode()
+_StIdMid = f', "{s_FldStId}": '.encode()
+_ErrTails = {}                                          # err class -> ErrorNumber/ErrorMessage bytes
+
+def _err_tail(err):
+    tail = _ErrTails.get(err)
+    if tail is None:
+        tail = _ErrTails.setdefault(err, f', "{s_FldErrNum}": {err.Number}, "{s_FldErrMsg}": {json.dumps(err.Message)}}}\n'.encode())
+    return tail
+
+def encode_value(value):
+    if value is True:                                   # Most properties are bools
+        return b'true'
+    if value is False:
+        return b'false'
+    return json.dumps(value).encode()
+
+def encode_response(value, ctid, stid, err = ASCOMErrors.Success):
+    if err.Number:
+        Metrics.error(err.Number)
+    if value is None:                                   # skip_none, Value is left out
+        head = _CtIdHead
+    else:
+        head = _ValueHead + encode_value(value) + _CtIdMid
+    return b''.join((head, str(ctid).encode(), _StIdMid, str(stid).encode(), _err_tail(err)))
+
+def json_response(body):
+    return Response(body, mimetype='application/json')
 
 # ------------------
 # PropertyResponse
@@ -80,36 +188,56 @@ def get_form_caseless(name, form, default):
 # Construct the response for a property-get. Common to all
 # of the properties in this driver. Models (see below)
 # differ to specify data type and documentation of Value.
-# NOTE: the api.marshal_with(..., skip_none=True) stops missing fields from coming back with value null
+# A None Value is left out of the response, as skip_none did.
 #
-class PropertyResponse(dict):
-    def __init__(self, value, args, err = ASCOMErrors.Success):
-        dict.__init__(self)
+class PropertyResponse(object):
+    __slots__ = ('Value', 'ClientTransactionID', 'ServerTransactionID', 'ErrorNumber', 'ErrorMessage', '_err')
+
+    def __init__(self, value, prm, err = ASCOMErrors.Success):
         self.ServerTransactionID = getNextTransId()
         self.Value = value
-        ctid = get_args_caseless(s_FldCtId, args, 1)
-        if not ctid is None:
-            self.ClientTransactionID = ctid
-        else:
-            self.ClientTransactionID = 0        # Per Alpaca, Return a 0 if ClientTransactionId is not in the request
+        self.ClientTransactionID = prm.ctid()
         self.ErrorNumber = err.Number
         self.ErrorMessage = err.Message
+        self._err = err
+
+    def encode(self):
+        return encode_response(self.Value, self.ClientTransactionID, self.ServerTransactionID, self._err)
+
+    def reply(self):
+        return json_response(self.encode())
 
 # --------------
 # MethodResponse
 # --------------
 #
-class MethodResponse(dict):
-    def __init__(self, form, err = ASCOMErrors.Success):
-        dict.__init__(self)
-        self.ServerTransactionID = getNextTransId()
-        ctid = get_args_caseless(s_FldCtId, form, 1)
-        if not ctid is None:
-            self.ClientTransactionID = ctid
-        else:
-            self.ClientTransactionID = 0        # Per Alpaca, Return a 0 if ClientTransactionId is not in the request
-        self.ErrorNumber = err.Number
-        self.ErrorMessage = err.Message
+class MethodResponse(PropertyResponse):
+    __slots__ = ()
+
+    def __init__(self, prm, err = ASCOMErrors.Success):
+        PropertyResponse.__init__(self, None, prm, err)
+
+
+# --------------
+# StaticResponse
+# --------------
+# For properties whose Value never changes (Description, DriverInfo, ...).
+# The JSON is encoded once, and each request only splices in the two
+# transaction IDs. Return reply(params()) from the handler.
+#
+class StaticResponse(object):
+    __slots__ = ('_head',)
+    _tail = _err_tail(ASCOMErrors.Success)
+
+    def __init__(self, value):
+        self._head = _ValueHead + encode_value(value) + _CtIdMid
+
+    def encode(self, prm):
+        return b''.join((self._head, str(prm.ctid()).encode(),
+                         _StIdMid, str(getNextTransId()).encode(), self._tail))
+
+    def reply(self, prm):
+        return json_response(self.encode(prm))
 
 
 # -------------------------------